@@ -0,0 +1 @@
+"""Benchmarks for gamchanger on synthetic models."""
@@ -0,0 +1,148 @@
+"""
+Benchmark the cold-start cost of importing gamchanger.
+
+Each case runs in a fresh Python process, which records the time of the
+import statement, its peak resident memory (RSS), and the heavy dependencies
+it loaded. Serving processes that only apply edits or score samples use the
+headless core, while visualize() also loads the display layer:
+
+    $ python -m benchmarks.imports
+    $ python -m benchmarks.imports -r 10 --save imports.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CASES = {
+    "python": "pass",
+    "numpy": "import numpy",
+    "gamchanger": "import gamchanger",
+    "get_edited_model": "from gamchanger import get_edited_model",
+    "ScoringEngine": "from gamchanger import ScoringEngine",
+    "get_model_data": "from gamchanger import get_model_data",
+    "visualize": "from gamchanger import visualize",
+    "eager display": "import pandas, tqdm, IPython.display, gamchanger.gamchanger",
+}
+
+# Dependencies that the headless core should not load
+HEAVY_MODULES = ["pandas", "tqdm", "IPython", "pyarrow"]
+
+# Script that a fresh process runs to measure one import statement
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss if sys.platform == "darwin" else rss * 1024
+except ImportError:
+    rss = None
+print(json.dumps({{
+    "time": elapsed,
+    "rss": rss,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_import(statement, repeat=5):
+    """
+    Measure an import statement in fresh Python processes.
+
+    Args:
+        statement: Python statement to run
+        repeat: Number of processes
+
+    Returns:
+        A dictionary with the best and median time (seconds), the smallest
+        peak RSS (bytes, None if unavailable), and the heavy modules loaded
+    """
+    script = _SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)
+    runs = []
+
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        runs.append(json.loads(output))
+
+    times = [r["time"] for r in runs]
+    rss = [r["rss"] for r in runs if r["rss"] is not None]
+
+    return {
+        "time": min(times),
+        "medianTime": statistics.median(times),
+        "peakRSS": min(rss) if rss else None,
+        "modules": runs[0]["modules"],
+    }
+
+
+def run_import_benchmarks(repeat=5, cases=None, log=None):
+    """
+    Run the import benchmark cases.
+
+    Args:
+        repeat: Number of processes of each case
+        cases: Names of the cases to run. Defaults to all cases.
+        log: File to print the progress to, or None
+
+    Returns:
+        A dictionary of the results of each case
+    """
+    results = {}
+
+    for name, statement in CASES.items():
+        if cases is not None and name not in cases:
+            continue
+        results[name] = measure_import(statement, repeat)
+        if log is not None:
+            print(_format_result(name, results[name]), file=log)
+
+    return results
+
+
+def _format_result(name, result):
+    rss = "" if result["peakRSS"] is None else result["peakRSS"] / 2**20
+    return "{:<18} {:>10.2f} ms {:>10.2f} ms {:>10.1f} MB  {}".format(
+        name,
+        result["time"] * 1000,
+        result["medianTime"] * 1000,
+        rss,
+        ", ".join(result["modules"]),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.imports",
+        description="Benchmark the import time and memory of gamchanger.",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="processes")
+    parser.add_argument("-c", "--case", action="append", help="only run this case")
+    parser.add_argument("-s", "--save", help="save the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    print(
+        "{:<18} {:>13} {:>13} {:>13}  {}".format(
+            "case", "best", "median", "peak RSS", "loaded"
+        )
+    )
+    results = run_import_benchmarks(args.repeat, args.case, log=sys.stdout)
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(results, fp, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""
+Benchmark GAM Changer's payload generation, HTML embedding, and edit
+application on synthetic, duck-typed EBM models. It runs offline and does not
+need interpret.
+
+Each case is timed several times (we report the best and the median time),
+then run once more under tracemalloc to record its peak memory. Results can
+be saved as a baseline and compared with later runs:
+
+    $ python -m benchmarks.run --scenario medium --save baseline.json
+    $ python -m benchmarks.run --scenario medium --compare baseline.json
+
+A comparison exits with status 1 if any case is slower (or uses more memory)
+than the baseline by more than the tolerance ratio. Timings are only
+comparable on the same machine.
+"""
+
+import argparse
+import base64
+import gc
+import json
+import os
+import pickle
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from copy import deepcopy
+
+import numpy as np
+
+# Progress bars would distort the timings
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+from gamchanger import gamchanger  # noqa: E402
+from gamchanger.artifact import compile_scorer, load_scorer  # noqa: E402
+from gamchanger.bulk_edit import BulkEditor  # noqa: E402
+from gamchanger.edit import get_edited_model  # noqa: E402
+from gamchanger.export import save_export  # noqa: E402
+from tests.synthetic import SyntheticEBM, make_history, make_samples  # noqa: E402
+
+SCENARIOS = {
+    "small": {
+        "n_continuous": 10,
+        "n_categorical": 5,
+        "n_bins": 32,
+        "n_pair_bins": 8,
+        "n_levels": 10,
+        "n_interactions": 10,
+        "n_samples": 1000,
+        "n_edits": 20,
+    },
+    "medium": {
+        "n_continuous": 80,
+        "n_categorical": 20,
+        "n_bins": 64,
+        "n_pair_bins": 32,
+        "n_levels": 20,
+        "n_interactions": 100,
+        "n_samples": 20000,
+        "n_edits": 200,
+    },
+    "large": {
+        "n_continuous": 250,
+        "n_categorical": 50,
+        "n_bins": 256,
+        "n_pair_bins": 64,
+        "n_levels": 50,
+        "n_interactions": 200,
+        "n_samples": 100000,
+        "n_edits": 1000,
+    },
+}
+
+# Size of the placeholder JS bundle if the built bundle is not available
+BUNDLE_SIZE = 4 * 1024 * 1024
+
+
+def _load_bundle():
+    """
+    Load the built JS bundle. In a source checkout without the bundle, we use
+    a placeholder of a similar size, so _make_html() still encodes a
+    realistic amount of JS.
+
+    Returns:
+        "built" or "placeholder"
+    """
+    try:
+        gamchanger._get_js_base64()
+        return "built"
+    except OSError:
+        placeholder = b"/* gamchanger.js */" + b" " * BUNDLE_SIZE
+        gamchanger._JS_BASE64 = base64.b64encode(placeholder).decode("utf-8")
+        return "placeholder"
+
+
+def make_cases(params, tmp_dir):
+    """
+    Create the synthetic model, samples, and history, and the benchmark cases
+    that use them. The setup is not timed.
+
+    Args:
+        params: Scenario parameters (see SCENARIOS)
+        tmp_dir: Directory for the .gamchanger files
+
+    Returns:
+        A list of (name, function) tuples
+    """
+    ebm_params = {
+        k: params[k]
+        for k in [
+            "n_continuous",
+            "n_categorical",
+            "n_bins",
+            "n_pair_bins",
+            "n_levels",
+            "n_interactions",
+        ]
+    }
+    ebm = SyntheticEBM(**ebm_params)
+    x, y = make_samples(ebm, n_samples=params["n_samples"])
+
+    rng = np.random.default_rng(0)
+    n_features = len(ebm.feature_names_in_)
+    edits = rng.integers(0, n_features, params["n_edits"]).tolist()
+    export = {"historyList": make_history(ebm, edits)}
+
+    json_path = os.path.join(tmp_dir, "edits.gamchanger")
+    with open(json_path, "w") as fp:
+        json.dump(export, fp)
+
+    compact_path = os.path.join(tmp_dir, "edits-compact.gamchanger")
+    save_export(export, compact_path)
+
+    html_str = gamchanger._make_html(ebm, x, y, False)
+
+    scorer_path = os.path.join(tmp_dir, "scorer.npz")
+    compile_scorer(ebm, scorer_path)
+    model_pickle = pickle.dumps(ebm)
+
+    return [
+        ("get_model_data", lambda: gamchanger.get_model_data(ebm)),
+        (
+            "get_model_data[compact_grids]",
+            lambda: gamchanger.get_model_data(ebm, compact_grids=True),
+        ),
+        (
+            "get_model_data[merge_plateaus]",
+            lambda: gamchanger.get_model_data(ebm, merge_plateaus=True),
+        ),
+        ("get_sample_data", lambda: gamchanger.get_sample_data(ebm, x, y)),
+        (
+            "get_sample_data[columnar]",
+            lambda: gamchanger.get_sample_data(ebm, x, y, columnar=True),
+        ),
+        ("_make_html", lambda: gamchanger._make_html(ebm, x, y, False)),
+        (
+            "_make_html[columnar]",
+            lambda: gamchanger._make_html(ebm, x, y, False, columnar=True),
+        ),
+        ("_make_iframe", lambda: gamchanger._make_iframe(html_str)),
+        ("deepcopy", lambda: deepcopy(ebm)),
+        ("get_edited_model", lambda: get_edited_model(ebm, export)),
+        (
+            "get_edited_model[copy_on_write]",
+            lambda: get_edited_model(ebm, export, copy_on_write=True),
+        ),
+        (
+            "get_edited_model[json_file]",
+            lambda: get_edited_model(ebm, json_path, copy_on_write=True),
+        ),
+        (
+            "get_edited_model[compact_file]",
+            lambda: get_edited_model(ebm, compact_path, copy_on_write=True),
+        ),
+        ("BulkEditor.monotone", lambda: BulkEditor(ebm).monotone()),
+        ("BulkEditor.smooth", lambda: BulkEditor(ebm).smooth(window=5)),
+        ("compile_scorer", lambda: compile_scorer(ebm, scorer_path, export)),
+        ("load_scorer", lambda: load_scorer(scorer_path)),
+        ("pickle.loads", lambda: pickle.loads(model_pickle)),
+        ("load_scorer+predict", lambda: load_scorer(scorer_path).predict_proba(x)),
+    ]
+
+
+def measure(function, repeat=5):
+    """
+    Measure the time and peak memory of a function.
+
+    Args:
+        function: Function without arguments
+        repeat: Number of timed runs
+
+    Returns:
+        A dictionary with the best and median time (seconds), and the peak
+        memory (bytes) allocated by Python and NumPy during one run
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time": min(times),
+        "medianTime": statistics.median(times),
+        "peakMemory": peak_memory,
+    }
+
+
+def run_benchmarks(params, repeat=5, cases=None, log=None):
+    """
+    Run the benchmark cases on a synthetic scenario.
+
+    Args:
+        params: Scenario parameters (see SCENARIOS)
+        repeat: Number of timed runs of each case
+        cases: Names of the cases to run. Defaults to all cases.
+        log: File to print the progress to, or None
+
+    Returns:
+        A dictionary of the scenario, the environment, and the results of
+        each case
+    """
+    bundle = _load_bundle()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for name, function in make_cases(params, tmp_dir):
+            if cases is not None and name not in cases:
+                continue
+            results[name] = measure(function, repeat)
+            if log is not None:
+                print(_format_result(name, results[name]), file=log)
+
+    return {
+        "params": params,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "bundle": bundle,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, tolerance=1.5, min_delta=0.005):
+    """
+    Find the cases that regress from a baseline.
+
+    Args:
+        baseline: Results saved by run_benchmarks()
+        current: Results of the current run
+        tolerance: Maximum ratio of the current to the baseline best time
+            or peak memory
+        min_delta: Slowdowns shorter than this (seconds) are ignored as
+            timer noise
+
+    Returns:
+        A list of (case, metric, baseline value, current value) tuples
+    """
+    if baseline["params"] != current["params"]:
+        raise ValueError("The baseline uses a different scenario")
+
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        for metric in ["time", "peakMemory"]:
+            old, new = baseline["results"][name][metric], result[metric]
+            if metric == "time" and new - old < min_delta:
+                continue
+            if new > old * tolerance:
+                regressions.append((name, metric, old, new))
+
+    return regressions
+
+
+def _format_result(name, result):
+    return "{:<34} {:>10.2f} ms {:>10.2f} ms {:>10.2f} MB".format(
+        name,
+        result["time"] * 1000,
+        result["medianTime"] * 1000,
+        result["peakMemory"] / 2**20,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark gamchanger on synthetic EBM models.",
+    )
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), default="small", help="model size"
+    )
+    for key in SCENARIOS["small"]:
+        parser.add_argument(
+            "--" + key.replace("_", "-"),
+            type=int,
+            help="override the scenario's {}".format(key),
+        )
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed runs")
+    parser.add_argument("-c", "--case", action="append", help="only run this case")
+    parser.add_argument("-s", "--save", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare with a saved baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="allowed slowdown ratio in a comparison (default: 1.5)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.005,
+        help="ignored slowdown in seconds (default: 0.005)",
+    )
+    args = parser.parse_args(argv)
+
+    params = dict(SCENARIOS[args.scenario])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+
+    print("{:<34} {:>13} {:>13} {:>13}".format("case", "best", "median", "peak"))
+    current = run_benchmarks(params, args.repeat, args.case, log=sys.stdout)
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(current, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as fp:
+            baseline = json.load(fp)
+
+        regressions = compare_results(baseline, current, args.tolerance, args.min_delta)
+        for name, metric, old, new in regressions:
+            print(
+                "Regression: {} {} {:.4g} -> {:.4g} ({:.2f}x)".format(
+                    name, metric, old, new, new / old
+                )
+            )
+
+        if regressions:
+            return 1
+        print("No regressions over {}x of the baseline".format(args.tolerance))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
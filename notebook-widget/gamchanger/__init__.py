@@ -4,4 +4,61 @@ __author__ = """Jay Wang"""
 __email__ = "jayw@zijie.wang"
 __version__ = "0.1.13"
 
-from gamchanger.gamchanger import *
+import importlib
+
+from gamchanger.edit import ROUND, get_edited_model, edit_model_inplace
+from gamchanger.export import load_export, save_export
+from gamchanger.scoring import ScoringEngine
+from gamchanger.artifact import compile_scorer, load_scorer
+from gamchanger.replay import replay_history
+from gamchanger.bulk_edit import BulkEditor
+from gamchanger.live import LiveModel
+from gamchanger.feed import SampleFeed
+from gamchanger.profiling import VisualizeProfile
+from gamchanger.cache import enable_payload_cache, disable_payload_cache
+from gamchanger.payload import get_model_data, get_sample_data
+
+# The package used to import * from the widget module, so keep its public
+# names (e.g., ROUND) in `from gamchanger import *`
+__all__ = [
+    "ROUND",
+    "visualize",
+    "init_notebook_mode",
+    "stop_data_server",
+    "release_widgets",
+    "get_model_data",
+    "get_sample_data",
+    "get_edited_model",
+    "edit_model_inplace",
+    "load_export",
+    "save_export",
+    "ScoringEngine",
+    "compile_scorer",
+    "load_scorer",
+    "replay_history",
+    "BulkEditor",
+    "LiveModel",
+    "SampleFeed",
+    "VisualizeProfile",
+    "enable_payload_cache",
+    "disable_payload_cache",
+]
+
+
+def __getattr__(name):
+    # The notebook widget module imports IPython, so we only load it when its
+    # functions are used. The headless core (payloads, edits, and scoring)
+    # only imports NumPy eagerly, so serving processes and the batch CLI start
+    # fast without pandas, tqdm, or IPython.
+    if name.startswith("_"):
+        raise AttributeError("module 'gamchanger' has no attribute '{}'".format(name))
+
+    widget = importlib.import_module("gamchanger.gamchanger")
+
+    if name == "gamchanger":
+        return widget
+
+    if not hasattr(widget, name):
+        raise AttributeError("module 'gamchanger' has no attribute '{}'".format(name))
+
+    return getattr(widget, name)
@@ -0,0 +1,252 @@
+"""
+Read GAM Changer sample data from Parquet files and Arrow tables.
+
+get_sample_data() accepts a Parquet file path, a pyarrow Table or
+RecordBatch, or an iterable of RecordBatches (e.g., a RecordBatchReader) as
+x_test. We only read the columns in ebm.feature_names_in_ (and the label
+column), one record batch at a time. Numeric columns are NumPy views of the
+Arrow buffers, categorical columns are encoded from their dictionaries (so we
+only create one Python string per level, not per row), and rows with nulls are
+found from the validity bitmaps.
+
+pyarrow is an optional dependency:
+
+    $ pip install "gamchanger[parquet]"
+"""
+
+import os
+
+import numpy as np
+
+# Number of rows read from a Parquet file at a time
+BATCH_SIZE = 64 * 1024
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Reading Parquet files and Arrow tables requires pyarrow. "
+            + 'Install it with `pip install "gamchanger[parquet]"`.'
+        ) from e
+    return pyarrow
+
+
+def is_arrow_input(x, y):
+    """
+    Check if samples are Arrow data or a Parquet file, without importing
+    pyarrow.
+
+    Args:
+        x: Sample features
+        y: Sample labels
+
+    Returns:
+        True if x is a file path or a pyarrow object, or y is a column name
+    """
+    if isinstance(x, (str, os.PathLike)) or isinstance(y, str):
+        return True
+    return type(x).__module__.split(".")[0] == "pyarrow"
+
+
+def _iter_batches(x, columns, categorical_names):
+    """
+    Iterate over the record batches of the given columns.
+
+    Args:
+        x: Parquet file path, pyarrow Table or RecordBatch, or an iterable of
+            RecordBatches or Tables
+        columns: Names of the columns to read
+        categorical_names: Names of the categorical columns. String columns
+            in this list are read from Parquet as dictionary arrays.
+
+    Yields:
+        pyarrow RecordBatch objects
+    """
+    pa = _import_pyarrow()
+
+    if isinstance(x, (str, os.PathLike)):
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(x)
+        _check_columns(schema.names, columns)
+
+        # Keep string levels in their Parquet dictionary pages
+        read_dictionary = [
+            name
+            for name in categorical_names
+            if pa.types.is_string(schema.field(name).type)
+            or pa.types.is_large_string(schema.field(name).type)
+            or pa.types.is_binary(schema.field(name).type)
+        ]
+
+        parquet_file = pq.ParquetFile(x, read_dictionary=read_dictionary)
+        yield from parquet_file.iter_batches(batch_size=BATCH_SIZE, columns=columns)
+        return
+
+    if isinstance(x, (pa.Table, pa.RecordBatch)):
+        x = [x]
+
+    for item in x:
+        _check_columns(item.schema.names, columns)
+        if isinstance(item, pa.Table):
+            yield from item.select(columns).to_batches()
+        else:
+            yield item
+
+
+def _check_columns(names, columns):
+    missing = [c for c in columns if c not in names]
+    if missing:
+        raise ValueError(f"Sample data does not have the columns {missing}.")
+
+
+def _get_values(array):
+    """
+    Get the values of an Arrow array as a NumPy array. Integer and float
+    arrays are zero-copy views of the value buffer, so null slots hold
+    arbitrary values.
+    """
+    pa = _import_pyarrow()
+
+    if pa.types.is_dictionary(array.type):
+        array = array.dictionary_decode()
+
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+        dtype = np.dtype(array.type.to_pandas_dtype())
+        values = np.frombuffer(
+            array.buffers()[1], dtype=dtype, count=array.offset + len(array)
+        )
+        return values[array.offset :]
+
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _get_valid_mask(array):
+    """
+    Find the valid values of an Arrow array from its validity bitmap. NaN
+    values of float arrays are not valid either.
+
+    Returns:
+        1D bool np.ndarray, or None if all values are valid
+    """
+    pa = _import_pyarrow()
+    valid = None
+
+    if array.null_count > 0:
+        bitmap = np.frombuffer(array.buffers()[0], dtype=np.uint8)
+        bits = np.unpackbits(bitmap, bitorder="little")
+        valid = bits[array.offset : array.offset + len(array)].astype(bool)
+
+    if pa.types.is_floating(array.type):
+        not_nan = ~np.isnan(_get_values(array))
+        valid = not_nan if valid is None else valid & not_nan
+
+    return valid
+
+
+def _encode_dictionary_column(array, level_str_to_int, valid=None):
+    """
+    Encode a categorical Arrow array as integers through its dictionary.
+
+    Args:
+        array: pyarrow Array. Other than dictionary arrays are dictionary
+            encoded first.
+        level_str_to_int: the dictionary that maps level string to int
+        valid: 1D bool np.ndarray of the rows to keep, or None to keep all
+
+    Returns:
+        1D int np.ndarray of encoded levels. Unseen levels are encoded as the
+        max level + 1.
+    """
+    pa = _import_pyarrow()
+
+    if not pa.types.is_dictionary(array.type):
+        array = array.dictionary_encode()
+
+    unseen_level = max(level_str_to_int.values()) + 1
+    levels = array.dictionary.to_pylist()
+    lookup = np.fromiter(
+        (level_str_to_int.get(str(level), unseen_level) for level in levels),
+        dtype=np.int64,
+        count=len(levels),
+    )
+
+    indices = _get_values(array.indices)
+    if valid is not None:
+        indices = indices[valid]
+
+    return lookup[indices]
+
+
+def read_arrow_chunks(x, y, feature_names, level_maps):
+    """
+    Read Arrow samples batch by batch into column arrays, and drop rows with
+    nulls or NaNs.
+
+    Args:
+        x: Parquet file path, pyarrow Table or RecordBatch, or an iterable of
+            RecordBatches or Tables
+        y: Name of the label column, or a 1D np.ndarray or pd.Series of the
+            labels of all rows
+        feature_names: Names of the feature columns to read
+        level_maps: The level_str_to_int dictionary of each feature, or None
+            for continuous features
+
+    Yields:
+        Tuples of (columns, labels, number of dropped rows). Categorical
+        columns are already encoded as integers.
+    """
+    feature_names = list(feature_names)
+    categorical_names = [
+        name for name, levels in zip(feature_names, level_maps) if levels is not None
+    ]
+
+    columns = feature_names
+    if isinstance(y, str):
+        columns = feature_names + [y]
+    else:
+        y = y.to_numpy() if hasattr(y, "to_numpy") else np.asarray(y)
+
+    offset = 0
+
+    for batch in _iter_batches(x, columns, categorical_names):
+        arrays = [batch.column(name) for name in feature_names]
+
+        if isinstance(y, str):
+            label_array = batch.column(y)
+            arrays_to_check = arrays + [label_array]
+        else:
+            label_array = None
+            arrays_to_check = arrays
+
+        # Combine the validity bitmaps of all columns
+        valid = None
+        for array in arrays_to_check:
+            cur_valid = _get_valid_mask(array)
+            if cur_valid is not None:
+                valid = cur_valid if valid is None else valid & cur_valid
+
+        n_dropped = 0 if valid is None else int(len(valid) - np.sum(valid))
+        if n_dropped == 0:
+            valid = None
+
+        sample_columns = []
+        for array, levels in zip(arrays, level_maps):
+            if levels is None:
+                values = _get_values(array)
+                sample_columns.append(values if valid is None else values[valid])
+            else:
+                sample_columns.append(_encode_dictionary_column(array, levels, valid))
+
+        if label_array is not None:
+            labels = _get_values(label_array)
+        else:
+            labels = y[offset : offset + batch.num_rows]
+        offset += batch.num_rows
+
+        if valid is not None:
+            labels = labels[valid]
+
+        yield sample_columns, labels, n_dropped
@@ -0,0 +1,263 @@
+"""
+Compile an (edited) EBM into a flat scoring artifact that scoring processes
+memory-map instead of unpickling the model.
+
+The artifact is an uncompressed .npz file with three arrays:
+
+    meta    JSON (as uint8) of the feature names, types, categorical levels,
+            term layout, intercept, and classes
+    edges   float64 bin cuts of all continuous features
+    scores  float64 score tables of all terms
+
+We align the data of each array to 64 bytes in the file, so load_scorer() can
+map the whole file once and view the arrays in place. The pages are shared by
+all processes that load the same file, and loading only parses the ZIP
+directory and the JSON. np.load() can also read the file.
+"""
+
+import io
+import json
+import struct
+import zipfile
+
+import numpy as np
+
+from gamchanger.edit import get_edited_model
+from gamchanger.scoring import ScoringEngine
+
+ARTIFACT_VERSION = 1
+
+# Alignment (bytes) of the array data in the file
+ALIGNMENT = 64
+
+# ZIP extra field ID of the alignment padding (the same ID as zipalign)
+_PADDING_EXTRA_ID = 0xD935
+
+# Size of a ZIP local file header without the file name and extra field
+_LOCAL_HEADER_SIZE = 30
+
+
+def _get_engine(model, gamchanger_export=None):
+    """Create a ScoringEngine from a model, applying the edits if given."""
+    if isinstance(model, ScoringEngine):
+        if gamchanger_export is not None:
+            raise ValueError("Edits can only be applied to an EBM.")
+        return model
+
+    if isinstance(model, dict):
+        if gamchanger_export is not None:
+            raise ValueError("Edits can only be applied to an EBM.")
+        return ScoringEngine.from_model_data(model)
+
+    if gamchanger_export is not None:
+        model = get_edited_model(model, gamchanger_export, copy_on_write=True)
+
+    return ScoringEngine.from_ebm(model)
+
+
+def _pack_engine(engine):
+    """
+    Flatten a ScoringEngine into the meta dictionary and the edge and score
+    arrays.
+    """
+    edges, scores = [], []
+    edge_size, score_size = 0, 0
+
+    def add_bins(bins, is_continuous):
+        nonlocal edge_size
+        if not is_continuous:
+            return {"levels": {str(k): int(v) for k, v in bins.items()}}
+
+        cuts = np.asarray(bins, dtype=np.float64).reshape(-1)
+        edges.append(cuts)
+        edge_size += len(cuts)
+        return {"edges": [edge_size - len(cuts), edge_size]}
+
+    features = []
+    for j, name in enumerate(engine.feature_names):
+        is_continuous = engine.feature_types[j] == "continuous"
+        feature = {
+            "name": str(name),
+            "type": engine.feature_types[j],
+            "main": add_bins(engine.main_bins[j], is_continuous),
+        }
+
+        # Most features use the same bins in interaction terms
+        if engine.pair_bins[j] is not engine.main_bins[j]:
+            feature["pair"] = add_bins(engine.pair_bins[j], is_continuous)
+        features.append(feature)
+
+    terms = []
+    for term_features, term_scores in engine.terms:
+        scores.append(term_scores.reshape(-1))
+        score_size += term_scores.size
+        terms.append(
+            {
+                "features": [int(j) for j in term_features],
+                "shape": list(term_scores.shape),
+                "scores": [score_size - term_scores.size, score_size],
+            }
+        )
+
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "features": features,
+        "terms": terms,
+        "intercept": engine.intercept,
+        "classes": None if engine.classes is None else engine.classes.tolist(),
+    }
+
+    edges = np.concatenate(edges) if edges else np.zeros(0)
+    scores = np.concatenate(scores) if scores else np.zeros(0)
+    return meta, edges, scores
+
+
+def _write_aligned_npz(path, arrays):
+    """
+    Write arrays to an uncompressed .npz file, padding the extra field of each
+    ZIP entry so that the array data starts at a multiple of ALIGNMENT.
+    """
+    with open(path, "wb") as fp:
+        with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_STORED) as zf:
+            for name, array in arrays.items():
+                buffer = io.BytesIO()
+                np.lib.format.write_array(buffer, np.ascontiguousarray(array))
+
+                # The .npy header is padded to 64 bytes, so we only need to
+                # align its start
+                zinfo = zipfile.ZipInfo(name + ".npy", date_time=(1980, 1, 1, 0, 0, 0))
+                zinfo.compress_type = zipfile.ZIP_STORED
+                header_end = (
+                    fp.tell() + _LOCAL_HEADER_SIZE + len(zinfo.filename.encode()) + 4
+                )
+                padding = -header_end % ALIGNMENT
+                zinfo.extra = struct.pack("<HH", _PADDING_EXTRA_ID, padding)
+                zinfo.extra += b"\0" * padding
+
+                zf.writestr(zinfo, buffer.getvalue())
+
+
+def compile_scorer(model, path, gamchanger_export=None):
+    """
+    Compile a model into a scoring artifact (see load_scorer()).
+
+    Args:
+        model: EBM object (e.g., returned by get_edited_model()), a
+            ScoringEngine, or a model data dictionary (get_model_data() or
+            the modelData of a *.gamchanger export)
+        path: Path of the artifact, usually ending with .npz
+        gamchanger_export: Python dictionary loaded from a GAM Changer export
+            (*.gamchanger), or the path to a *.gamchanger file. If given, we
+            apply its edits to the EBM first.
+
+    Returns:
+        path
+    """
+    engine = _get_engine(model, gamchanger_export)
+    meta, edges, scores = _pack_engine(engine)
+
+    _write_aligned_npz(
+        path,
+        {
+            "meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            "edges": edges,
+            "scores": scores,
+        },
+    )
+    return path
+
+
+def _mmap_npz(path):
+    """
+    Map an uncompressed .npz file into memory once, and view its arrays in
+    place.
+
+    Returns:
+        A dictionary of read-only arrays
+    """
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as fp:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("Compressed artifacts cannot be memory-mapped.")
+
+            # The local header may have a different extra field than the
+            # central directory, so we read its lengths
+            fp.seek(info.header_offset + 26)
+            name_size, extra_size = struct.unpack("<HH", fp.read(4))
+            fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_size + extra_size)
+
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+
+            arrays[info.filename[: -len(".npy")]] = np.ndarray(
+                shape,
+                dtype=dtype,
+                buffer=buffer,
+                offset=fp.tell(),
+                order="F" if fortran_order else "C",
+            )
+
+    return arrays
+
+
+def load_scorer(path, mmap=True):
+    """
+    Load a scoring artifact created by compile_scorer().
+
+    Args:
+        path: Path of the artifact
+        mmap: Whether to memory-map the bins and scores (shared by all
+            processes that load the file) instead of reading them into memory
+
+    Returns:
+        A ScoringEngine, with score(), predict(), and predict_proba()
+    """
+    if mmap:
+        arrays = _mmap_npz(path)
+    else:
+        with np.load(path) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+
+    meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+    if meta["version"] > ARTIFACT_VERSION:
+        raise ValueError(
+            "The artifact version {} is newer than this gamchanger.".format(
+                meta["version"]
+            )
+        )
+
+    edges, scores = arrays["edges"], arrays["scores"]
+
+    def read_bins(bins):
+        if "levels" in bins:
+            return bins["levels"]
+        start, end = bins["edges"]
+        return edges[start:end]
+
+    main_bins, pair_bins = [], []
+    for feature in meta["features"]:
+        main_bins.append(read_bins(feature["main"]))
+        pair_bins.append(
+            read_bins(feature["pair"]) if "pair" in feature else main_bins[-1]
+        )
+
+    terms = []
+    for term in meta["terms"]:
+        start, end = term["scores"]
+        terms.append((term["features"], scores[start:end].reshape(term["shape"])))
+
+    return ScoringEngine(
+        feature_names=[f["name"] for f in meta["features"]],
+        feature_types=[f["type"] for f in meta["features"]],
+        main_bins=main_bins,
+        pair_bins=pair_bins,
+        terms=terms,
+        intercept=meta["intercept"],
+        classes=meta["classes"],
+    )
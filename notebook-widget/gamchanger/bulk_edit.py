@@ -0,0 +1,439 @@
+"""
+Apply GAM Changer's monotonicity, interpolation, and smoothing edits to many
+continuous features at once, without clicking through the widget.
+
+BulkEditor keeps the current scores of the edited features. Each edit
+concatenates the selected bins of all features and fits them in one NumPy
+pass, weighting the bins by their sample counts as the widget does. The
+edits are recorded as a standard GAM Changer history list, so
+get_edited_model() and replay_history() accept it, and the widget can open it
+for review:
+
+    editor = BulkEditor(ebm)
+    editor.smooth(window=5)
+    editor.monotone(["age", "income"], increasing=True)
+    ebm_edited = get_edited_model(ebm, editor.to_export())
+"""
+
+import hashlib
+import time
+
+import numpy as np
+
+from gamchanger.edit import ROUND
+from gamchanger.payload import get_model_data, get_sample_data
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+# Weight of the bins without samples, so they follow their neighbors
+_EMPTY_BIN_WEIGHT = 1e-6
+
+
+class BulkEditor:
+    """
+    Edit the main effects of continuous features in bulk, and record the edits
+    as a GAM Changer history list.
+
+    Each edit method takes the features to edit (names or indexes, all
+    continuous features by default) and an optional x_range: a (low, high)
+    tuple for all features, or a dictionary from feature name to (low, high).
+    The bins that start in [low, high) are edited, and either bound can be
+    None. Features whose rounded scores do not change are not recorded.
+
+    Args:
+        ebm: EBM object. It is not modified.
+        reviewed: Whether to mark the edits as reviewed. The widget only saves
+            a project after the user confirms all unreviewed edits in the
+            History panel.
+    """
+
+    def __init__(self, ebm: "ExplainableBoostingClassifier", reviewed=False):
+        self.ebm = ebm
+        self.reviewed = reviewed
+        self.history = []
+        self._curves = {}
+        self._last_time = 0
+
+    def monotone(self, features=None, increasing=True, x_range=None):
+        """
+        Make the scores monotone with weighted isotonic regression.
+
+        Args:
+            features: Feature names or indexes, or None for all continuous
+                features
+            increasing: Whether the scores increase or decrease with x
+            x_range: Range of the bins to edit (see BulkEditor)
+
+        Returns:
+            Names of the edited features
+        """
+        edit_type = "increasing" if increasing else "decreasing"
+        return self._edit(
+            features,
+            x_range,
+            edit_type,
+            lambda x, y, w, offsets: _isotonic_regression(y, w, offsets, increasing),
+            "Made {n} bins ({range}) monotonically " + edit_type + ".",
+        )
+
+    def interpolate(self, features=None, x_range=None):
+        """
+        Replace the scores by a linear interpolation between the first and the
+        last bins of the range, in place (the bins are kept).
+
+        Args:
+            features: Feature names or indexes, or None for all continuous
+                features
+            x_range: Range of the bins to edit (see BulkEditor)
+
+        Returns:
+            Names of the edited features
+        """
+        return self._edit(
+            features,
+            x_range,
+            "inplace-interpolate",
+            lambda x, y, w, offsets: _interpolate(x, y, offsets),
+            "Interpolated {n} bins ({range}) in place.",
+        )
+
+    def smooth(self, features=None, window=3, x_range=None):
+        """
+        Smooth the scores with a weighted moving average. The window is
+        centered on each bin and truncated at the ends of the range.
+
+        Args:
+            features: Feature names or indexes, or None for all continuous
+                features
+            window: Odd number of bins in the moving window
+            x_range: Range of the bins to edit (see BulkEditor)
+
+        Returns:
+            Names of the edited features
+        """
+        if int(window) != window or window < 1 or window % 2 == 0:
+            raise ValueError("window must be a positive odd integer.")
+
+        return self._edit(
+            features,
+            x_range,
+            "smooth",
+            lambda x, y, w, offsets: _smooth(y, w, offsets, int(window)),
+            "Smoothed {n} bins ({range}) with a " + str(window) + "-bin window.",
+        )
+
+    def to_export(self, x_test=None, y_test=None, **kwargs):
+        """
+        Create a GAM Changer export of the recorded edits.
+
+        Args:
+            x_test: Sample features. If given, the export also has the model
+                data of the original EBM and the sample data, so it can be
+                saved as a *.gamchanger file and opened in the widget.
+            y_test: Sample labels
+            kwargs: Other keyword arguments of get_sample_data()
+
+        Returns:
+            A Python dictionary with the historyList
+        """
+        gamchanger_export = {"historyList": self.history}
+
+        if x_test is not None:
+            gamchanger_export["modelData"] = get_model_data(self.ebm)
+            gamchanger_export["sampleData"] = get_sample_data(
+                self.ebm, x_test, y_test, **kwargs
+            )
+
+        return gamchanger_export
+
+    def _get_feature_indexes(self, features):
+        """Resolve feature names and indexes, checking they are continuous."""
+        types = self.ebm.feature_types_in_
+
+        if features is None:
+            return [i for i, t in enumerate(types) if t == "continuous"]
+
+        if isinstance(features, (str, int, np.integer)):
+            features = [features]
+
+        indexes = []
+        for feature in features:
+            if isinstance(feature, str):
+                i = list(self.ebm.feature_names_in_).index(feature)
+            else:
+                i = int(feature)
+            if types[i] != "continuous":
+                raise ValueError(
+                    "Feature {} is not continuous.".format(
+                        self.ebm.feature_names_in_[i]
+                    )
+                )
+            indexes.append(i)
+
+        return indexes
+
+    def _edit(self, features, x_range, edit_type, fit, description):
+        if features is None and isinstance(x_range, dict):
+            features = list(x_range)
+
+        indexes = self._get_feature_indexes(features)
+        names = self.ebm.feature_names_in_
+
+        # Concatenate the selected bins of all features
+        selections = []
+        for i in indexes:
+            cur_range = x_range.get(names[i]) if isinstance(x_range, dict) else x_range
+            curve = self._curves.get(i) or _Curve(self.ebm, i)
+            start, end = curve.get_bin_range(cur_range)
+            if end > start:
+                selections.append((i, curve, start, end))
+
+        if not selections:
+            return []
+
+        offsets = np.cumsum([0] + [end - start for _, _, start, end in selections])
+        x = np.concatenate([c.edges[s:e] for _, c, s, e in selections])
+        y = np.concatenate([c.scores[s:e] for _, c, s, e in selections])
+        w = np.concatenate([c.weights[s:e] for _, c, s, e in selections])
+
+        new_y = np.round(fit(x, y, w, offsets), ROUND)
+
+        edited = []
+        for k, (i, curve, start, end) in enumerate(selections):
+            cur_y = new_y[offsets[k] : offsets[k + 1]]
+            if np.array_equal(cur_y, curve.scores[start:end]):
+                continue
+
+            # Like the widget, record the original graph before the first edit
+            if i not in self._curves:
+                self._curves[i] = curve
+                self._push(i, "original", "Original graph")
+
+            curve.scores[start:end] = cur_y
+            self._push(
+                i,
+                edit_type,
+                description.format(n=end - start, range=curve.format_range(start, end)),
+            )
+            edited.append(names[i])
+
+        return edited
+
+    def _push(self, index, edit_type, description):
+        """Append a history entry of a feature's current curve."""
+        # The widget uses the time in ms as the ID of an entry
+        cur_time = max(int(time.time() * 1000), self._last_time + 1)
+        self._last_time = cur_time
+
+        point_data, additive_data = self._curves[index].get_state()
+
+        self.history.append(
+            {
+                "state": {"pointData": point_data, "additiveData": additive_data},
+                "metrics": {},
+                "featureName": self.ebm.feature_names_in_[index],
+                "type": edit_type,
+                "description": description,
+                "time": cur_time,
+                "hash": hashlib.md5(
+                    "{}{}{}".format(edit_type, description, cur_time).encode("utf-8")
+                ).hexdigest(),
+                "reviewed": self.reviewed or edit_type == "original",
+            }
+        )
+
+
+class _Curve:
+    """
+    The bins and current scores of a continuous main effect, as the widget
+    shows them: edges and scores are rounded to ROUND decimals.
+    """
+
+    def __init__(self, ebm, index):
+        bounds = ebm.feature_bounds_[index]
+        self.edges = np.concatenate(
+            ([bounds[0]], np.round(ebm.bins_[index][0], ROUND))
+        ).astype(np.float64)
+        self.max_x = float(bounds[1])
+        self.scores = np.round(ebm.term_scores_[index][1:-1], ROUND).astype(np.float64)
+        self.counts = np.asarray(ebm.bin_weights_[index], dtype=np.float64)[1:-1]
+        self.weights = np.where(self.counts > 0, self.counts, _EMPTY_BIN_WEIGHT)
+
+    def get_bin_range(self, x_range):
+        """Get the [start, end) indexes of the bins that start in x_range."""
+        if x_range is None:
+            return 0, len(self.edges)
+
+        low, high = x_range
+        start = 0 if low is None else int(np.searchsorted(self.edges, low, "left"))
+        end = (
+            len(self.edges)
+            if high is None
+            else int(np.searchsorted(self.edges, high, "left"))
+        )
+        return start, max(start, end)
+
+    def format_range(self, start, end):
+        """Describe a range of bins the same way as the widget."""
+        left = _format_number(self.edges[start])
+        if end == len(self.edges):
+            return "{} <= x".format(left)
+        return "{} <= x < {}".format(left, _format_number(self.edges[end]))
+
+    def get_state(self):
+        """
+        Create the widget's pointData and additiveData of the curve (see
+        createPointData() and createAdditiveData() in cont-data.js).
+        """
+        xs = self.edges.tolist()
+        ys = self.scores.tolist()
+        n = len(xs)
+
+        # The line of the last bin ends at the max x value
+        next_ids = list(range(1, n)) + [n - 1]
+        next_xs = xs[1:] + [self.max_x]
+        next_ys = ys[1:] + ys[-1:]
+
+        point_data = {
+            str(i): {
+                "x": x,
+                "y": y,
+                "count": count,
+                "id": i,
+                "ebmID": i,
+                "leftPointID": i - 1 if i > 0 else None,
+                "rightPointID": i + 1 if i < n - 1 else None,
+                "leftLineIndex": 2 * i - 1 if i > 0 else None,
+                "rightLineIndex": 2 * i,
+            }
+            for i, x, y, count in zip(range(n), xs, ys, self.counts.tolist())
+        }
+
+        # Each step has a horizontal line to the next point and a vertical line
+        # up or down to it
+        additive_data = []
+        for i, j, sx, sy, tx, ty in zip(range(n), next_ids, xs, ys, next_xs, next_ys):
+            line = {"sx": sx, "sy": sy, "tx": tx, "ty": ty}
+            additive_data.append(
+                dict(x1=sx, y1=sy, x2=tx, y2=sy, id=f"path-{i}-{j}-r", pos="r", **line)
+            )
+            if i < n - 1:
+                additive_data.append(
+                    dict(
+                        x1=tx,
+                        y1=sy,
+                        x2=tx,
+                        y2=ty,
+                        id=f"path-{i}-{j}-l",
+                        pos="l",
+                        **line,
+                    )
+                )
+
+        point_data[str(n - 1)]["maxX"] = self.max_x
+
+        return point_data, additive_data
+
+
+def _format_number(value):
+    """Round a number to 2 decimals and print it like JavaScript."""
+    value = round(float(value), 2)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _get_segment_ids(offsets):
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _isotonic_regression(y, w, offsets, increasing=True):
+    """
+    Fit a weighted isotonic regression to each segment of y with the pool
+    adjacent violators algorithm (PAV), for all segments at once.
+
+    Instead of pooling one pair of blocks at a time, each pass pools every run
+    of adjacent blocks that violate the order in all segments. Pooling a run
+    is a sequence of PAV steps, so the fit is the same as the sequential PAV.
+
+    Args:
+        y: 1D np.ndarray of the concatenated segments
+        w: 1D np.ndarray of positive weights
+        offsets: Start indexes of the segments, and len(y) at the end
+        increasing: Whether the fit increases or decreases
+
+    Returns:
+        1D np.ndarray of the fitted values
+    """
+    sign = 1.0 if increasing else -1.0
+
+    block_wy = sign * w * y
+    block_w = w.astype(np.float64)
+    block_size = np.ones(len(y), dtype=np.intp)
+    block_segment = _get_segment_ids(offsets)
+
+    while True:
+        means = block_wy / block_w
+        violated = (means[:-1] > means[1:]) & (block_segment[:-1] == block_segment[1:])
+        if not violated.any():
+            break
+
+        # Each block that does not violate the order with its left block
+        # starts a new pooled block
+        starts = np.flatnonzero(np.concatenate(([True], ~violated)))
+        block_wy = np.add.reduceat(block_wy, starts)
+        block_w = np.add.reduceat(block_w, starts)
+        block_size = np.add.reduceat(block_size, starts)
+        block_segment = block_segment[starts]
+
+    return sign * np.repeat(means, block_size)
+
+
+def _interpolate(x, y, offsets):
+    """
+    Linearly interpolate the values of each segment between its first and
+    last points, as the widget's in-place interpolation.
+
+    Returns:
+        1D np.ndarray of the interpolated values
+    """
+    first, last = offsets[:-1], offsets[1:] - 1
+    segment = _get_segment_ids(offsets)
+
+    x0, x1 = x[first][segment], x[last][segment]
+    y0, y1 = y[first][segment], y[last][segment]
+    span = x1 - x0
+    alpha = np.divide(x - x0, span, out=np.zeros(len(x)), where=span != 0)
+
+    new_y = y0 + (y1 - y0) * alpha
+    new_y[first] = y[first]
+    new_y[last] = y[last]
+    return new_y
+
+
+def _smooth(y, w, offsets, window):
+    """
+    Smooth each segment with a centered, weighted moving average. Windows are
+    truncated at the ends of the segments.
+
+    Returns:
+        1D np.ndarray of the smoothed values
+    """
+    half = window // 2
+    segment = _get_segment_ids(offsets)
+    index = np.arange(len(y))
+    start, end = offsets[:-1][segment], offsets[1:][segment]
+
+    wy = w * y
+    total_wy = np.zeros(len(y))
+    total_w = np.zeros(len(y))
+
+    # One shifted pass per window position keeps the sums local
+    for shift in range(-half, half + 1):
+        valid = (index + shift >= start) & (index + shift < end)
+        total_wy[valid] += wy[index[valid] + shift]
+        total_w[valid] += w[index[valid] + shift]
+
+    return total_wy / total_w
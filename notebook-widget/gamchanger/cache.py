@@ -0,0 +1,392 @@
+"""
+A content-addressed cache of the model and sample data that GAM Changer
+generates.
+
+Payloads are keyed by a fingerprint (a SHA-1 hash) of the EBM arrays and the
+samples they are generated from, plus the encoding options. The key of the
+sample data only uses the parts of the EBM that change the sample encoding
+(feature names, types, and categorical levels), so models trained on the same
+features share the encoded samples.
+
+The cache is off by default:
+
+    gamchanger.enable_payload_cache(max_entries=16, cache_dir="~/.gamchanger")
+
+Payloads are kept in an in-memory LRU cache, and optionally as JSON files in
+cache_dir with a total size cap (the least recently used files are removed
+first). Both keep the payloads as JSON, so every cache hit returns a new
+dictionary that the caller is free to modify.
+
+Numeric sample columns are hashed by their bytes. Object, string, and
+categorical columns are hashed with pandas, which hashes mixed-type values by
+their string form, so e.g. 1 and "1" in an object column share a key.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+import numpy as np
+
+# Change this when the payload format changes to ignore old files on disk
+PAYLOAD_VERSION = 2
+
+# EBM attributes that get_model_data() reads
+MODEL_ATTRIBUTES = [
+    "feature_names_in_",
+    "feature_types_in_",
+    "feature_bounds_",
+    "bins_",
+    "histogram_edges_",
+    "histogram_weights_",
+    "bin_weights_",
+    "term_features_",
+    "term_scores_",
+    "standard_deviations_",
+    "intercept_",
+]
+
+_PAYLOAD_CACHE = None
+
+
+def _update_hash(h, value):
+    """Feed a (nested) value into a hash object, tagged by its type."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "O":
+            h.update(b"O")
+            _update_hash(h, _hash_objects(value.ravel()))
+        else:
+            h.update("a{}{}".format(value.dtype.str, value.shape).encode())
+            h.update(np.ascontiguousarray(value).reshape(-1).view(np.uint8).data)
+    elif isinstance(value, dict):
+        h.update("d{}".format(len(value)).encode())
+        for k, v in value.items():
+            _update_hash(h, k)
+            _update_hash(h, v)
+    elif isinstance(value, (list, tuple)):
+        h.update("l{}".format(len(value)).encode())
+        for v in value:
+            _update_hash(h, v)
+    elif isinstance(value, bytes):
+        h.update("b{}:".format(len(value)).encode())
+        h.update(value)
+    elif isinstance(value, str):
+        _update_hash(h, value.encode("utf-8"))
+    else:
+        # None, bools, and numbers
+        h.update("s{!r};".format(value).encode())
+
+
+def _hash_objects(values):
+    """
+    Hash each value of an object array to uint64 with pandas. Arrays of mixed
+    types are hashed by the values' string form, so values with the same
+    string (e.g., 1 and "1") have the same hash.
+    """
+    from pandas.util import hash_array
+
+    return hash_array(np.asarray(values, dtype=object))
+
+
+def _hash_column(h, column):
+    """Feed a sample column (np.ndarray or pd.Series) into a hash object."""
+    values = np.asarray(column)
+
+    if values.dtype.kind in "biufcmM":
+        _update_hash(h, values)
+    else:
+        # Object, string, and categorical columns
+        _update_hash(h, _hash_objects(values))
+
+
+def fingerprint(*values):
+    """
+    Hash nested lists, tuples, dicts, NumPy arrays, strings, and numbers.
+
+    Returns:
+        A 40-digit hex string
+    """
+    h = hashlib.sha1()
+    for value in values:
+        _update_hash(h, value)
+    return h.hexdigest()
+
+
+def fingerprint_model(ebm):
+    """
+    Fingerprint the EBM arrays that the model data is generated from.
+
+    Args:
+        ebm: EBM object
+
+    Returns:
+        A 40-digit hex string
+    """
+    h = hashlib.sha1()
+    for name in MODEL_ATTRIBUTES:
+        _update_hash(h, name)
+        _update_hash(h, getattr(ebm, name))
+
+    _update_hash(h, hasattr(ebm, "classes_"))
+    _update_hash(h, np.asarray(ebm.term_importances(), dtype=np.float64))
+    return h.hexdigest()
+
+
+def fingerprint_samples(x, y):
+    """
+    Fingerprint the samples and labels.
+
+    Args:
+        x: 2D np.ndarray or pd.DataFrame
+        y: 1D np.ndarray, pd.Series, or list
+
+    Returns:
+        A 40-digit hex string, or None if the samples are not an array or a
+        data frame (e.g., an iterable of chunks that we can only read once)
+    """
+    h = hashlib.sha1()
+
+    if hasattr(x, "columns") and hasattr(x, "iloc"):
+        _update_hash(h, [str(c) for c in x.columns])
+        for j in range(x.shape[1]):
+            _hash_column(h, x.iloc[:, j])
+    elif isinstance(x, np.ndarray) and x.ndim == 2:
+        _update_hash(h, x.shape)
+        for j in range(x.shape[1]):
+            _hash_column(h, x[:, j])
+    else:
+        return None
+
+    if not hasattr(y, "__len__"):
+        return None
+
+    _update_hash(h, "labels")
+    _hash_column(h, np.asarray(y))
+    return h.hexdigest()
+
+
+def _get_sample_encoding(ebm):
+    """Get the EBM attributes that change the sample encoding."""
+    levels = [
+        ebm.bins_[i][0] if t != "continuous" else None
+        for i, t in enumerate(ebm.feature_types_in_)
+    ]
+    return [ebm.feature_names_in_, ebm.feature_types_in_, levels]
+
+
+class PayloadCache:
+    """
+    An LRU cache of JSON-serializable payloads, with an optional on-disk
+    store. Payloads are stored as JSON text and decoded on each hit, so
+    callers never share a payload.
+
+    Args:
+        max_entries: Maximum number of payloads kept in memory.
+        cache_dir: Directory of the on-disk store, or None to only cache in
+            memory.
+        max_disk_bytes: Maximum total size of the files in cache_dir.
+    """
+
+    def __init__(self, max_entries=16, cache_dir=None, max_disk_bytes=2**30):
+        self.max_entries = max_entries
+        self.cache_dir = None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_dir is not None:
+            self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def model_key(self, ebm, **options):
+        """
+        Get the cache key of an EBM's model data.
+
+        Args:
+            ebm: EBM object
+            options: Keyword arguments of get_model_data()
+
+        Returns:
+            A cache key
+        """
+        return fingerprint(
+            "model", PAYLOAD_VERSION, fingerprint_model(ebm), sorted(options.items())
+        )
+
+    def sample_key(self, ebm, x, y, **options):
+        """
+        Get the cache key of the sample data.
+
+        Args:
+            ebm: EBM object
+            x: Samples
+            y: Labels
+            options: Other keyword arguments of get_sample_data()
+
+        Returns:
+            A cache key, or None if the samples cannot be cached
+        """
+        samples = fingerprint_samples(x, y)
+        if samples is None:
+            return None
+
+        return fingerprint(
+            "sample",
+            PAYLOAD_VERSION,
+            samples,
+            _get_sample_encoding(ebm),
+            sorted(options.items()),
+        )
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, "{}.json".format(key))
+
+    def get(self, key):
+        """
+        Get a cached payload.
+
+        Returns:
+            A new copy of the payload, or None if it is not cached
+        """
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if text is not None:
+            return json.loads(text)
+
+        if self.cache_dir is not None:
+            path = self._get_path(key)
+            try:
+                with open(path, "r") as fp:
+                    text = fp.read()
+                payload = json.loads(text)
+                # Mark the file as recently used
+                os.utime(path)
+            except (OSError, ValueError):
+                payload = None
+
+            if payload is not None:
+                self._put_memory(key, text)
+                with self._lock:
+                    self.hits += 1
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_memory(self, key, text):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key, payload):
+        """Cache a copy of a payload in memory and on disk."""
+        text = json.dumps(payload)
+        self._put_memory(key, text)
+
+        if self.cache_dir is not None:
+            # Kernels that share cache_dir write to their own temporary files
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, "w") as fp:
+                    fp.write(text)
+                os.replace(tmp_path, self._get_path(key))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._evict_files()
+
+    def get_or_create(self, key, create):
+        """
+        Get a cached payload, or create and cache it.
+
+        Args:
+            key: Cache key, or None to skip the cache
+            create: Function that creates the payload
+
+        Returns:
+            The payload
+        """
+        if key is None:
+            return create()
+
+        payload = self.get(key)
+        if payload is None:
+            payload = create()
+            self.put(key, payload)
+        return payload
+
+    def _evict_files(self):
+        """Remove the least recently used files above the size cap."""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(f[1] for f in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all cached payloads, including the files on disk."""
+        with self._lock:
+            self._entries.clear()
+
+        if self.cache_dir is not None:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".json"):
+                    os.remove(entry.path)
+
+
+def enable_payload_cache(max_entries=16, cache_dir=None, max_disk_bytes=2**30):
+    """
+    Cache the model and sample data, so visualize(), get_model_data(), and
+    get_sample_data() reuse the payloads of the same EBM and samples.
+
+    Args:
+        max_entries: Maximum number of payloads kept in memory.
+        cache_dir: Directory to also store the payloads as JSON files, so
+            they are reused across kernel restarts. None to only cache in
+            memory.
+        max_disk_bytes: Maximum total size of the files in cache_dir. The
+            least recently used files are removed first.
+
+    Returns:
+        The PayloadCache
+    """
+    global _PAYLOAD_CACHE
+    _PAYLOAD_CACHE = PayloadCache(max_entries, cache_dir, max_disk_bytes)
+    return _PAYLOAD_CACHE
+
+
+def disable_payload_cache():
+    """Stop caching payloads and free the in-memory cache."""
+    global _PAYLOAD_CACHE
+    _PAYLOAD_CACHE = None
+
+
+def get_payload_cache():
+    """
+    Returns:
+        The PayloadCache, or None if the cache is disabled
+    """
+    return _PAYLOAD_CACHE
@@ -0,0 +1,330 @@
+"""
+Apply many GAM Changer exports (*.gamchanger) to pickled EBM models in a
+process pool.
+
+The manifest is a CSV file with the columns `model`, `export`, and optionally
+`output`, or a JSON file with a list of objects with the same keys. Relative
+paths are resolved from the manifest's directory. For example:
+
+    model,export
+    models/ebm-2021.pkl,reviews/alice.gamchanger
+    models/ebm-2021.pkl,reviews/bob.gamchanger
+
+    $ gamchanger-apply manifest.csv --output-dir edited --summary summary.json
+
+This module does not import IPython, pandas, or tqdm.
+"""
+
+import argparse
+import csv
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gamchanger.edit import (
+    ROUND,
+    _get_edited_feature_indexes,
+    _get_latest_edits,
+    edit_model_inplace,
+)
+from gamchanger.export import iter_history
+
+
+def read_manifest(manifest_path, output_dir=None):
+    """
+    Read the (model, export) pairs from a manifest file.
+
+    Args:
+        manifest_path: Path to a CSV or JSON manifest.
+        output_dir: Directory of the edited models that do not have an
+            `output` path in the manifest. Defaults to the model's directory.
+
+    Returns:
+        A list of jobs, each is a dictionary with keys model, export, output.
+
+    Raises:
+        ValueError: If an entry misses a path, or two entries have the same
+            output path.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    with open(manifest_path, "r", newline="") as fp:
+        if manifest_path.lower().endswith(".json"):
+            rows = json.load(fp)
+        else:
+            rows = list(csv.DictReader(fp))
+
+    jobs, outputs = [], {}
+    for i, row in enumerate(rows):
+        if not row.get("model") or not row.get("export"):
+            raise ValueError(
+                "Manifest entry {} needs both a model and an export path".format(i)
+            )
+
+        model = os.path.join(base_dir, row["model"])
+        export = os.path.join(base_dir, row["export"])
+
+        if row.get("output"):
+            output = os.path.join(base_dir, row["output"])
+        else:
+            # Name the output after both inputs, so one model can be edited by
+            # several exports in the same batch
+            model_stem, model_ext = os.path.splitext(os.path.basename(model))
+            export_stem = os.path.splitext(os.path.basename(export))[0]
+            output = os.path.join(
+                output_dir if output_dir else os.path.dirname(model),
+                "{}-{}{}".format(model_stem, export_stem, model_ext or ".pkl"),
+            )
+
+        # Jobs run in parallel, so two jobs must not write the same file
+        output_key = os.path.normcase(os.path.abspath(output))
+        if output_key in outputs:
+            raise ValueError(
+                "Manifest entries {} and {} have the same output {}".format(
+                    outputs[output_key], i, output
+                )
+            )
+        outputs[output_key] = i
+
+        jobs.append({"model": model, "export": export, "output": output})
+
+    return jobs
+
+
+def _summarize_feature(ebm, index, old_scores, old_cuts, n_edits):
+    """
+    Summarize the changes on one main effect feature after editing.
+
+    Args:
+        ebm: The edited EBM object
+        index: Feature index
+        old_scores: Scores of the feature before editing
+        old_cuts: Bin cuts of a continuous feature before editing, or None
+        n_edits: Number of edits on this feature in the history list
+
+    Returns:
+        A dictionary of the feature's changes
+    """
+    new_scores = ebm.term_scores_[index]
+    summary = {
+        "name": ebm.feature_names_in_[index],
+        "type": ebm.feature_types_in_[index],
+        "edits": n_edits,
+        "binsBefore": len(old_scores) - 2,
+        "binsAfter": len(new_scores) - 2,
+        "binDefinitionChanged": False,
+    }
+
+    if old_cuts is not None:
+        new_cuts = ebm.bins_[index][0]
+        summary["binDefinitionChanged"] = len(old_cuts) != len(new_cuts) or bool(
+            np.any(np.round(old_cuts, ROUND) != new_cuts)
+        )
+
+    if summary["binDefinitionChanged"]:
+        # Bins are not comparable one by one
+        summary["changedBins"] = None
+        summary["maxScoreChange"] = None
+    else:
+        diff = np.abs(new_scores[1:-1] - old_scores[1:-1])
+        summary["changedBins"] = int(np.count_nonzero(diff))
+        summary["maxScoreChange"] = round(float(diff.max(initial=0)), ROUND)
+
+    return summary
+
+
+def apply_export(model_path, export_path, output_path):
+    """
+    Apply one GAM Changer export to a pickled EBM and pickle the edited model.
+
+    Args:
+        model_path: Path to the pickled EBM.
+        export_path: Path to the GAM Changer export (*.gamchanger).
+        output_path: Path of the edited model.
+
+    Returns:
+        A dictionary of the per-feature changes and the timings (seconds).
+    """
+    result = {"model": model_path, "export": export_path, "output": output_path}
+    start = time.perf_counter()
+
+    try:
+        with open(model_path, "rb") as fp:
+            ebm = pickle.load(fp)
+
+        # Stream the history (JSON or compact format), and only keep the
+        # latest edit of each feature
+        n_edits = {}
+
+        def count_edits(entries):
+            for entry in entries:
+                if entry["type"] != "original":
+                    name = entry["featureName"]
+                    n_edits[name] = n_edits.get(name, 0) + 1
+                yield entry
+
+        history = list(
+            _get_latest_edits(count_edits(iter_history(export_path))).values()
+        )
+
+        loaded = time.perf_counter()
+
+        # Keep the old terms of edited features to summarize the changes
+        indexes = _get_edited_feature_indexes(ebm, history)
+        old_terms = {}
+        for i in indexes:
+            old_cuts = None
+            if ebm.feature_types_in_[i] == "continuous":
+                old_cuts = np.array(ebm.bins_[i][0], dtype=np.float64)
+            old_terms[i] = (ebm.term_scores_[i].copy(), old_cuts)
+
+        # The unpickled model is ours, so we can skip the copy
+        edit_model_inplace(ebm, {"historyList": history})
+        edited = time.perf_counter()
+
+        result["features"] = [
+            _summarize_feature(ebm, i, *old_terms[i], n_edits[ebm.feature_names_in_[i]])
+            for i in indexes
+        ]
+
+        # Write to a unique temporary file first, so a failed job never leaves
+        # a truncated model behind
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=output_dir, suffix=".tmp", delete=False
+        ) as fp:
+            try:
+                pickle.dump(ebm, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                fp.close()
+                os.remove(fp.name)
+                raise
+        os.replace(fp.name, output_path)
+
+        saved = time.perf_counter()
+        result["status"] = "ok"
+        result["timings"] = {
+            "load": round(loaded - start, 6),
+            "edit": round(edited - loaded, 6),
+            "save": round(saved - edited, 6),
+            "total": round(saved - start, 6),
+        }
+
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+        result["timings"] = {"total": round(time.perf_counter() - start, 6)}
+
+    return result
+
+
+def _apply_job(job):
+    return apply_export(job["model"], job["export"], job["output"])
+
+
+def apply_exports(jobs, workers=None):
+    """
+    Apply GAM Changer exports to EBM models in parallel.
+
+    Args:
+        jobs: A list of dictionaries with keys model, export, output.
+        workers: Number of worker processes. Defaults to the number of CPUs.
+            Use 1 to apply all jobs in the current process.
+
+    Returns:
+        A list of job results in the order of jobs
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+
+    if workers == 1:
+        return [_apply_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_apply_job, jobs))
+
+
+def _print_results(results, file=sys.stdout):
+    for r in results:
+        print(
+            "[{}] {} + {} ({:.3f}s)".format(
+                r["status"],
+                os.path.basename(r["model"]),
+                os.path.basename(r["export"]),
+                r["timings"]["total"],
+            ),
+            file=file,
+        )
+
+        if r["status"] != "ok":
+            print("    {}".format(r["error"]), file=file)
+            continue
+
+        for f in r["features"]:
+            if f["binDefinitionChanged"]:
+                change = "bins {} -> {}".format(f["binsBefore"], f["binsAfter"])
+            else:
+                change = "{}/{} bins changed, max |change| {}".format(
+                    f["changedBins"], f["binsAfter"], f["maxScoreChange"]
+                )
+            print(
+                "    {}: {} edits, {}".format(f["name"], f["edits"], change), file=file
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="gamchanger-apply",
+        description="Apply GAM Changer exports (*.gamchanger) to pickled EBMs.",
+    )
+    parser.add_argument("manifest", help="CSV or JSON manifest of model/export pairs")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="directory of the edited models (default: next to each model)",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument("-s", "--summary", help="write a JSON summary to this path")
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not print the summary"
+    )
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest, args.output_dir)
+
+    start = time.perf_counter()
+    results = apply_exports(jobs, workers=args.workers)
+    total_time = time.perf_counter() - start
+
+    if args.summary:
+        with open(args.summary, "w") as fp:
+            json.dump(
+                {"totalTime": round(total_time, 6), "jobs": results}, fp, indent=2
+            )
+
+    n_failed = sum(r["status"] != "ok" for r in results)
+
+    if not args.quiet:
+        _print_results(results)
+        print(
+            "Applied {} of {} exports in {:.3f}s".format(
+                len(results) - n_failed, len(results), total_time
+            )
+        )
+
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
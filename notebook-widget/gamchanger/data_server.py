@@ -0,0 +1,401 @@
+"""A loopback HTTP server that serves GAM Changer data to widgets lazily."""
+
+import secrets
+import threading
+import weakref
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from json import dumps, loads
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+# Maximum size of the timings that a widget posts back
+MAX_POST_BYTES = 64 * 1024
+
+# Maximum size of the edits that a live widget posts at once
+MAX_EDIT_BYTES = 16 * 1024 * 1024
+
+# Seconds that a sample request waits for samples that are still being built
+SAMPLE_TIMEOUT = 600
+
+# Seconds that a widget's poll waits for new samples from its feed
+FEED_TIMEOUT = 30
+
+# Maximum number of widgets whose data the server keeps
+MAX_WIDGETS = 32
+
+# Feature fields that widgets need before loading a term
+LAZY_FEATURE_KEYS = [
+    "name",
+    "type",
+    "importance",
+    "id",
+    "name1",
+    "name2",
+    "type1",
+    "type2",
+]
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class DataServer:
+    """
+    A local HTTP server (bound to 127.0.0.1) that serves the model terms and
+    samples of registered widgets. Each widget gets a random token in its URL.
+    Widgets also post their timings and their edits back to the server, and
+    poll it for the samples pushed to their feeds.
+
+    Serialized terms are kept in an in-memory LRU cache, so re-opening a
+    feature does not serialize its term again.
+
+    The server keeps the data of the max_widgets most recently used widgets,
+    and unregisters older ones (they cannot load more data). Profiles, live
+    models, and feeds are held by weak references, so they are unregistered
+    when they are garbage collected.
+
+    Args:
+        cache_bytes: Maximum total size of serialized terms in the cache.
+        max_widgets: Maximum number of widgets whose data the server keeps.
+    """
+
+    def __init__(self, cache_bytes=64 * 1024 * 1024, max_widgets=MAX_WIDGETS):
+        self.cache_bytes = cache_bytes
+        self.max_widgets = max_widgets
+        self._widgets = OrderedDict()
+        self._pending = {}
+        self._profiles = {}
+        self._live_models = {}
+        self._feeds = {}
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server._get_response(self.path)
+
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                max_bytes = (
+                    MAX_EDIT_BYTES if self.path.endswith("/edits") else MAX_POST_BYTES
+                )
+                if length > max_bytes or not server._post(
+                    self.path, self.rfile.read(length)
+                ):
+                    self.send_error(404)
+                    return
+
+                self.send_response(204)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = _ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self._httpd.server_address[1]
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def register(self, model_data, sample_data=None, pending_samples=False):
+        """
+        Register the data of a widget.
+
+        Args:
+            model_data: A dictionary of the EBM model weights.
+            sample_data: A dictionary of the test samples.
+            pending_samples: Whether the samples are still being built. Sample
+                requests wait until set_samples() is called.
+
+        Returns:
+            The base URL of this widget's data
+        """
+        token = secrets.token_urlsafe(16)
+
+        with self._lock:
+            self._widgets[token] = (model_data, sample_data)
+            if pending_samples:
+                self._pending[token] = threading.Event()
+            evicted = list(self._widgets)[: -self.max_widgets]
+
+        # Unregister the least recently used widgets
+        for old_token in evicted:
+            self.unregister(old_token)
+
+        return "http://127.0.0.1:{}/{}".format(self.port, token)
+
+    def set_samples(self, url, sample_data):
+        """
+        Set the samples of a widget, and answer the sample requests that are
+        waiting for them.
+
+        Args:
+            url: The base URL returned by register()
+            sample_data: A dictionary of the test samples, or None if they
+                cannot be built
+        """
+        token = _get_token(url)
+
+        with self._lock:
+            if token in self._widgets:
+                self._widgets[token] = (self._widgets[token][0], sample_data)
+            event = self._pending.pop(token, None)
+
+        if event is not None:
+            event.set()
+
+    def register_profile(self, profile):
+        """
+        Register a profile that the widget posts its timings to, once.
+
+        Args:
+            profile: A VisualizeProfile (see gamchanger.profiling)
+
+        Returns:
+            The URL that the widget posts its timings to
+        """
+        token = self._register_weak(self._profiles, profile)
+        return "http://127.0.0.1:{}/{}/profile".format(self.port, token)
+
+    def register_live(self, live_model):
+        """
+        Register a LiveModel that the widget posts its edits to.
+
+        Args:
+            live_model: A LiveModel (see gamchanger.live)
+
+        Returns:
+            The URL that the widget posts its edits to
+        """
+        token = self._register_weak(self._live_models, live_model)
+        return "http://127.0.0.1:{}/{}/edits".format(self.port, token)
+
+    def register_feed(self, feed):
+        """
+        Register a SampleFeed that the widget polls for new samples.
+
+        Args:
+            feed: A SampleFeed (see gamchanger.feed)
+
+        Returns:
+            The URL that the widget polls
+        """
+        token = self._register_weak(self._feeds, feed)
+        return "http://127.0.0.1:{}/{}/samples".format(self.port, token)
+
+    def _register_weak(self, registry, obj):
+        """Register a weak reference of an object until it is collected."""
+        token = secrets.token_urlsafe(16)
+        registry[token] = weakref.ref(obj)
+        weakref.finalize(obj, registry.pop, token, None)
+        return token
+
+    def _get_registered(self, registry, token, pop=False):
+        """Get an object registered with _register_weak(), or None."""
+        with self._lock:
+            ref = registry.pop(token, None) if pop else registry.get(token)
+        return None if ref is None else ref()
+
+    def unregister(self, url):
+        """
+        Stop serving the data of a widget and free its cached terms. It also
+        accepts the URLs returned by register_profile(), register_live(), and
+        register_feed().
+
+        Args:
+            url: A URL returned by the register methods, or its token
+        """
+        token = _get_token(url)
+
+        with self._lock:
+            self._widgets.pop(token, None)
+            self._profiles.pop(token, None)
+            self._live_models.pop(token, None)
+            self._feeds.pop(token, None)
+            event = self._pending.pop(token, None)
+            for key in [k for k in self._cache if k[0] == token]:
+                self._cache_size -= len(self._cache.pop(key))
+
+        if event is not None:
+            event.set()
+
+    def unregister_all(self):
+        """Stop serving the data of all widgets, without stopping the server."""
+        with self._lock:
+            tokens = list(self._widgets) + list(self._profiles)
+            tokens += list(self._live_models) + list(self._feeds)
+
+        for token in tokens:
+            self.unregister(token)
+
+    def shutdown(self):
+        """Stop the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _get_response(self, path):
+        """
+        Get the serialized response of a request path: /<token>/term/<index>,
+        /<token>/sample, or /<token>/samples?after=<seq>.
+
+        Returns:
+            Response bytes, or None if the path is not found
+        """
+        path, _, query = path.partition("?")
+        parts = path.strip("/").split("/")
+
+        if len(parts) == 2 and parts[1] == "samples":
+            return self._get_feed_updates(parts[0], query)
+
+        with self._lock:
+            if len(parts) < 2 or parts[0] not in self._widgets:
+                return None
+            self._widgets.move_to_end(parts[0])
+            model_data = self._widgets[parts[0]][0]
+
+        if parts[1:] == ["sample"]:
+            event = self._pending.get(parts[0])
+            if event is not None:
+                event.wait(SAMPLE_TIMEOUT)
+
+            sample_data = self._widgets.get(parts[0], (None, None))[1]
+            return dumps(sample_data).encode() if sample_data is not None else None
+
+        if len(parts) == 3 and parts[1] == "term" and parts[2].isdigit():
+            index = int(parts[2])
+            if index < len(model_data["features"]):
+                return self._get_term(parts[0], model_data, index)
+
+        return None
+
+    def _get_feed_updates(self, token, query):
+        """Serialize the updates of a feed after the sequence in the query."""
+        feed = self._get_registered(self._feeds, token)
+        after = parse_qs(query).get("after", ["0"])[0]
+
+        if feed is None or not after.isdigit():
+            return None
+
+        return dumps(feed.get_updates(int(after), FEED_TIMEOUT)).encode()
+
+    def _post(self, path, body):
+        """
+        Handle a request posted to /<token>/profile or /<token>/edits.
+
+        Returns:
+            Whether the path is registered and the body is valid
+        """
+        parts = path.strip("/").split("/")
+
+        if len(parts) != 2:
+            return False
+
+        if parts[1] == "profile":
+            return self._post_profile(parts[0], body)
+
+        if parts[1] == "edits":
+            return self._post_edits(parts[0], body)
+
+        return False
+
+    def _post_edits(self, token, body):
+        """Apply the edit deltas posted by a live widget."""
+        live_model = self._get_registered(self._live_models, token)
+
+        if live_model is None:
+            return False
+
+        try:
+            live_model.apply(loads(body))
+        except (KeyError, IndexError, TypeError, ValueError):
+            # Malformed or stale deltas (e.g., unknown features)
+            return False
+
+        return True
+
+    def _post_profile(self, token, body):
+        """Store the timings posted by a widget, once."""
+        profile = self._get_registered(self._profiles, token, pop=True)
+
+        if profile is None:
+            return False
+
+        try:
+            timings = loads(body)
+        except ValueError:
+            return False
+
+        profile.set_widget_timings(timings)
+        return True
+
+    def _get_term(self, token, model_data, index):
+        """Serialize a term, using the LRU cache."""
+        key = (token, index)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        body = dumps(model_data["features"][index]).encode()
+
+        with self._lock:
+            # Skip widgets that are unregistered meanwhile
+            if key not in self._cache and token in self._widgets:
+                self._cache[key] = body
+                self._cache_size += len(body)
+
+            # Evict the least recently used terms
+            while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+                self._cache_size -= len(self._cache.popitem(last=False)[1])
+
+        return body
+
+
+def _get_token(url):
+    """Get the token of a URL returned by the register methods."""
+    path = urlsplit(url).path if "://" in url else url
+    return path.strip("/").split("/")[0]
+
+
+def make_lazy_model_data(model_data, url):
+    """
+    Create the model data that a widget loads up front in the data server
+    mode. It only keeps the feature list and importances, and the widget
+    fetches each term from the server when the user opens it.
+
+    Args:
+        model_data: A dictionary of the EBM model weights.
+        url: The base URL of the widget's data on the data server.
+
+    Returns:
+        A dictionary of the lazy model data
+    """
+    lazy_data = {k: v for k, v in model_data.items() if k != "features"}
+    lazy_data["server"] = url
+    lazy_data["features"] = []
+
+    for feature in model_data["features"]:
+        lazy_feature = {k: feature[k] for k in LAZY_FEATURE_KEYS if k in feature}
+        lazy_feature["lazy"] = True
+        lazy_data["features"].append(lazy_feature)
+
+    return lazy_data
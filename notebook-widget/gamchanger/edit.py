@@ -0,0 +1,344 @@
+"""
+Apply the edits from GAM Changer to EBM models. This module only depends on
+NumPy, so scripts and the batch CLI can edit models without the notebook
+widget's dependencies.
+"""
+
+import numpy as np
+
+from copy import copy, deepcopy
+from operator import itemgetter
+from gamchanger.export import is_export_path, iter_history
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+# Number of decimals of the scores and bin edges that GAM Changer displays
+ROUND = 4
+
+
+def _overwrite_bin_definition(
+    ebm: "ExplainableBoostingClassifier", index_id, new_bins, new_scores
+):
+    """
+    Overwrite the bin definitions and scores for continuous variables.
+
+    Args:
+        ebm: EBM object
+        index_id: Feature's index id in the ebm object
+        new_bins: New bin definition
+        new_score: New bin scores
+
+    In python, to overwrite the bins, we want to overwrite pair
+    `edge[:] with score[2:]` and pair `col_min_ with score [1]`.
+
+    In GAM Changer and EBM.JS, stored bins are `python_label[:-1]` and `python_score[1:]`
+
+    To map GAM Changer and EBM.JS's `newBins`, `newScores` back to Python:
+
+    ```
+    newBins[0] => col_min_
+    newBins[1:] => col_bin_edges_
+
+    newScores[:] => additive_terms_[1:]
+    ```
+
+    We also want to update the standard deviation information:
+
+    Case 1: Bin definition has not changed:
+        We zero out the SDs of bins that have been modified
+
+    Case 2: Bin definition has changed (even just a subset):
+        We zero out all the SDs of bins
+
+    In Python, SDs share the same index as scores.
+    """
+
+    assert len(new_bins) == len(new_scores)
+
+    new_bins = np.asarray(new_bins, dtype=np.float64)
+    new_scores = np.asarray(new_scores, dtype=np.float64)
+    old_scores = ebm.term_scores_[index_id]
+
+    # Check if GAM Changer has changed the bin definition. GAM Changer shows
+    # the edges and scores rounded the same way as np.round()
+    old_edges = ebm.bins_[index_id][0]
+    binDefChanged = len(new_bins) - 1 != len(old_edges) or not np.array_equal(
+        new_bins[1:], np.round(old_edges, ROUND)
+    )
+
+    # Update the SDs
+    if binDefChanged:
+        ebm.standard_deviations_[index_id] = np.zeros(len(new_scores) + 2)
+    else:
+        # Zero out SDs of modified bins
+        modified = np.round(old_scores[1:-1], ROUND) != new_scores
+        ebm.standard_deviations_[index_id][1:-1][modified] = 0
+
+    # Overwrite the scores
+    ebm.term_scores_[index_id] = np.concatenate(
+        ([old_scores[0]], new_scores, [old_scores[-1]])
+    )
+
+    # Overwrite the bin edges
+
+    # GAM Changer won't change the edge for col_min_, because it
+    # will always be one of the end points in any interpolations
+    # So we don't really need to change col_min_, change here for testing purpose
+    ebm.feature_bounds_[index_id][0] = new_bins[0]
+    ebm.bins_[index_id][0] = new_bins[1:].copy()
+
+
+def _overwrite_nominal_scores(
+    ebm: "ExplainableBoostingClassifier", index_id, levels, new_scores
+):
+    """
+    Overwrite the scores of the edited levels for categorical variables.
+
+    Args:
+        ebm: EBM object
+        index_id: Feature's index id in the ebm object
+        levels: Level names
+        new_scores: New level scores
+    """
+    # Use the ebm's mapping to map level name to bin index
+    cur_mapping = ebm.bins_[index_id][0]
+    bin_indexes = np.array([cur_mapping[level] for level in levels], dtype=np.intp)
+    new_scores = np.asarray(new_scores, dtype=np.float64)
+
+    # Only overwrite the scores that GAM Changer has changed
+    scores = ebm.term_scores_[index_id]
+    modified = np.round(scores[bin_indexes], ROUND) != new_scores
+    scores[bin_indexes[modified]] = new_scores[modified]
+
+
+def _read_continuous_points(bin_data):
+    """
+    Read the bin edges and scores of a continuous feature from the pointData
+    of a GAM Changer history entry.
+
+    Args:
+        bin_data: The pointData dictionary of a continuous feature
+
+    Returns:
+        A tuple of (bin_edges, bin_scores) lists
+    """
+    points = list(bin_data.values())
+
+    # bin_data is a linked list, bin_data[0] is guaranteed to be the start
+    # point of all bins. JavaScript objects keep integer keys in ascending
+    # order, so the points are usually stored in the list order already. We
+    # check it with the C-level map() to skip walking the list.
+    if (
+        points[0] is bin_data["0"]
+        and points[-1]["rightPointID"] is None
+        and list(map(itemgetter("rightPointID"), points[:-1]))
+        == list(map(itemgetter("id"), points[1:]))
+    ):
+        bin_edges = list(map(itemgetter("x"), points))
+        bin_scores = list(map(itemgetter("y"), points))
+        return bin_edges, bin_scores
+
+    bin_edges, bin_scores = [], []
+    cur_bin = bin_data["0"]
+
+    while cur_bin["rightPointID"]:
+        bin_edges.append(cur_bin["x"])
+        bin_scores.append(cur_bin["y"])
+        cur_bin = bin_data[str(cur_bin["rightPointID"])]
+
+    # Handle the last bin
+    bin_edges.append(cur_bin["x"])
+    bin_scores.append(cur_bin["y"])
+
+    assert len(bin_edges) == len(bin_data)
+
+    return bin_edges, bin_scores
+
+
+def _read_categorical_points(bin_data):
+    """
+    Read the levels and scores of a categorical feature from the pointData
+    of a GAM Changer history entry.
+
+    Args:
+        bin_data: The pointData dictionary of a categorical feature
+
+    Returns:
+        A tuple of (bin_edges, bin_scores) lists, bin_edges are level strings
+    """
+    bin_edges, bin_scores = [], []
+
+    for k in bin_data:
+        point = bin_data[k]
+        bin_edges.append(point["x"])
+        bin_scores.append(point["y"])
+
+    assert len(bin_edges) == len(bin_scores)
+
+    return bin_edges, bin_scores
+
+
+def _get_edited_feature_indexes(ebm: "ExplainableBoostingClassifier", history):
+    """
+    Get the indexes of features that are modified in a GAM Changer history list.
+
+    Args:
+        ebm: EBM object
+        history: The historyList of a GAM Changer export
+
+    Returns:
+        A sorted list of feature indexes
+    """
+    edited_names = {h["featureName"] for h in history if h["type"] != "original"}
+    return sorted(ebm.feature_names_in_.index(name) for name in edited_names)
+
+
+def _get_latest_edits(history):
+    """
+    Index the latest edit of each feature in a GAM Changer history list. Later
+    edits of a feature overwrite its earlier edits, so the latest edit is all
+    we need to edit a model.
+
+    Args:
+        history: An iterable of history entries
+
+    Returns:
+        A dictionary from feature name to its latest history entry, ordered
+        by the time of the latest edits
+    """
+    latest_edits = {}
+    for entry in history:
+        if entry["type"] != "original":
+            # Move the feature to the end to keep the edit order
+            latest_edits.pop(entry["featureName"], None)
+            latest_edits[entry["featureName"]] = entry
+
+    return latest_edits
+
+
+def _copy_on_write(ebm: "ExplainableBoostingClassifier", feature_indexes):
+    """
+    Create a shallow copy of ebm that shares all arrays with ebm, except the
+    arrays of the given features that edits overwrite in place: their
+    term_scores_, standard_deviations_, and bins_. The term lists and the
+    small feature_bounds_ array are copied so that ebm is never modified.
+
+    Args:
+        ebm: EBM object
+        feature_indexes: Indexes of the features that will be edited
+
+    Returns:
+        A copy of ebm that is safe to edit on the given features
+    """
+    ebm_copy = copy(ebm)
+
+    ebm_copy.term_scores_ = list(ebm.term_scores_)
+    ebm_copy.standard_deviations_ = list(ebm.standard_deviations_)
+    ebm_copy.bins_ = list(ebm.bins_)
+    ebm_copy.feature_bounds_ = deepcopy(ebm.feature_bounds_)
+
+    for i in feature_indexes:
+        ebm_copy.term_scores_[i] = ebm.term_scores_[i].copy()
+        ebm_copy.standard_deviations_[i] = ebm.standard_deviations_[i].copy()
+        ebm_copy.bins_[i] = list(ebm.bins_[i])
+
+    return ebm_copy
+
+
+def _read_history(gamchanger_export):
+    """
+    Get the history list of a GAM Changer export. If the export is a file
+    path, we stream its history entries and only keep the latest edit of each
+    feature, which is all we need to edit a model.
+
+    Args:
+        gamchanger_export: Python dictionary: loaded from the GAM Changer
+            export, or the path to a *.gamchanger file (JSON or compact)
+
+    Returns:
+        A list of history entries
+    """
+    if not is_export_path(gamchanger_export):
+        return gamchanger_export["historyList"]
+
+    return list(_get_latest_edits(iter_history(gamchanger_export)).values())
+
+
+def get_edited_model(
+    ebm: "ExplainableBoostingClassifier", gamchanger_export, copy_on_write=False
+):
+    """
+    Return a copy of ebm that is modified based on the edits from GAM Changer.
+
+    Args:
+        ebm: EBM object
+        gamchanger_export: Python dictionary: loaded from the GAM Changer
+            export (*.gamchanger), or the path to a *.gamchanger file in the
+            JSON or compact format (see gamchanger.export)
+        copy_on_write: If False, return an edited deep copy of ebm. If True,
+            the copy shares all arrays of unedited features with ebm and only
+            copies the arrays of edited features, so the time and memory
+            scale with the number of edited features instead of the model
+            size. Do not modify the shared arrays of either model in place.
+
+    Returns:
+        An edited copy of ebm object.
+    """
+    history = _read_history(gamchanger_export)
+
+    if copy_on_write:
+        ebm_copy = _copy_on_write(ebm, _get_edited_feature_indexes(ebm, history))
+    else:
+        ebm_copy = deepcopy(ebm)
+
+    return edit_model_inplace(ebm_copy, {"historyList": history})
+
+
+def edit_model_inplace(ebm: "ExplainableBoostingClassifier", gamchanger_export):
+    """
+    Modify ebm in place based on the edits from GAM Changer.
+
+    Args:
+        ebm: EBM object
+        gamchanger_export: Python dictionary: loaded from the GAM Changer
+            export (*.gamchanger), or the path to a *.gamchanger file
+
+    Returns:
+        The edited ebm object.
+    """
+    history = _read_history(gamchanger_export)
+
+    # Mapping from feature name to feature index
+    feature_name_to_index = {name: i for i, name in enumerate(ebm.feature_names_in_)}
+
+    # For each modified feature, we overwrite the bin definitions/scores on the
+    # EBM using the latest edit info on that feature.
+    # Note that GAM Changer can only change the bin definitions of continuous features
+    for cur_name, cur_history in _get_latest_edits(history).items():
+        cur_index = feature_name_to_index[cur_name]
+        cur_type = ebm.feature_types_in_[cur_index]
+
+        if cur_type == "continuous":
+            # Collect bin edges and scores
+            bin_edges, bin_scores = _read_continuous_points(
+                cur_history["state"]["pointData"]
+            )
+
+            # Overwrite EBM bin definitions/additive terms with bin_edges and bin_scores
+            _overwrite_bin_definition(ebm, cur_index, bin_edges, bin_scores)
+
+        elif cur_type == "nominal":
+            _overwrite_nominal_scores(
+                ebm,
+                cur_index,
+                *_read_categorical_points(cur_history["state"]["pointData"])
+            )
+
+        else:
+            raise ValueError("Encounter unknown feature type {}".format(cur_type))
+
+    return ebm
@@ -0,0 +1,240 @@
+"""
+Read and write GAM Changer exports (*.gamchanger).
+
+The widget saves an export as one JSON object, where every history entry has
+the complete state of its feature. The compact format stores the same export
+as gzip-compressed JSON lines:
+
+    {"format": "gamchanger-compact", "version": 1}
+    {"field": "modelData", "value": {...}}
+    {"field": "sampleData", "value": {...}}
+    {"entry": {...}}  <- one line per history entry
+
+A history entry stores its state in one of three ways: "state" (the complete
+state), "stateDiff" (the changed points since the previous state of the same
+feature), or "stateRef" (the content hash of an identical earlier state,
+which is marked with "stateKey"). The history entry's own hash is not a hash
+of the state, so we deduplicate states by their content.
+
+Loaders read the compact format line by line, so they only keep the latest
+state of each feature (and the states that are referenced later) in memory.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+FORMAT = "gamchanger-compact"
+FORMAT_VERSION = 1
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _hash_state(state):
+    """Hash a state by its content."""
+    content = json.dumps(state, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+def _diff_state(old_state, new_state):
+    """
+    Create the changes from old_state to new_state. Points are compared one
+    by one, and additiveData is only kept if it has changed.
+    """
+    old_points = old_state.get("pointData", {})
+    new_points = new_state.get("pointData", {})
+
+    diff = {
+        "set": {k: v for k, v in new_points.items() if old_points.get(k) != v},
+        "del": [k for k in old_points if k not in new_points],
+    }
+
+    for key, value in new_state.items():
+        if key != "pointData" and old_state.get(key) != value:
+            diff[key] = value
+
+    return diff
+
+
+def _apply_diff(old_state, diff):
+    """Apply the changes created by _diff_state() to a copy of old_state."""
+    state = {k: v for k, v in old_state.items()}
+    points = dict(old_state.get("pointData", {}))
+
+    for k in diff["del"]:
+        del points[k]
+    points.update(diff["set"])
+    state["pointData"] = points
+
+    for key, value in diff.items():
+        if key not in ("set", "del"):
+            state[key] = value
+
+    return state
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(",", ":"))
+
+
+def save_export(gamchanger_export, path, compresslevel=6):
+    """
+    Save a GAM Changer export in the compact format.
+
+    Args:
+        gamchanger_export: Python dictionary: loaded from the GAM Changer
+            export (*.gamchanger)
+        path: Output file path.
+        compresslevel: gzip compression level (1-9).
+    """
+    history = gamchanger_export.get("historyList", [])
+
+    # Find the states that later entries refer to, so loaders keep them
+    hashes = [_hash_state(entry["state"]) for entry in history]
+    first_index = {}
+    referenced = set()
+
+    for i, h in enumerate(hashes):
+        if h in first_index:
+            referenced.add(first_index[h])
+        else:
+            first_index[h] = i
+
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel) as fp:
+        fp.write(_dumps({"format": FORMAT, "version": FORMAT_VERSION}) + "\n")
+
+        for key, value in gamchanger_export.items():
+            if key != "historyList":
+                fp.write(_dumps({"field": key, "value": value}) + "\n")
+
+        latest_states = {}
+
+        for i, entry in enumerate(history):
+            state = entry["state"]
+            record = {k: v for k, v in entry.items() if k != "state"}
+            previous = latest_states.get(entry["featureName"])
+
+            if first_index[hashes[i]] != i:
+                record["stateRef"] = hashes[i]
+            elif previous is not None:
+                # Only use the diff if it is smaller than the state
+                diff = _diff_state(previous, state)
+                if len(_dumps(diff)) < len(_dumps(state)):
+                    record["stateDiff"] = diff
+                else:
+                    record["state"] = state
+            else:
+                record["state"] = state
+
+            if i in referenced:
+                record["stateKey"] = hashes[i]
+
+            latest_states[entry["featureName"]] = state
+            fp.write(_dumps({"entry": record}) + "\n")
+
+
+def is_compact_export(path):
+    """Check if a file is in the compact format."""
+    with open(path, "rb") as fp:
+        return fp.read(2) == _GZIP_MAGIC
+
+
+def _iter_compact_records(path):
+    """Iterate through the records of a compact export."""
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        header = json.loads(fp.readline())
+
+        if header.get("format") != FORMAT:
+            raise ValueError("{} is not a GAM Changer export".format(path))
+
+        if header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(
+                "{} uses format version {}, please update gamchanger".format(
+                    path, header["version"]
+                )
+            )
+
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _expand_entries(records):
+    """
+    Recover the complete state of each history entry from the compact
+    records.
+    """
+    latest_states = {}
+    kept_states = {}
+
+    for record in records:
+        if "entry" not in record:
+            continue
+
+        entry = record["entry"]
+        name = entry["featureName"]
+
+        if "stateRef" in entry:
+            state = kept_states[entry.pop("stateRef")]
+        elif "stateDiff" in entry:
+            state = _apply_diff(latest_states[name], entry.pop("stateDiff"))
+        else:
+            state = entry["state"]
+
+        if "stateKey" in entry:
+            kept_states[entry.pop("stateKey")] = state
+
+        entry["state"] = state
+        latest_states[name] = state
+
+        yield entry
+
+
+def iter_history(path):
+    """
+    Iterate through the history entries of a GAM Changer export file, with
+    the complete state of each entry. Compact exports are read line by line;
+    JSON exports are loaded as a whole.
+
+    Args:
+        path: Path to a *.gamchanger file in either format.
+
+    Returns:
+        An iterator of history entries
+    """
+    if is_compact_export(path):
+        return _expand_entries(_iter_compact_records(path))
+
+    with open(path, "r") as fp:
+        return iter(json.load(fp)["historyList"])
+
+
+def load_export(path):
+    """
+    Load a GAM Changer export file in either format.
+
+    Args:
+        path: Path to a *.gamchanger file.
+
+    Returns:
+        Python dictionary with the same content as the JSON export
+    """
+    if not is_compact_export(path):
+        with open(path, "r") as fp:
+            return json.load(fp)
+
+    gamchanger_export = {}
+    records = list(_iter_compact_records(path))
+
+    for record in records:
+        if "field" in record:
+            gamchanger_export[record["field"]] = record["value"]
+
+    gamchanger_export["historyList"] = list(_expand_entries(records))
+    return gamchanger_export
+
+
+def is_export_path(gamchanger_export):
+    """Check if a GAM Changer export is given as a file path."""
+    return isinstance(gamchanger_export, (str, bytes, os.PathLike))
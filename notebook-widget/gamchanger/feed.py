@@ -0,0 +1,114 @@
+"""
+Push more samples to an open widget without rendering it again.
+
+When a widget is rendered with visualize(..., sample_feed=feed), it long-polls
+the local data server for the feed's updates. Each update only carries the
+newly encoded rows (see get_sample_data()), and the widget merges them into
+its samples, so the iframe, the bundle, and the edit history stay as they are.
+The widget still rescores all its samples after each update, so only the
+transfer is incremental, not the metrics.
+"""
+
+import threading
+
+from gamchanger.payload import get_sample_data
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+
+class SampleFeed:
+    """
+    A queue of sample updates for the widgets of an EBM.
+
+    Updates are numbered from 1. A widget asks for the updates after the last
+    one it has merged, so widgets opened later also get the earlier updates.
+    A replace drops the updates before it, because no widget needs them.
+
+    Args:
+        ebm: EBM object shown in the widget.
+        resort_categorical: Whether to sort the levels in categorical variable
+            by increasing order if all levels can be converted to numbers. It
+            must be the same as the widget's.
+    """
+
+    def __init__(
+        self,
+        ebm: "ExplainableBoostingClassifier",
+        resort_categorical=False,
+    ):
+        self.ebm = ebm
+        self.resort_categorical = resort_categorical
+        self.seq = 0
+        self._updates = []
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    def append(self, x_test, y_test):
+        """
+        Add samples to the widget's samples.
+
+        Args:
+            x_test: Sample features, in any format that get_sample_data()
+                accepts.
+            y_test: Sample labels.
+
+        Returns:
+            The sequence number of the update
+        """
+        return self._push("append", x_test, y_test)
+
+    def replace(self, x_test, y_test):
+        """
+        Replace the widget's samples.
+
+        Args:
+            x_test: Sample features, in any format that get_sample_data()
+                accepts.
+            y_test: Sample labels.
+
+        Returns:
+            The sequence number of the update
+        """
+        return self._push("replace", x_test, y_test)
+
+    def _push(self, mode, x_test, y_test):
+        # Encode the rows before taking the lock, so polls are not blocked
+        sample_data = get_sample_data(
+            self.ebm,
+            x_test,
+            y_test,
+            resort_categorical=self.resort_categorical,
+            columnar=True,
+        )
+
+        with self._lock:
+            self.seq += 1
+            update = {"seq": self.seq, "mode": mode, "sampleData": sample_data}
+
+            if mode == "replace":
+                self._updates = []
+            self._updates.append(update)
+
+            self._updated.notify_all()
+            return self.seq
+
+    def get_updates(self, after=0, timeout=None):
+        """
+        Get the updates after a sequence number, waiting for one if there is
+        none yet.
+
+        Args:
+            after: Sequence number of the last merged update
+            timeout: Maximum seconds to wait, or None to wait forever
+
+        Returns:
+            A list of updates {"seq", "mode", "sampleData"}, empty if the
+            timeout expires first
+        """
+        with self._lock:
+            self._updated.wait_for(lambda: self.seq > after, timeout)
+            return [u for u in self._updates if u["seq"] > after]
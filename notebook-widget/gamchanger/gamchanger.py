@@ -1,358 +1,154 @@
-import numpy as np
-import pandas as pd
+"""
+The notebook display layer of GAM Changer. It imports IPython, so the package
+only loads this module when visualize() or the other widget functions are
+first used (see gamchanger/__init__.py).
+"""
+
 import random
 import html
 import base64
 import pkgutil
-import warnings
 
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
 from IPython.display import display_html
-from copy import deepcopy
 from json import dump, load, dumps
+from gamchanger.data_server import DataServer, make_lazy_model_data
+from gamchanger.edit import ROUND, get_edited_model, edit_model_inplace  # noqa: F401
+from gamchanger.profiling import VisualizeProfile, _stage, logger
+
+# The payload functions used to live in this module
+from gamchanger.payload import (  # noqa: F401
+    _TYPED_ARRAY_DTYPES,
+    _allocate_sample_budget,
+    _decode_grid,
+    _decode_plateaus,
+    _decode_typed_array,
+    _encode_grid,
+    _encode_plateaus,
+    _encode_typed_array,
+    _resort_categorical_level,
+    get_model_data,
+    get_sample_data,
+)
+
+# Base64 encoded GAM Changer JS bundle. We only read and encode it once.
+_JS_BASE64 = None
+
+# Whether widgets load the JS bundle injected by init_notebook_mode()
+_USE_SHARED_BUNDLE = False
+
+# Local data server for widgets rendered with data_server=True
+_DATA_SERVER = None
+
+# Worker thread of widgets rendered with background=True
+_BACKGROUND_EXECUTOR = None
+
+
+def _get_js_base64():
+    """
+    Read the bundled JS file and encode it with base64. The encoded bundle is
+    cached at the module level, so repeated widgets do not re-read and
+    re-encode the multi-MB file.
 
-# We don't need need interpret  in runtime
-from typing import TYPE_CHECKING
+    Return:
+        Base64 string of the JS bundle
+    """
+    global _JS_BASE64
 
-if TYPE_CHECKING:
-    from interpret.glassbox import ExplainableBoostingClassifier
+    if _JS_BASE64 is None:
+        js_string = pkgutil.get_data(__name__, "gamchanger.js")
+        _JS_BASE64 = base64.b64encode(js_string).decode("utf-8")
 
-ROUND = 4
+    return _JS_BASE64
 
 
-def _resort_categorical_level(col_mapping):
+def init_notebook_mode():
     """
-    Resort the levels in the categorical encoders if all levels can be converted
-    to numbers (integer or float).
+    Inject GAM Changer's JS bundle into the notebook page once. Widgets that
+    are rendered after this call load this shared bundle instead of embedding
+    their own copy, so each additional widget only carries its data.
 
-    Args:
-        col_mapping: the dictionary that maps level string to int
-
-    Returns:
-        New col_mapping if all levels can be converted to numbers, otherwise
-        the original col_mapping
+    The widgets need the output of this call in the same page. After
+    reloading a notebook, make sure this cell's output is rendered (or run
+    it again) before the widgets.
     """
+    global _USE_SHARED_BUNDLE
 
-    def is_number(string):
-        try:
-            float(string)
-            return True
-        except ValueError:
-            return False
-
-    if all(map(is_number, col_mapping.keys())):
-        key_tuples = [(k, float(k)) for k in col_mapping.keys()]
-        sorted_key_tuples = sorted(key_tuples, key=lambda x: x[1])
+    # Store the bundle as a blob URL in the notebook page, so every widget
+    # iframe can load it without decoding its own copy
+    bundle_js = """
+        (function() {{
+            let binary = atob('{js}');
+            let bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < binary.length; i++) {{
+                bytes[i] = binary.charCodeAt(i);
+            }}
+            let blob = new Blob([bytes], {{type: 'text/javascript'}});
+            window.gamchangerBundleURL = URL.createObjectURL(blob);
+        }}())
+    """.format(
+        js=_get_js_base64()
+    )
 
-        new_mapping = {}
-        value = 1
+    display_html("<script>{}</script>".format(bundle_js), raw=True)
+    _USE_SHARED_BUNDLE = True
 
-        for t in sorted_key_tuples:
-            new_mapping[t[0]] = value
-            value += 1
 
-        return new_mapping
+def _get_data_server():
+    """
+    Get the local data server, and start it if it is not running.
+    """
+    global _DATA_SERVER
 
-    else:
-        return col_mapping
+    if _DATA_SERVER is None:
+        _DATA_SERVER = DataServer()
 
+    return _DATA_SERVER
 
-def _get_feature_type(ebm, feature_index):
-    col_type = ebm.feature_types_in_[feature_index]
-    if col_type == "continuous":
-        return "continuous"
-    elif col_type == "nominal":
-        return "categorical"
-    else:
-        raise Exception("Unsupported feature type", col_type)
 
-
-def _get_main_bin_labels(ebm, feature_index):
-    """Returns main effect bin labels for a given feature index.
-    Args:
-        feature_index: An integer for feature index.
-    Returns:
-        List of labels for bins.
+def release_widgets():
     """
-
-    col_type = ebm.feature_types_in_[feature_index]
-    if col_type == "continuous":
-        min_val = ebm.feature_bounds_[feature_index][0]
-        cuts = ebm.bins_[feature_index][0]
-        max_val = ebm.feature_bounds_[feature_index][1]
-        return list(np.concatenate(([min_val], cuts, [max_val])))
-    elif col_type == "nominal":
-        cur_map = ebm.bins_[feature_index][0]
-        return list(cur_map.keys())
-    else:  # pragma: no cover
-        raise Exception("Unknown column type")
-
-
-def _get_pair_bin_labels(ebm, feature_index):
-    """Returns pair interaction effect bin labels for a given feature index.
-    Args:
-        feature_index: An integer for feature index.
-    Returns:
-        List of labels for bins.
+    Free the data of all widgets on the local data server (their models,
+    samples, cached terms, live models, and sample feeds) without stopping
+    it. Widgets that are already open cannot load more data after this call.
+    The server also frees the data of the least recently used widgets on its
+    own when more than gamchanger.data_server.MAX_WIDGETS are open.
     """
+    if _DATA_SERVER is not None:
+        _DATA_SERVER.unregister_all()
 
-    col_type = ebm.feature_types_in_[feature_index]
-    if col_type == "continuous":
-        min_val = ebm.feature_bounds_[feature_index][0]
-        # The first element is main effect bin cuts
-        # If there is a second element, then the pair effect bin cuts are
-        # different and are stored there.
-        if len(ebm.bins_[feature_index]) > 1:
-            cuts = ebm.bins_[feature_index][1]
-        else:
-            cuts = ebm.bins_[feature_index][0]
-        max_val = ebm.feature_bounds_[feature_index][1]
-        return list(np.concatenate(([min_val], cuts, [max_val])))
-    elif col_type == "nominal":
-        cur_map = ebm.bins_[feature_index][0]
-        return list(cur_map.keys())
-    else:  # pragma: no cover
-        raise Exception("Unknown column type")
-
-
-def _get_hist_counts(ebm, feature_index):
-    col_type = ebm.feature_types_in_[feature_index]
-    if col_type == "continuous":
-        return list(ebm.histogram_weights_[feature_index][1:-1])
-    elif col_type == "nominal":
-        return list(ebm.histogram_weights_[feature_index][1:-1])
-    else:  # pragma: no cover
-        raise Exception("Cannot get counts for type: {0}".format(col_type))
-
-
-def _get_hist_edges(ebm, feature_index):
-    col_type = ebm.feature_types_in_[feature_index]
-    if col_type == "continuous":
-        return list(ebm.histogram_edges_[feature_index])
-    elif col_type == "nominal":
-        cur_map = ebm.bins_[feature_index][0]
-        return list(cur_map.keys())
-    else:  # pragma: no cover
-        raise Exception("Cannot get counts for type: {0}".format(col_type))
-
-
-def get_model_data(ebm: "ExplainableBoostingClassifier", resort_categorical=False):
+
+def stop_data_server():
     """
-    Get the model data for GAM Changer.
-    Args:
-        ebm: Trained EBM model. ExplainableBoostingClassifier or
-            ExplainableBoostingRegressor object.
-        resort_categorical: Whether to sort the levels in categorical variable
-            by increasing order if all levels can be converted to numbers.
-    Returns:
-        A Python dictionary of model data
+    Stop the local data server started by visualize(..., data_server=True).
+    Widgets that load data from the server stop working after this call.
     """
+    global _DATA_SERVER
 
-    # Main model info on each feature
-    features = []
-
-    # Track the encoding of categorical feature levels
-    labelEncoder = {}
-
-    # Track the score range
-    score_range = [np.inf, -np.inf]
-
-    for i, term in tqdm(enumerate(ebm.term_features_)):
-        cur_feature = {}
-        cur_feature["importance"] = float(ebm.term_importances()[i])
-
-        # Handle interaction term differently from cont/cat
-        if i >= len(ebm.feature_names_in_):
-            cur_feature["type"] = "interaction"
-
-            cur_id = term
-            cur_feature["id"] = list(cur_id)
-
-            # Info for each individual feature
-            cur_feature["name1"] = ebm.feature_names_in_[cur_id[0]]
-            cur_feature["name2"] = ebm.feature_names_in_[cur_id[1]]
-            cur_feature["name"] = f'{cur_feature["name1"]} x {cur_feature["name2"]}'
-
-            cur_feature["type1"] = _get_feature_type(ebm, cur_id[0])
-            cur_feature["type2"] = _get_feature_type(ebm, cur_id[1])
-
-            # Skip the first item from both dimensions
-            cur_feature["additive"] = np.round(ebm.term_scores_[i], ROUND)[
-                1:-1, 1:-1
-            ].tolist()
-            cur_feature["error"] = np.round(ebm.standard_deviations_[i], ROUND)[
-                1:-1, 1:-1
-            ].tolist()
-
-            # Get the bin label info
-            cur_feature["binLabel1"] = _get_pair_bin_labels(ebm, cur_id[0])
-            cur_feature["binLabel2"] = _get_pair_bin_labels(ebm, cur_id[1])
-
-            # Encode categorical levels as integers
-            if cur_feature["type1"] == "categorical":
-                level_str_to_int = ebm.bins_[cur_id[0]][0]
-                cur_feature["binLabel1"] = list(
-                    map(lambda x: level_str_to_int[x], cur_feature["binLabel1"])
-                )
-
-            if cur_feature["type2"] == "categorical":
-                level_str_to_int = ebm.bins_[cur_id[1]][0]
-                cur_feature["binLabel2"] = list(
-                    map(lambda x: level_str_to_int[x], cur_feature["binLabel2"])
-                )
-
-            # Get density info
-            if cur_feature["type1"] == "categorical":
-                level_str_to_int = ebm.bins_[cur_id[0]][0]
-                cur_feature["histEdge1"] = _get_hist_edges(ebm, cur_id[0])
-                cur_feature["histEdge1"] = list(
-                    map(lambda x: level_str_to_int[x], cur_feature["histEdge1"])
-                )
-            else:
-                cur_feature["histEdge1"] = np.round(
-                    _get_hist_edges(ebm, cur_id[0]), ROUND
-                ).tolist()
-
-            cur_feature["histCount1"] = np.round(
-                _get_hist_counts(ebm, cur_id[0]), ROUND
-            ).tolist()
-
-            if cur_feature["type2"] == "categorical":
-                level_str_to_int = ebm.bins_[cur_id[1]][0]
-                cur_feature["histEdge2"] = _get_hist_edges(ebm, cur_id[1])
-                cur_feature["histEdge2"] = list(
-                    map(lambda x: level_str_to_int[x], cur_feature["histEdge2"])
-                )
-            else:
-                cur_feature["histEdge2"] = np.round(
-                    _get_hist_edges(ebm, cur_id[1]), ROUND
-                ).tolist()
-
-            cur_feature["histCount2"] = np.round(
-                _get_hist_counts(ebm, cur_id[1]), ROUND
-            ).tolist()
-
-        else:
-            # Main effects here
-            cur_feature["name"] = ebm.feature_names_in_[i]
-            cur_feature["type"] = _get_feature_type(ebm, i)
-
-            # Skip the first item (reserved for missing value)
-            cur_feature["additive"] = np.round(ebm.term_scores_[i], ROUND).tolist()[
-                1:-1
-            ]
-            cur_feature["error"] = np.round(
-                ebm.standard_deviations_[i], ROUND
-            ).tolist()[1:-1]
-            cur_id = term[0]
-            cur_feature["id"] = [cur_id]
-            cur_feature["count"] = ebm.bin_weights_[cur_id].tolist()[1:-1]
-
-            # Track the global score range
-            score_range[0] = float(
-                min(
-                    score_range[0],
-                    np.min(ebm.term_scores_[i] - ebm.standard_deviations_[i]),
-                )
-            )
-            score_range[1] = float(
-                max(
-                    score_range[1],
-                    np.max(ebm.term_scores_[i] + ebm.standard_deviations_[i]),
-                )
-            )
+    if _DATA_SERVER is not None:
+        _DATA_SERVER.shutdown()
+        _DATA_SERVER = None
 
-            # Add the binning information for continuous features
-            if cur_feature["type"] == "continuous":
-                # Add the bin information
-                cur_feature["binEdge"] = _get_main_bin_labels(ebm, cur_id)
-
-                # Add the hist information
-                cur_feature["histEdge"] = np.round(
-                    _get_hist_edges(ebm, cur_id), ROUND
-                ).tolist()
-                cur_feature["histCount"] = np.round(
-                    _get_hist_counts(ebm, cur_id), ROUND
-                ).tolist()
-
-            elif cur_feature["type"] == "categorical":
-                # Get the level value mapping
-                level_str_to_int = ebm.bins_[cur_id][0]
-
-                if resort_categorical:
-                    level_str_to_int = _resort_categorical_level(level_str_to_int)
-
-                cur_feature["binLabel"] = list(
-                    map(
-                        lambda x: level_str_to_int[x],
-                        _get_main_bin_labels(ebm, cur_id),
-                    )
-                )
-
-                # Add the hist information
-                # For categorical data, the edges are strings
-                cur_feature["histEdge"] = list(
-                    map(
-                        lambda x: level_str_to_int[x],
-                        _get_hist_edges(ebm, cur_id),
-                    )
-                )
-
-                cur_feature["histCount"] = np.round(
-                    _get_hist_counts(ebm, cur_id), ROUND
-                ).tolist()
-
-                if resort_categorical:
-                    cur_bin_info = list(
-                        zip(
-                            cur_feature["binLabel"],
-                            cur_feature["additive"],
-                            cur_feature["error"],
-                            cur_feature["count"],
-                        )
-                    )
-                    cur_bin_info = sorted(cur_bin_info, key=lambda x: x[0])
-
-                    cur_feature["binLabel"] = [k[0] for k in cur_bin_info]
-                    cur_feature["additive"] = [k[1] for k in cur_bin_info]
-                    cur_feature["error"] = [k[2] for k in cur_bin_info]
-                    cur_feature["count"] = [k[3] for k in cur_bin_info]
-
-                    cur_hist_info = list(
-                        zip(cur_feature["histEdge"], cur_feature["histCount"])
-                    )
-                    cur_hist_info = sorted(cur_hist_info, key=lambda x: x[0])
-
-                    cur_feature["histEdge"] = [k[0] for k in cur_hist_info]
-                    cur_feature["histCount"] = [k[1] for k in cur_hist_info]
-
-                # Add the label encoding information
-                labelEncoder[cur_feature["name"]] = {
-                    str(i): s for s, i in level_str_to_int.items()
-                }
-
-        features.append(cur_feature)
-
-    score_range = list(map(lambda x: round(x, 4), score_range))
-
-    data = {
-        "intercept": float(ebm.intercept_[0])
-        if hasattr(ebm, "classes_")
-        else float(ebm.intercept_),
-        "isClassifier": hasattr(ebm, "classes_"),
-        "features": features,
-        "labelEncoder": labelEncoder,
-        "scoreRange": score_range,
-    }
-
-    return data
-
-
-def get_sample_data(
-    ebm: "ExplainableBoostingClassifier", x_test, y_test, resort_categorical=False
+
+def _make_html(
+    ebm,
+    x_test,
+    y_test,
+    resort_categorical,
+    columnar=False,
+    max_samples=None,
+    sampling="reservoir",
+    data_server=False,
+    compact_grids=False,
+    merge_plateaus=False,
+    profile=None,
+    live=None,
+    sample_feed=None,
 ):
     """
-    Get the sample data for GAM Changer.
+    Function to generate the model and sample data from an EBM, and create an
+    HTML string to bundle GAM Changer's html, css, js, and the data.
+
     Args:
         ebm: Trained EBM model. ExplainableBoostingClassifier or
             ExplainableBoostingRegressor object.
@@ -361,268 +157,103 @@ def get_sample_data(
         y_test: Sample labels. 1D np.ndarray or pd.Series with size = n samples.
         resort_categorical: Whether to sort the levels in categorical variable
             by increasing order if all levels can be converted to numbers.
-    Returns:
-        A Python dictionary of sample data.
-    """
-
-    assert isinstance(x_test, (pd.DataFrame, np.ndarray))
-    assert isinstance(y_test, (pd.Series, np.ndarray))
-
-    feature_names = []
-    feature_types = []
-
-    # Sample data does not record interaction features
-    for i, name in enumerate(ebm.feature_names_in_):
-        feature_names.append(name)
-        feature_types.append(_get_feature_type(ebm, i))
-
-    # Transform the dataframe to object array
-    x_test_copy = deepcopy(x_test)
-    y_test_copy = deepcopy(y_test)
-
-    if isinstance(x_test, pd.DataFrame):
-        x_test_copy = x_test.to_numpy()
-
-    if isinstance(y_test, pd.Series):
-        y_test_copy = y_test.to_numpy()
-
-    # Drop all rows with any NA values
-    if pd.isnull(x_test_copy).any():
-        na_row_indexes = pd.isnull(x_test_copy).any(axis=1)
-        x_test_copy = x_test_copy[~na_row_indexes]
-        y_test_copy = y_test_copy[~na_row_indexes]
-
-        warnings.warn(
-            "Sample data contains missing values. Currently GAM Changer does "
-            + f"not support missing values. Dropped {np.sum(na_row_indexes)} rows with NAs."
-        )
-
-    # Encode the categorical variables as integers
-    for i, cur_type in enumerate(feature_types):
-        if cur_type == "categorical":
-            level_str_to_int = ebm.bins_[i][0]
-
-            if resort_categorical:
-                level_str_to_int = _resort_categorical_level(level_str_to_int)
-
-            def get_level_int(x):
-                if str(x) in level_str_to_int:
-                    return level_str_to_int[str(x)]
-                else:
-                    # Current sample has an unseen level, we label it as max
-                    # level + 1
-                    return max(level_str_to_int.values()) + 1
-
-            x_test_copy[:, i] = list(map(lambda x: get_level_int(x), x_test_copy[:, i]))
-
-    sample_data = {
-        "featureNames": feature_names,
-        "featureTypes": feature_types,
-        "samples": x_test_copy.tolist(),
-        "labels": y_test_copy.tolist(),
-    }
-
-    return sample_data
-
-
-def _overwrite_bin_definition(
-    ebm: "ExplainableBoostingClassifier", index_id, new_bins, new_scores
-):
-    """
-    Overwrite the bin definitions and scores for continuous variables.
-
-    Args:
-        ebm: EBM object
-        index_id: Feature's index id in the ebm object
-        new_bins: New bin definition
-        new_score: New bin scores
-
-    In python, to overwrite the bins, we want to overwrite pair
-    `edge[:] with score[2:]` and pair `col_min_ with score [1]`.
-
-    In GAM Changer and EBM.JS, stored bins are `python_label[:-1]` and `python_score[1:]`
-
-    To map GAM Changer and EBM.JS's `newBins`, `newScores` back to Python:
-
-    ```
-    newBins[0] => col_min_
-    newBins[1:] => col_bin_edges_
+        columnar: Whether to transfer samples as binary columns.
+        max_samples: Maximum number of samples to transfer.
+        sampling: Subsampling method, "reservoir" or "stratified".
+        data_server: Whether to serve the terms and samples from the local
+            data server instead of inlining them.
+        compact_grids: Whether to transfer interaction grids as binary buffers.
+        merge_plateaus: Whether to merge continuous bins with the same score
+            and error into plateaus.
+        profile: A VisualizeProfile to record the stage timings, or None.
+        live: A LiveModel that the widget posts its edits to, or None.
+        sample_feed: A SampleFeed that the widget polls for new samples, or
+            None.
 
-    newScores[:] => additive_terms_[1:]
-    ```
-
-    We also want to update the standard deviation information:
-
-    Case 1: Bin definition has not changed:
-        We zero out the SDs of bins that have been modified
-
-    Case 2: Bin definition has changed (even just a subset):
-        We zero out all the SDs of bins
-
-    In Python, SDs share the same index as scores.
+    Return:
+        HTML code with deferred JS code in base64 format
     """
+    # Generate the model and sample data
+    with _stage(profile, "get_model_data"):
+        model_data = get_model_data(
+            ebm,
+            resort_categorical=resort_categorical,
+            compact_grids=compact_grids,
+            merge_plateaus=merge_plateaus,
+        )
 
-    assert len(new_bins) == len(new_scores)
-
-    # Check if GAM Changer has changed the bin definition
-    binDefChanged = False
-
-    if len(new_bins) - 1 != len(ebm.bins_[index_id][0]):
-        binDefChanged = True
-
-    else:
-        for i in range(1, len(new_bins)):
-            if new_bins[i] != round(ebm.bins_[index_id][0][i - 1], ROUND):
-                binDefChanged = True
-                break
-
-    # Update the SDs
-    if binDefChanged:
-        ebm.standard_deviations_[index_id] = np.zeros(len(new_scores) + 1)
+    if x_test is not None and y_test is not None:
+        with _stage(profile, "get_sample_data"):
+            sample_data = get_sample_data(
+                ebm,
+                x_test,
+                y_test,
+                resort_categorical=resort_categorical,
+                columnar=columnar,
+                max_samples=max_samples,
+                sampling=sampling,
+            )
     else:
-        # Iterate through the scores to zero out SDs of modified bins
-        for i in range(1, len(ebm.term_scores_[index_id]) - 1):
-            if round(ebm.term_scores_[index_id][i], ROUND) != new_scores[i - 1]:
-                ebm.standard_deviations_[index_id][i] = 0
-
-    # Overwrite the scores
-    ebm.term_scores_[index_id] = np.array(
-        [ebm.term_scores_[index_id][0]] + new_scores + [ebm.term_scores_[index_id][-1]]
-    ).astype(np.float64)
-
-    # Overwrite the bin edges
-
-    # GAM Changer won't change the edge for col_min_, because it
-    # will always be one of the end points in any interpolations
-    # So we don't really need to change col_min_, change here for testing purpose
-    ebm.feature_bounds_[index_id][0] = new_bins[0]
-    ebm.bins_[index_id][0] = np.array(new_bins[1:]).astype(np.float64)
-
-
-def get_edited_model(ebm: "ExplainableBoostingClassifier", gamchanger_export):
-    """
-    Return a copy of ebm that is modified based on the edits from GAM Changer.
-
-    Args:
-        ebm: EBM object
-        gamchanger_export: Python dictionary: loaded from the GAM Changer
-            export (*.gamchanger)
-
-    Returns:
-        An edited deep copy of ebm object.
-    """
-    ebm_copy = deepcopy(ebm)
-
-    history = gamchanger_export["historyList"]
+        sample_data = None
 
-    # Mapping from feature name to feature type
-    feature_name_to_type = dict(
-        zip(ebm_copy.feature_names_in_, ebm_copy.feature_types_in_)
+    return _make_html_with_data(
+        model_data,
+        sample_data,
+        data_server=data_server,
+        profile=profile,
+        live=live,
+        sample_feed=sample_feed,
     )
 
-    # Keep track which feature has been updated in ebm_copy
-    updated_features = set()
-
-    # Use the ebm's mapping to map level name to bin index
-    ebm_col_mapping = ebm_copy.bins_
-
-    # We iterate through the history list from the newest edit to the older edit
-    # For each modified feature, we overwrite the bin definitions/scores on an EBM
-    # copy using the latest edit info on that feature.
-    # Note that GAM Changer can only change the bin definitions of continuous features
-
-    for i in range(len(history) - 1, -1, -1):
-        cur_history = history[i]
 
-        # Original edit does not change the graph
-        if cur_history["type"] == "original":
-            continue
-
-        cur_name = cur_history["featureName"]
-        cur_index = ebm_copy.feature_names_in_.index(cur_name)
-
-        # If we have already updated EBM on this feature, skip earlier edits
-        if cur_name in updated_features:
-            continue
-
-        if feature_name_to_type[cur_name] == "continuous":
-            # Collect bin edges and scores
-            bin_data = cur_history["state"]["pointData"]
-            bin_edges, bin_scores = [], []
-
-            # bin_data is a linked list, bin_data[0] is guaranteed to be the start
-            # point of all bins
-            cur_bin = bin_data["0"]
-
-            while cur_bin["rightPointID"]:
-                bin_edges.append(cur_bin["x"])
-                bin_scores.append(cur_bin["y"])
-                cur_bin = bin_data[str(cur_bin["rightPointID"])]
-
-            # Handle the last bin
-            bin_edges.append(cur_bin["x"])
-            bin_scores.append(cur_bin["y"])
-
-            assert len(bin_edges) == len(bin_data)
-
-            # Overwrite EBM bin definitions/additive terms with bin_edges and bin_scores
-            _overwrite_bin_definition(ebm_copy, cur_index, bin_edges, bin_scores)
-            updated_features.add(cur_name)
-
-        elif feature_name_to_type[cur_name] == "nominal":
-            # Get the current level mapping
-            cur_mapping = ebm_col_mapping[cur_index][0]
-
-            # Collect bin edges and scores
-            bin_data = cur_history["state"]["pointData"]
-            bin_edges, bin_scores = [], []
-
-            for k in bin_data:
-                point = bin_data[k]
-                bin_edges.append(point["x"])
-                bin_scores.append(point["y"])
-
-            assert len(bin_edges) == len(bin_scores)
-
-            # Update the additive term
-            for j, edge in enumerate(bin_edges):
-                cur_score = bin_scores[j]
-                cur_bin_index = cur_mapping[edge]
+def _make_html_with_data(
+    model_data,
+    sample_data,
+    data_server=False,
+    profile=None,
+    stream_url=None,
+    live=None,
+    sample_feed=None,
+):
+    """
+    Function to create an HTML string to bundle GAM Changer's html, css, and js.
+    We use base64 to encode the js so that we can use inline defer for <script>
 
-                if (
-                    round(ebm_copy.term_scores_[cur_index][cur_bin_index], ROUND)
-                    != cur_score
-                ):
-                    ebm_copy.term_scores_[cur_index][cur_bin_index] = cur_score
+    We add another script to pass Python data as inline json, and dispatch an
+    event to transfer the data
 
-            updated_features.add(cur_name)
+    If init_notebook_mode() has been called, we do not embed the JS bundle.
+    Instead, a small loader script loads the bundle shared in the notebook
+    page before dispatching the data.
 
-        else:
-            raise ValueError(
-                "Encounter unknown feature type {}".format(
-                    feature_name_to_type[cur_name]
-                )
-            )
+    If data_server is True, we only inline the feature list and importances.
+    The widget fetches the samples and each term from the local data server.
 
-    return ebm_copy
+    If profile is given, we record the time of each stage and the payload
+    sizes. The widget logs its own timings after its first render, and posts
+    them to the local data server if the widget already uses it (we do not
+    start the server only to profile an inline widget).
 
+    If stream_url is given, the widget draws the model first, and then
+    fetches the samples that are still being built from the data server.
 
-def _make_html(ebm, x_test, y_test, resort_categorical):
-    """
-    Function to create an HTML string to bundle GAM Changer's html, css, and js.
-    We use base64 to encode the js so that we can use inline defer for <script>
+    If live is given, the widget posts the latest edit of each feature to the
+    local data server whenever it changes, and the server applies it to live.
 
-    We add another script to pass Python data as inline json, and dispatch an
-    event to transfer the data
+    If sample_feed is given, the widget polls the local data server for the
+    samples pushed to the feed, and merges them into its samples.
 
     Args:
-        ebm: Trained EBM model. ExplainableBoostingClassifier or
-            ExplainableBoostingRegressor object.
-        x_test: Sample features. 2D np.ndarray or pd.DataFrame with dimension [n, k]:
-            n samples and k features.
-        y_test: Sample labels. 1D np.ndarray or pd.Series with size = n samples.
-        resort_categorical: Whether to sort the levels in categorical variable
-            by increasing order if all levels can be converted to numbers.
+        model_data: A dictionary of the EBM model weights.
+        sample_data: A dictionary of the test samples.
+        data_server: Whether to serve the terms and samples from the local
+            data server instead of inlining them.
+        profile: A VisualizeProfile to record the stage timings, or None.
+        stream_url: Base URL of the data registered on the data server with
+            pending samples (sample_data is None), or None.
+        live: A LiveModel that the widget posts its edits to, or None.
+        sample_feed: A SampleFeed that the widget polls for new samples, or
+            None.
 
     Return:
         HTML code with deferred JS code in base64 format
@@ -631,41 +262,131 @@ def _make_html(ebm, x_test, y_test, resort_categorical):
     html_top = """<!DOCTYPE html><html lang="en"><head><meta charset='utf-8'><meta name='viewport' content='width = device-width, initial-scale = 1'><title>GAM Changer</title><style>html,body{position:relative;width:100%;height:100%}body{color:#333;margin:0;padding:0;box-sizing:border-box;font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,Oxygen-Sans,Ubuntu,Cantarell,"Helvetica Neue",sans-serif}a{color:rgb(0,100,200);text-decoration:none}a:hover{text-decoration:underline}a:visited{color:rgb(0,80,160)}label{display:block}input,button,select,textarea{font-family:inherit;font-size:inherit;-webkit-padding:0.4em 0;padding:0.4em;margin:0 0 0.5em 0;box-sizing:border-box;border:1px solid #ccc;border-radius:2px}input:disabled{color:#ccc}</style>"""
     html_bottom = """</head><body></body></html>"""
 
-    # Read the bundled JS file
-    js_string = pkgutil.get_data(__name__, "gamchanger.js")
-    # js_b = bytes(js_string, encoding='utf-8')
+    data = {"model": model_data, "sample": sample_data}
 
-    # Encode the JS & CSS with base 64
-    js_base64 = base64.b64encode(js_string).decode("utf-8")
+    if data_server or stream_url is not None:
+        with _stage(profile, "data_server"):
+            url = stream_url
+            if url is None:
+                url = _get_data_server().register(model_data, sample_data)
 
-    # Generate the model and sample data
-    model_data = get_model_data(ebm, resort_categorical=resort_categorical)
+            if data_server:
+                data["model"] = make_lazy_model_data(model_data, url)
 
-    if x_test is not None and y_test is not None:
-        sample_data = get_sample_data(
-            ebm, x_test, y_test, resort_categorical=resort_categorical
-        )
-    else:
-        sample_data = None
+            if sample_data is not None or stream_url is not None:
+                data["sample"] = None
+                data["sampleURL"] = url + "/sample"
+
+    uses_server = (
+        data_server
+        or stream_url is not None
+        or live is not None
+        or sample_feed is not None
+    )
+
+    if live is not None:
+        data["editURL"] = _get_data_server().register_live(live)
+
+    if sample_feed is not None:
+        data["sampleFeedURL"] = _get_data_server().register_feed(sample_feed)
 
     # Pass the data to GAM Changer using message event
-    data_json = dumps({"model": model_data, "sample": sample_data})
+    with _stage(profile, "json.dumps"):
+        data_json = dumps(data)
+
+    profiler_js = ""
+
+    if profile is not None:
+        profile.add_model_data(model_data)
+        profile.add_section("model", len(dumps(data["model"])))
+        profile.add_section("samples", len(dumps(data["sample"])))
+
+        # The widget reports the time since the iframe started loading (ms)
+        # when the data script starts, after it dispatches the data, and on
+        # the next frame after that
+        post_js = ""
+        if uses_server:
+            post_js = """
+                fetch('{url}', {{method: 'POST', body: JSON.stringify(timings)}})
+                    .catch(() => {{}});
+            """.format(url=_get_data_server().register_profile(profile))
+
+        profiler_js = """
+            let dispatched = performance.now();
+            requestAnimationFrame(() => setTimeout(() => {{
+                let timings = {{
+                    scriptStart: scriptStart,
+                    dispatched: dispatched,
+                    firstRender: performance.now()
+                }};
+                console.log('GAM Changer timings (ms)', timings);
+                {post}
+            }}));
+        """.format(
+            post=post_js
+        )
 
     # Pass data into JS by using another script to dispatch an event
     messenger_js = """
         (function() {{
+            let scriptStart = performance.now();
             let data = {data};
             let event = new Event('gamchangerData');
             event.data = data;
             console.log('before');
             console.log(data);
             document.dispatchEvent(event);
+            {profiler}
         }}())
     """.format(
-        data=data_json
+        data=data_json, profiler=profiler_js
     )
-    messenger_js = messenger_js.encode()
-    messenger_js_base64 = base64.b64encode(messenger_js).decode("utf-8")
+
+    with _stage(profile, "base64 data"):
+        messenger_js = messenger_js.encode()
+        messenger_js_base64 = base64.b64encode(messenger_js).decode("utf-8")
+
+    if _USE_SHARED_BUNDLE:
+        # Load the shared bundle from the notebook page, then pass the data
+        loader_js = """
+            document.addEventListener('DOMContentLoaded', () => {{
+                let bundleURL;
+                try {{
+                    bundleURL = window.parent.gamchangerBundleURL;
+                }} catch (e) {{
+                    bundleURL = undefined;
+                }}
+
+                if (bundleURL === undefined) {{
+                    document.body.textContent = 'Cannot find GAM Changer. ' +
+                        'Run gamchanger.init_notebook_mode() first.';
+                    return;
+                }}
+
+                let bundle = document.createElement('script');
+                bundle.src = bundleURL;
+                bundle.onload = () => {{
+                    let messenger = document.createElement('script');
+                    messenger.src = 'data:text/javascript;base64,{messenger}';
+                    document.head.appendChild(messenger);
+                }};
+                document.head.appendChild(bundle);
+            }});
+        """.format(
+            messenger=messenger_js_base64
+        )
+
+        html_str = html_top + "<script>{}</script>".format(loader_js) + html_bottom
+
+        with _stage(profile, "html.escape"):
+            html_str = html.escape(html_str)
+
+        if profile is not None:
+            profile.add_section("html", len(html_str))
+        return html_str
+
+    with _stage(profile, "base64 bundle"):
+        js_base64 = _get_js_base64()
 
     # Inject the JS to the html template
     html_str = (
@@ -679,67 +400,150 @@ def _make_html(ebm, x_test, y_test, resort_categorical):
         + html_bottom
     )
 
-    return html.escape(html_str)
+    with _stage(profile, "html.escape"):
+        html_str = html.escape(html_str)
 
+    if profile is not None:
+        profile.add_section("bundle", len(js_base64))
+        profile.add_section("html", len(html_str))
+    return html_str
 
-def _make_html_with_data(model_data, sample_data):
-    """
-    Function to create an HTML string to bundle GAM Changer's html, css, and js.
-    We use base64 to encode the js so that we can use inline defer for <script>
 
-    We add another script to pass Python data as inline json, and dispatch an
-    event to transfer the data
+def _make_iframe(html_str):
+    """
+    Wrap the escaped widget HTML in an iframe.
 
     Args:
-        model_data: A dictionary of the EBM model weights.
-        sample_data: A dictionary of the test samples.
+        html_str: Escaped HTML created by _make_html()
 
     Return:
-        HTML code with deferred JS code in base64 format
+        HTML code of the iframe
     """
-    # HTML template for GAM Changer widget
-    html_top = """<!DOCTYPE html><html lang="en"><head><meta charset='utf-8'><meta name='viewport' content='width = device-width, initial-scale = 1'><title>GAM Changer</title><style>html,body{position:relative;width:100%;height:100%}body{color:#333;margin:0;padding:0;box-sizing:border-box;font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,Oxygen-Sans,Ubuntu,Cantarell,"Helvetica Neue",sans-serif}a{color:rgb(0,100,200);text-decoration:none}a:hover{text-decoration:underline}a:visited{color:rgb(0,80,160)}label{display:block}input,button,select,textarea{font-family:inherit;font-size:inherit;-webkit-padding:0.4em 0;padding:0.4em;margin:0 0 0.5em 0;box-sizing:border-box;border:1px solid #ccc;border-radius:2px}input:disabled{color:#ccc}</style>"""
-    html_bottom = """</head><body></body></html>"""
+    # Randomly generate an ID for the iframe to avoid collision
+    iframe_id = "gam-changer-iframe-" + str(int(random.random() * 1e8))
 
-    # Read the bundled JS file
-    js_string = pkgutil.get_data(__name__, "gamchanger.js")
-    # js_b = bytes(js_string, encoding='utf-8')
+    iframe = """
+        <iframe
+            srcdoc="{}"
+            frameBorder="0"
+            width="100%"
+            height="645px"
+            id="{}">
+        </iframe>
+    """.format(
+        html_str, iframe_id
+    )
 
-    # Encode the JS & CSS with base 64
-    js_base64 = base64.b64encode(js_string).decode("utf-8")
+    return iframe
 
-    # Pass the data to GAM Changer using message event
-    data_json = dumps({"model": model_data, "sample": sample_data})
 
-    # Pass data into JS by using another script to dispatch an event
-    messenger_js = """
-        (function() {{
-            let data = {data};
-            let event = new Event('gamchangerData');
-            event.data = data;
-            console.log('before');
-            console.log(data);
-            document.dispatchEvent(event);
-        }}())
+def _make_placeholder(message):
+    """
+    Create the HTML that stands in for the widget while its data is built.
+
+    Args:
+        message: Status message
+
+    Return:
+        HTML code of the placeholder
+    """
+    return """
+        <div style="height: 645px; display: flex; align-items: center;
+            justify-content: center; color: #666; border: 1px solid #e0e0e0;
+            font-family: sans-serif;">
+            GAM Changer: {}
+        </div>
     """.format(
-        data=data_json
+        html.escape(message)
     )
-    messenger_js = messenger_js.encode()
-    messenger_js_base64 = base64.b64encode(messenger_js).decode("utf-8")
 
-    # Inject the JS to the html template
-    html_str = (
-        html_top
-        + """<script defer src='data:text/javascript;base64,{}'></script>""".format(
-            js_base64
+
+def _get_background_executor():
+    """
+    Get the thread that builds the widgets in the background. Widgets are
+    built one at a time in the order of the visualize() calls.
+    """
+    global _BACKGROUND_EXECUTOR
+
+    if _BACKGROUND_EXECUTOR is None:
+        _BACKGROUND_EXECUTOR = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="gamchanger"
         )
-        + """<script defer src='data:text/javascript;base64,{}'></script>""".format(
-            messenger_js_base64
+    return _BACKGROUND_EXECUTOR
+
+
+def _build_in_background(
+    handle,
+    build_model,
+    build_samples,
+    data_server,
+    profile,
+    live=None,
+    sample_feed=None,
+):
+    """
+    Build the widget data in a worker thread and update the placeholder.
+    The model is shown first, and the samples are streamed to the widget from
+    the local data server after they are built.
+
+    Args:
+        handle: IPython DisplayHandle of the placeholder
+        build_model: Function that returns the model data
+        build_samples: Function that returns the sample data, or None if the
+            widget has no samples
+        data_server: Whether to serve the model terms from the data server
+        profile: A VisualizeProfile to record the stage timings, or None.
+        live: A LiveModel that the widget posts its edits to, or None.
+        sample_feed: A SampleFeed that the widget polls for new samples, or
+            None.
+
+    Returns:
+        profile
+    """
+    url = None
+    displayed = False
+
+    try:
+        with _stage(profile, "get_model_data"):
+            model_data = build_model()
+
+        if build_samples is not None:
+            url = _get_data_server().register(model_data, pending_samples=True)
+
+        html_str = _make_html_with_data(
+            model_data,
+            None,
+            data_server=data_server,
+            profile=profile,
+            stream_url=url,
+            live=live,
+            sample_feed=sample_feed,
         )
-        + html_bottom
-    )
 
-    return html.escape(html_str)
+        with _stage(profile, "iframe"):
+            iframe = _make_iframe(html_str)
+
+        with _stage(profile, "display_html"):
+            handle.update({"text/html": iframe}, raw=True)
+        displayed = True
+
+        if build_samples is not None:
+            with _stage(profile, "get_sample_data"):
+                sample_data = build_samples()
+            _get_data_server().set_samples(url, sample_data)
+
+    except Exception as e:
+        if url is not None:
+            _get_data_server().set_samples(url, None)
+
+        # Keep the widget if it already shows the model
+        if not displayed:
+            message = _make_placeholder("failed to build the data: {}".format(e))
+            handle.update({"text/html": message}, raw=True)
+        logger.exception("Failed to build the GAM Changer widget")
+        raise
+
+    return profile
 
 
 def visualize(
@@ -749,6 +553,16 @@ def visualize(
     resort_categorical=False,
     model_data=None,
     sample_data=None,
+    columnar=False,
+    max_samples=None,
+    sampling="reservoir",
+    data_server=False,
+    compact_grids=False,
+    merge_plateaus=False,
+    profile=False,
+    background=False,
+    live=None,
+    sample_feed=None,
 ):
     """
     Render GAM Changer in the output cell.
@@ -763,26 +577,142 @@ def visualize(
         sample_data: Pre-generated sample data in a dictionary
         resort_categorical: Whether to sort the levels in categorical variable
             by increasing order if all levels can be converted to numbers.
+        columnar: Whether to transfer samples to the widget as binary columns
+            instead of a list of rows. It makes the output cell much smaller
+            and the widget faster to load on large sample sets.
+        max_samples: Maximum number of samples to show in the widget. Larger
+            sample data is randomly subsampled in one streaming pass. x_test
+            and y_test can also be iterables of chunks in this case.
+        sampling: "reservoir" for a uniform random subsample, or "stratified"
+            to subsample each label proportionally (classifiers only).
+        data_server: Whether to serve the model terms and samples from a local
+            HTTP server (bound to 127.0.0.1) instead of inlining them in the
+            output cell. The widget first loads the feature list, and fetches
+            each term when you open it. It requires the browser and the kernel
+            to run on the same machine.
+        compact_grids: Whether to transfer the score and error grids of
+            interaction terms as int16 or float32 buffers instead of nested
+            lists. It makes the output cell of models with large interaction
+            terms smaller and faster to parse. The widget decodes all grids
+            to the same 4-decimal values when it builds the model.
+        merge_plateaus: Whether to transfer runs of continuous bins that have
+            the same score and error as one plateau. Boosted shape functions
+            are often flat over many bins, so this makes the main effects
+            smaller. The widget expands the plateaus back to the original
+            bins, and the edits map onto the same bins.
+        profile: Whether to record the time of each stage (payloads,
+            serialization, encoding, display) and the payload size of each
+            section and feature. The stages are also logged to the
+            "gamchanger" logger at the DEBUG level. The widget logs its own
+            timings to the browser console after its first render. If the
+            widget uses the local data server (data_server, background, live,
+            or sample_feed), it also posts them back to profile.widget.
+        background: Whether to build the data in a worker thread, so the
+            notebook stays responsive. It displays a placeholder right away,
+            replaces it with the widget when the model data is ready, and
+            then streams the samples to the widget from the local data server.
+            Like data_server, it requires the browser and the kernel to run on
+            the same machine.
+        live: A LiveModel of ebm (see gamchanger.live). The widget posts the
+            latest edit of each feature to the local data server whenever it
+            changes (commits, undos, redos, and deleted commits), and
+            live.model follows the edits without exporting a file. Like
+            data_server, it requires the browser and the kernel to run on the
+            same machine.
+        sample_feed: A SampleFeed of ebm (see gamchanger.feed). Call
+            sample_feed.append() or sample_feed.replace() to push samples to
+            the open widget. It only sends the new rows, and the widget keeps
+            its edits and history. The widget rescores all its samples on
+            each update, so the update time grows with the total number of
+            samples. Like data_server, it requires the browser and the kernel
+            to run on the same machine.
+
+    Returns:
+        A VisualizeProfile if profile is True, otherwise None. If background
+        is True, a concurrent.futures.Future of that value, which is done
+        when the widget has all its data.
     """
+    if sample_feed is not None and sample_feed.resort_categorical != resort_categorical:
+        raise ValueError(
+            "sample_feed must use the same resort_categorical as the widget."
+        )
+
+    profile = VisualizeProfile() if profile else None
+
+    if background:
+        handle = display_html(
+            _make_placeholder("building the model data..."), raw=True, display_id=True
+        )
+
+        def build_model():
+            if model_data is not None:
+                return model_data
+            return get_model_data(
+                ebm,
+                resort_categorical=resort_categorical,
+                compact_grids=compact_grids,
+                merge_plateaus=merge_plateaus,
+            )
+
+        def build_samples():
+            if sample_data is not None:
+                return sample_data
+            return get_sample_data(
+                ebm,
+                x_test,
+                y_test,
+                resort_categorical=resort_categorical,
+                columnar=columnar,
+                max_samples=max_samples,
+                sampling=sampling,
+            )
+
+        has_samples = sample_data is not None or (
+            model_data is None and x_test is not None and y_test is not None
+        )
+
+        return _get_background_executor().submit(
+            _build_in_background,
+            handle,
+            build_model,
+            build_samples if has_samples else None,
+            data_server,
+            profile,
+            live,
+            sample_feed,
+        )
+
     if model_data is None and sample_data is None:
-        html_str = _make_html(ebm, x_test, y_test, resort_categorical)
+        html_str = _make_html(
+            ebm,
+            x_test,
+            y_test,
+            resort_categorical,
+            columnar=columnar,
+            max_samples=max_samples,
+            sampling=sampling,
+            data_server=data_server,
+            compact_grids=compact_grids,
+            merge_plateaus=merge_plateaus,
+            profile=profile,
+            live=live,
+            sample_feed=sample_feed,
+        )
     else:
-        html_str = _make_html_with_data(model_data, sample_data)
-
-    # Randomly generate an ID for the iframe to avoid collision
-    iframe_id = "gam-changer-iframe-" + str(int(random.random() * 1e8))
+        html_str = _make_html_with_data(
+            model_data,
+            sample_data,
+            data_server=data_server,
+            profile=profile,
+            live=live,
+            sample_feed=sample_feed,
+        )
 
-    iframe = """
-        <iframe
-            srcdoc="{}"
-            frameBorder="0"
-            width="100%"
-            height="645px"
-            id="{}">
-        </iframe>
-    """.format(
-        html_str, iframe_id
-    )
+    with _stage(profile, "iframe"):
+        iframe = _make_iframe(html_str)
 
     # Display the iframe
-    display_html(iframe, raw=True)
+    with _stage(profile, "display_html"):
+        display_html(iframe, raw=True)
+
+    return profile
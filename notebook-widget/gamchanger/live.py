@@ -0,0 +1,186 @@
+"""
+Keep an edited copy of an EBM in the kernel that follows the edits in an open
+widget, without exporting a *.gamchanger file.
+
+When a widget is rendered with visualize(..., live=live_model), it posts each
+change of a feature's latest edit to the local data server as a compact
+delta: the feature name, the entry's type, description, time, and hash, and
+the feature's new bin edges (or levels) and scores. Undoing or deleting all
+edits of a feature posts a delta of type "original". LiveModel applies the
+deltas to its model one feature at a time, so the model is always the same as
+get_edited_model() of the widget's current history list.
+"""
+
+import threading
+
+from gamchanger.edit import (
+    _copy_on_write,
+    _overwrite_bin_definition,
+    _overwrite_nominal_scores,
+)
+from gamchanger.profiling import logger
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+
+class LiveModel:
+    """
+    An edited copy of an EBM that is updated as the user edits it in the
+    widget.
+
+    The model shares the arrays of unedited features with ebm. An update
+    replaces the arrays of the edited feature instead of modifying them in
+    place, so do not modify them either. Updates come from the data server's
+    thread; use snapshot() to get a model that no later update changes.
+
+    Args:
+        ebm: EBM object (the model shown in the widget). It is not modified.
+    """
+
+    def __init__(self, ebm: "ExplainableBoostingClassifier"):
+        self.ebm = ebm
+        self.model = _copy_on_write(ebm, [])
+        self.edits = {}
+        self.version = 0
+        self._index = {name: i for i, name in enumerate(ebm.feature_names_in_)}
+        self._callbacks = []
+        self._apply_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    def apply(self, deltas):
+        """
+        Apply edit deltas posted by the widget.
+
+        Args:
+            deltas: A list of dictionaries with the featureName, type,
+                description, time, and hash of the feature's latest edit, and
+                its edges (bin edges, or level names of categorical features)
+                and scores. The type "original" resets the feature.
+
+        Returns:
+            The model version after the update
+        """
+        with self._apply_lock:
+            for delta in deltas:
+                self._apply_delta(delta)
+
+        return self.version
+
+    def _apply_delta(self, delta):
+        i = self._index[delta["featureName"]]
+
+        # Edit a copy of the original feature, the same way as
+        # get_edited_model()
+        if delta["type"] == "original":
+            edited = self.ebm
+        else:
+            edited = _copy_on_write(self.ebm, [i])
+            if self.ebm.feature_types_in_[i] == "continuous":
+                _overwrite_bin_definition(edited, i, delta["edges"], delta["scores"])
+            else:
+                _overwrite_nominal_scores(edited, i, delta["edges"], delta["scores"])
+
+        with self._lock:
+            self.model.term_scores_[i] = edited.term_scores_[i]
+            self.model.standard_deviations_[i] = edited.standard_deviations_[i]
+            self.model.bins_[i] = edited.bins_[i]
+            self.model.feature_bounds_[i] = edited.feature_bounds_[i]
+
+            # Keep the features in the order of their latest edits
+            self.edits.pop(delta["featureName"], None)
+            if delta["type"] != "original":
+                self.edits[delta["featureName"]] = delta
+
+            self.version += 1
+            self._updated.notify_all()
+
+        for callback in list(self._callbacks):
+            try:
+                callback(delta["featureName"], self)
+            except Exception:
+                logger.exception("A LiveModel callback failed")
+
+    def observe(self, callback):
+        """
+        Call a function after each update.
+
+        Args:
+            callback: Function called with the feature name and this
+                LiveModel, from the data server's thread
+        """
+        self._callbacks.append(callback)
+
+    def wait(self, version, timeout=None):
+        """
+        Wait until the model reaches a version.
+
+        Args:
+            version: Model version (the number of applied deltas)
+            timeout: Maximum seconds to wait, or None to wait forever
+
+        Returns:
+            Whether the model has reached the version
+        """
+        with self._lock:
+            return self._updated.wait_for(lambda: self.version >= version, timeout)
+
+    def snapshot(self):
+        """
+        Returns:
+            A copy of the current model that shares its arrays, and is not
+            changed by later updates
+        """
+        with self._lock:
+            return _copy_on_write(self.model, [])
+
+    def to_export(self):
+        """
+        Create a GAM Changer export of the latest edit of each feature.
+
+        Returns:
+            A Python dictionary with the historyList. get_edited_model() of
+            this export gives the same model.
+        """
+        with self._lock:
+            edits = list(self.edits.values())
+
+        history = []
+        for delta in edits:
+            i = self._index[delta["featureName"]]
+            edges, scores = delta["edges"], delta["scores"]
+
+            if self.ebm.feature_types_in_[i] == "continuous":
+                point_data = {
+                    str(j): {
+                        "x": x,
+                        "y": y,
+                        "id": j,
+                        "leftPointID": j - 1 if j > 0 else None,
+                        "rightPointID": j + 1 if j < len(edges) - 1 else None,
+                    }
+                    for j, (x, y) in enumerate(zip(edges, scores))
+                }
+            else:
+                levels = self.ebm.bins_[i][0]
+                point_data = {
+                    str(levels[x]): {"x": x, "y": y, "id": levels[x]}
+                    for x, y in zip(edges, scores)
+                }
+
+            entry = {k: delta.get(k) for k in ["type", "description", "time", "hash"]}
+            entry.update(
+                {
+                    "state": {"pointData": point_data, "additiveData": []},
+                    "metrics": {},
+                    "featureName": delta["featureName"],
+                    "reviewed": True,
+                }
+            )
+            history.append(entry)
+
+        return {"historyList": history}
@@ -0,0 +1,132 @@
+"""
+Record where the time and bytes of a GAM Changer widget go.
+
+visualize(..., profile=True) returns a VisualizeProfile with the wall time of
+each stage (generating the payloads, serializing them, encoding and escaping
+the HTML, displaying the iframe) and the payload size of each section and
+feature. Each stage is also logged to the "gamchanger" logger at the DEBUG
+level, so a logging handler can collect the timings of every widget.
+"""
+
+import logging
+import time
+
+from contextlib import contextmanager, nullcontext
+from json import dumps
+
+logger = logging.getLogger("gamchanger")
+
+
+class VisualizeProfile:
+    """
+    Stage timings and payload sizes of one visualize() call.
+
+    Attributes:
+        stages: A list of {"stage", "time"} dictionaries (seconds), in the
+            order the stages ran
+        sections: Payload bytes of each section, e.g., model, samples, bundle
+        features: A list of {"name", "type", "bytes"} dictionaries, the
+            serialized size of each term in the model data
+        widget: Timings (milliseconds) that the widget posts back after its
+            first render, or None before the widget has rendered. Inline
+            widgets do not post their timings, so it stays None.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.sections = {}
+        self.features = []
+        self.widget = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage with a `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append({"stage": name, "time": elapsed})
+            logger.debug("visualize stage %s: %.2f ms", name, elapsed * 1000)
+
+    def add_section(self, name, size):
+        """Record the size (bytes) of a payload section."""
+        self.sections[name] = self.sections.get(name, 0) + size
+        logger.debug("visualize section %s: %d bytes", name, size)
+
+    def add_model_data(self, model_data):
+        """Record the serialized size of each term in the model data."""
+        self.features = [
+            {
+                "name": feature["name"],
+                "type": feature["type"],
+                "bytes": len(dumps(feature)),
+            }
+            for feature in model_data["features"]
+        ]
+
+    def set_widget_timings(self, timings):
+        """Store the timings posted by the widget."""
+        self.widget = timings
+        logger.debug("widget timings: %s", timings)
+
+    @property
+    def total_time(self):
+        """Total time of all stages (seconds)."""
+        return sum(s["time"] for s in self.stages)
+
+    def to_dict(self):
+        """
+        Returns:
+            A JSON-serializable dictionary of the profile
+        """
+        return {
+            "stages": self.stages,
+            "totalTime": self.total_time,
+            "sections": self.sections,
+            "features": self.features,
+            "widget": self.widget,
+        }
+
+    def summary(self, n_features=5):
+        """
+        Summarize the profile as text.
+
+        Args:
+            n_features: Number of the largest features to list
+
+        Returns:
+            A multi-line string
+        """
+        lines = ["{:<28} {:>12}".format("stage", "time")]
+        for s in self.stages:
+            lines.append("{:<28} {:>9.2f} ms".format(s["stage"], s["time"] * 1000))
+        lines.append("{:<28} {:>9.2f} ms".format("total", self.total_time * 1000))
+
+        lines.append("")
+        lines.append("{:<28} {:>12}".format("section", "size"))
+        for name, size in self.sections.items():
+            lines.append("{:<28} {:>9.1f} kB".format(name, size / 1024))
+
+        if self.features:
+            lines.append("")
+            lines.append("{:<28} {:>12}".format("largest features", "size"))
+            largest = sorted(self.features, key=lambda f: f["bytes"], reverse=True)
+            for f in largest[:n_features]:
+                lines.append("{:<28} {:>9.1f} kB".format(f["name"], f["bytes"] / 1024))
+
+        if self.widget is not None:
+            lines.append("")
+            lines.append("{:<28} {:>12}".format("widget", "time"))
+            for name, value in self.widget.items():
+                lines.append("{:<28} {:>9.2f} ms".format(name, value))
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.summary()
+
+
+def _stage(profile, name):
+    """Time a stage if profile is a VisualizeProfile, otherwise do nothing."""
+    return profile.stage(name) if profile is not None else nullcontext()
@@ -0,0 +1,397 @@
+"""
+Replay the edits of a GAM Changer history list on a full dataset, and compute
+the metrics after every step.
+
+Each step of a history list only changes one feature. Instead of scoring the
+whole model again, we bin every edited feature once, keep each row's score,
+and only update the rows in the bins that a step changes. Metrics are updated
+with the changed rows as well.
+
+If a continuous feature's bins_ has a single entry, its interaction terms use
+the same bins, so re-binning the feature also re-scores those terms (the same
+as get_edited_model()).
+"""
+
+import numpy as np
+
+from gamchanger.edit import (
+    ROUND,
+    _get_edited_feature_indexes,
+    _read_categorical_points,
+    _read_continuous_points,
+)
+from gamchanger.export import is_export_path, iter_history
+from gamchanger.scoring import CHUNK_SIZE, ScoringEngine
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+
+def replay_history(
+    ebm: "ExplainableBoostingClassifier", gamchanger_export, x, y, chunk_size=CHUNK_SIZE
+):
+    """
+    Compute the metrics of every step in a GAM Changer history list. The
+    metrics of step k are the metrics of the model that get_edited_model()
+    returns for the first k + 1 history entries.
+
+    A step finds and re-scores only the rows in the bins it changes, so
+    RMSE, MAE, MAPE, and the confusion matrix cost time proportional to those
+    rows. ROC AUC keeps the scores of each label in one sorted array, so a
+    step also moves that array in memory once (a linear copy, but much
+    cheaper than scoring and sorting all rows again). A step that changes
+    the bin definition of a continuous feature re-bins that feature, and the
+    first edit of a continuous feature touches all its bins, because
+    get_edited_model() rounds all its scores.
+
+    Args:
+        ebm: EBM object (the original model the history list starts from)
+        gamchanger_export: Python dictionary: loaded from the GAM Changer
+            export (*.gamchanger), or the path to a *.gamchanger file
+        x: 2D np.ndarray or pd.DataFrame of samples. It is kept in memory to
+            re-bin features.
+        y: 1D np.ndarray or pd.Series of labels.
+        chunk_size: Number of rows to score at once for the original model.
+
+    Returns:
+        A list with one dictionary per history entry: the entry's step,
+        featureName, type, description, the number of changedRows, and the
+        metrics (same keys as ScoringEngine.evaluate()).
+    """
+    if is_export_path(gamchanger_export):
+        history = list(iter_history(gamchanger_export))
+    else:
+        history = gamchanger_export["historyList"]
+
+    engine = ScoringEngine.from_ebm(ebm)
+    y = np.asarray(y)
+
+    if engine.is_classifier:
+        y = y == engine.classes[1]
+        metrics = _ClassificationReplay(y)
+    else:
+        metrics = _RegressionReplay(y.astype(np.float64))
+
+    scores = engine.score(x, chunk_size)
+    metrics.reset(scores)
+
+    # Bin the edited features once, and track their current bins and scores
+    columns = engine._get_columns(x)
+    features = {}
+
+    for i in _get_edited_feature_indexes(ebm, history):
+        features[i] = _FeatureState(
+            engine.bin_feature(i, columns[i]), np.array(ebm.term_scores_[i])
+        )
+
+    # Interaction terms of the continuous features that share their main bins
+    shared_pairs = {
+        i: [t for t, (f, _) in enumerate(engine.terms) if len(f) > 1 and i in f]
+        for i in features
+        if engine.feature_types[i] == "continuous"
+        and engine.pair_bins[i] is engine.main_bins[i]
+    }
+    pair_bins = {}
+
+    def get_pair_bins(j):
+        if j in shared_pairs:
+            return features[j].bins
+        if j not in pair_bins:
+            pair_bins[j] = engine.bin_feature(j, columns[j], pair=True)
+        return pair_bins[j]
+
+    table = []
+
+    for step, cur_history in enumerate(history):
+        rows = np.zeros(0, dtype=np.intp)
+
+        if cur_history["type"] != "original":
+            i = ebm.feature_names_in_.index(cur_history["featureName"])
+            point_data = cur_history["state"]["pointData"]
+
+            if ebm.feature_types_in_[i] == "continuous":
+                rows, row_deltas = _replay_continuous(
+                    engine,
+                    features[i],
+                    i,
+                    columns[i],
+                    point_data,
+                    shared_pairs.get(i, []),
+                    get_pair_bins,
+                )
+            else:
+                rows, row_deltas = _replay_categorical(
+                    engine, features[i], i, point_data
+                )
+
+            old_scores = scores[rows]
+            new_scores = old_scores + row_deltas
+            metrics.update(rows, old_scores, new_scores)
+            scores[rows] = new_scores
+
+        result = {
+            "step": step,
+            "featureName": cur_history["featureName"],
+            "type": cur_history["type"],
+            "description": cur_history.get("description"),
+            "changedRows": len(rows),
+        }
+        result.update(metrics.result())
+        table.append(result)
+
+    return table
+
+
+class _FeatureState:
+    """
+    The current bins and scores of an edited main effect feature, and its
+    rows grouped by bins.
+    """
+
+    def __init__(self, bins, scores):
+        self.scores = scores
+        self.set_bins(bins)
+
+    def set_bins(self, bins):
+        # Bins fit in small ints, so NumPy sorts them with a radix sort
+        dtype = np.uint8 if len(self.scores) <= 2**8 else np.uint16
+        if len(self.scores) > 2**16:
+            dtype = np.intp
+        self.bins = bins.astype(dtype)
+        self._order = None
+
+    def get_rows(self, bin_indexes):
+        """Get the rows in the given bins."""
+        if self._order is None:
+            self._order = np.argsort(self.bins, kind="stable")
+            counts = np.bincount(self.bins, minlength=len(self.scores))
+            self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        return np.concatenate(
+            [self._order[self._offsets[b] : self._offsets[b + 1]] for b in bin_indexes]
+            + [np.zeros(0, dtype=np.intp)]
+        )
+
+    def get_deltas(self, new_scores):
+        """Get the changed rows and their score changes."""
+        deltas = new_scores - self.scores
+        bin_indexes = np.flatnonzero(deltas)
+
+        rows = self.get_rows(bin_indexes)
+        counts = self._offsets[bin_indexes + 1] - self._offsets[bin_indexes]
+
+        self.scores = new_scores
+        return rows, np.repeat(deltas[bin_indexes], counts)
+
+
+def _replay_continuous(
+    engine, feature, index, column, point_data, pair_terms=(), get_pair_bins=None
+):
+    """
+    Apply a continuous feature's history entry, the same way as
+    _overwrite_bin_definition().
+
+    Args:
+        pair_terms: Indexes of the interaction terms that use the feature's
+            main bins, which are re-scored when the feature is re-binned.
+        get_pair_bins: Function that returns the current interaction bin
+            indexes of a feature.
+
+    Returns:
+        A tuple of (rows, row_deltas)
+    """
+    bin_edges, bin_scores = _read_continuous_points(point_data)
+    new_cuts = np.array(bin_edges[1:], dtype=np.float64)
+    new_scores = np.array(
+        [feature.scores[0]] + bin_scores + [feature.scores[-1]], dtype=np.float64
+    )
+
+    if np.array_equal(new_cuts, engine.main_bins[index]):
+        return feature.get_deltas(new_scores)
+
+    # The bin definition has changed, so we re-bin this feature
+    engine.main_bins[index] = new_cuts
+    new_bins = engine.bin_feature(index, column)
+
+    row_deltas = new_scores[new_bins] - feature.scores[feature.bins]
+
+    for t in pair_terms:
+        features, scores = engine.terms[t]
+        old_indexes = tuple(
+            feature.bins if j == index else get_pair_bins(j) for j in features
+        )
+        new_indexes = tuple(
+            new_bins if j == index else get_pair_bins(j) for j in features
+        )
+        row_deltas += scores[new_indexes] - scores[old_indexes]
+
+    if pair_terms:
+        engine.pair_bins[index] = new_cuts
+
+    rows = np.flatnonzero(row_deltas)
+
+    feature.scores = new_scores
+    feature.set_bins(new_bins)
+
+    return rows, row_deltas[rows]
+
+
+def _replay_categorical(engine, feature, index, point_data):
+    """
+    Apply a categorical feature's history entry, the same way as
+    edit_model_inplace().
+
+    Returns:
+        A tuple of (rows, row_deltas)
+    """
+    cur_mapping = engine.main_bins[index]
+    new_scores = feature.scores.copy()
+
+    for edge, cur_score in zip(*_read_categorical_points(point_data)):
+        cur_bin_index = cur_mapping[edge]
+        if round(new_scores[cur_bin_index], ROUND) != cur_score:
+            new_scores[cur_bin_index] = cur_score
+
+    return feature.get_deltas(new_scores)
+
+
+def _count_below(sorted_values, values):
+    """
+    Count the sorted values that are smaller than each value (ties count as
+    0.5), and sum the counts.
+    """
+    # Binary searches are much faster with sorted keys
+    values = np.sort(values)
+    left = np.searchsorted(sorted_values, values, side="left")
+    right = np.searchsorted(sorted_values, values, side="right")
+    return (left.sum() + right.sum()) / 2
+
+
+def _replace_sorted(sorted_values, old_values, new_values):
+    """
+    Remove old_values from a sorted array and insert new_values.
+    """
+    old_values = np.sort(old_values)
+    start = np.searchsorted(sorted_values, old_values, side="left")
+
+    # Equal old values take consecutive positions
+    first = np.searchsorted(old_values, old_values, side="left")
+    kept = np.delete(sorted_values, start + np.arange(len(old_values)) - first)
+
+    new_values = np.sort(new_values)
+    return np.insert(kept, np.searchsorted(kept, new_values), new_values)
+
+
+class _ClassificationReplay:
+    """
+    Update the confusion matrix and the ROC AUC as scores change.
+
+    ROC AUC is the Mann-Whitney U statistic (the number of correctly ordered
+    positive-negative pairs) divided by the number of pairs. We keep the
+    scores of positive and negative samples sorted, so we can update U with
+    binary searches for the changed rows only.
+    """
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def reset(self, scores):
+        self.pos = np.sort(scores[self.labels])
+        self.neg = np.sort(scores[~self.labels])
+        self.u = _count_below(self.neg, self.pos)
+
+        predictions = scores >= 0
+        self.confusion_matrix = np.zeros(4, dtype=np.int64)
+        self._update_confusion_matrix(predictions, self.labels, 1)
+
+    def _update_confusion_matrix(self, predictions, labels, sign):
+        self.confusion_matrix += sign * np.array(
+            [
+                np.count_nonzero(~predictions & ~labels),
+                np.count_nonzero(~predictions & labels),
+                np.count_nonzero(predictions & ~labels),
+                np.count_nonzero(predictions & labels),
+            ]
+        )
+
+    def _count_changed_pairs(self, pos_values, neg_values):
+        return _count_below(np.sort(neg_values), pos_values)
+
+    def _count_pairs(self, pos_values, neg_values):
+        # Pairs of the changed rows with all rows of the other label
+        return (
+            _count_below(self.neg, pos_values)
+            + len(neg_values) * len(self.pos)
+            - _count_below(self.pos, neg_values)
+        )
+
+    def update(self, rows, old_scores, new_scores):
+        if len(rows) == 0:
+            return
+
+        labels = self.labels[rows]
+
+        self._update_confusion_matrix(old_scores >= 0, labels, -1)
+        self._update_confusion_matrix(new_scores >= 0, labels, 1)
+
+        # U = pairs(changed pos, all neg) + pairs(all pos, changed neg)
+        #     - pairs(changed pos, changed neg) + pairs of unchanged rows
+        old_pos, old_neg = old_scores[labels], old_scores[~labels]
+        new_pos, new_neg = new_scores[labels], new_scores[~labels]
+
+        self.u -= self._count_pairs(old_pos, old_neg)
+        self.u += self._count_changed_pairs(old_pos, old_neg)
+
+        self.pos = _replace_sorted(self.pos, old_pos, new_pos)
+        self.neg = _replace_sorted(self.neg, old_neg, new_neg)
+
+        self.u += self._count_pairs(new_pos, new_neg)
+        self.u -= self._count_changed_pairs(new_pos, new_neg)
+
+    def result(self):
+        tn, fn, fp, tp = self.confusion_matrix.tolist()
+        n_pos, n_neg = len(self.pos), len(self.neg)
+        recalls = [tp / n_pos if n_pos else None, tn / n_neg if n_neg else None]
+        recalls = [r for r in recalls if r is not None]
+
+        return {
+            "accuracy": (tp + tn) / (n_pos + n_neg) if n_pos + n_neg else None,
+            "rocAuc": float(self.u / (n_pos * n_neg)) if n_pos and n_neg else None,
+            "balancedAccuracy": sum(recalls) / len(recalls) if recalls else None,
+            "confusionMatrix": [tn, fn, fp, tp],
+        }
+
+
+class _RegressionReplay:
+    """Update the sums of RMSE, MAE, and MAPE as predictions change."""
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def _sum_errors(self, predictions, labels):
+        errors = np.abs(labels - predictions)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentage_errors = errors / np.abs(labels)
+        return np.array([np.dot(errors, errors), errors.sum(), percentage_errors.sum()])
+
+    def reset(self, predictions):
+        self.sums = self._sum_errors(predictions, self.labels)
+
+    def update(self, rows, old_predictions, new_predictions):
+        labels = self.labels[rows]
+        self.sums -= self._sum_errors(old_predictions, labels)
+        self.sums += self._sum_errors(new_predictions, labels)
+
+    def result(self):
+        n = len(self.labels)
+        if n == 0:
+            return {"rmse": None, "mae": None, "mape": None}
+
+        return {
+            "rmse": float(np.sqrt(max(self.sums[0], 0) / n)),
+            "mae": float(self.sums[1] / n),
+            "mape": float(self.sums[2] / n),
+        }
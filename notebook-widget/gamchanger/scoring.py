@@ -0,0 +1,513 @@
+"""
+Score EBM models and compute the metrics that GAM Changer shows with NumPy.
+
+The browser scorer only sees the samples embedded in the widget. This module
+scores any number of rows in chunks, so we can evaluate an edited model on a
+full dataset without interpret. It only depends on NumPy.
+"""
+
+import numpy as np
+
+from gamchanger.payload import _decode_grid, _decode_plateaus
+
+# We don't need interpret in runtime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from interpret.glassbox import ExplainableBoostingClassifier
+
+# Number of rows scored at once
+CHUNK_SIZE = 100000
+
+# Level strings that mean missing values after converting a column to strings
+_MISSING_LEVELS = {"nan", "None", "NaN", "<NA>", "NaT"}
+
+
+class ScoringEngine:
+    """
+    A NumPy scorer of an additive model (main effects and pairwise
+    interactions). Continuous values are binned with np.searchsorted on the
+    bin cuts, categorical levels are looked up in the level mapping, and the
+    scores of all terms are gathered and summed.
+
+    Like EBM, every term's scores are indexed by bins where index 0 is
+    reserved for missing values and the last index for unknown levels.
+
+    Use ScoringEngine.from_ebm() or ScoringEngine.from_model_data() to create
+    an engine.
+
+    Args:
+        feature_names: List of feature names.
+        feature_types: List of feature types, "continuous" or "nominal".
+        main_bins: List of each feature's main effect bins: the bin cuts (1D
+            np.ndarray) of a continuous feature, or the dictionary that maps
+            level strings to bin indexes of a categorical feature.
+        pair_bins: List of each feature's bins in interaction terms.
+        terms: List of (feature indexes, scores) tuples. The scores of a main
+            effect is a 1D np.ndarray, and the scores of an interaction is a
+            2D np.ndarray.
+        intercept: The intercept of the model.
+        classes: The class labels of a binary classifier, or None for a
+            regressor.
+    """
+
+    def __init__(
+        self,
+        feature_names,
+        feature_types,
+        main_bins,
+        pair_bins,
+        terms,
+        intercept,
+        classes=None,
+    ):
+        self.feature_names = list(feature_names)
+        self.feature_types = list(feature_types)
+        self.main_bins = main_bins
+        self.pair_bins = pair_bins
+        self.terms = [
+            (tuple(features), np.asarray(scores, dtype=np.float64))
+            for features, scores in terms
+        ]
+        self.intercept = float(intercept)
+        self.classes = None if classes is None else np.asarray(classes)
+
+    @property
+    def is_classifier(self):
+        return self.classes is not None
+
+    @classmethod
+    def from_ebm(cls, ebm: "ExplainableBoostingClassifier"):
+        """
+        Create a scoring engine from an EBM (e.g., an edited model returned
+        by get_edited_model()).
+
+        Args:
+            ebm: EBM object
+
+        Returns:
+            A ScoringEngine
+        """
+        is_classifier = hasattr(ebm, "classes_")
+
+        return cls(
+            feature_names=ebm.feature_names_in_,
+            feature_types=ebm.feature_types_in_,
+            main_bins=[b[0] for b in ebm.bins_],
+            pair_bins=[b[-1] for b in ebm.bins_],
+            terms=list(zip(ebm.term_features_, ebm.term_scores_)),
+            intercept=ebm.intercept_[0] if is_classifier else ebm.intercept_,
+            classes=ebm.classes_ if is_classifier else None,
+        )
+
+    @classmethod
+    def from_model_data(cls, model_data):
+        """
+        Create a scoring engine from the model data of GAM Changer (the output
+        of get_model_data(), or the modelData of a *.gamchanger export).
+
+        The model data do not have the scores of missing values and unknown
+        levels, so they score 0. Categorical levels are decoded with the
+        labelEncoder, and a binary classifier's classes are [0, 1]. Merged
+        plateaus (get_model_data(..., merge_plateaus=True)) are expanded back
+        to one score per bin, and compact grids (compact_grids=True) are
+        decoded.
+
+        Args:
+            model_data: A dictionary of the EBM model weights.
+
+        Returns:
+            A ScoringEngine
+        """
+        features = model_data["features"]
+        main_features = [f for f in features if f["type"] != "interaction"]
+
+        feature_names, feature_types, main_bins, pair_bins = [], [], [], []
+        terms = []
+
+        for i, feature in enumerate(main_features):
+            feature_names.append(feature["name"])
+            additive = np.asarray(feature["additive"], dtype=np.float64)
+
+            if "plateaus" in feature:
+                additive, _ = _decode_plateaus(
+                    additive, feature["error"], feature["plateaus"]
+                )
+
+            if feature["type"] == "continuous":
+                feature_types.append("continuous")
+                main_bins.append(np.asarray(feature["binEdge"][1:-1], np.float64))
+                pair_bins.append(main_bins[-1])
+            else:
+                feature_types.append("nominal")
+
+                # The scores follow the order of binLabel, which may be resorted
+                label_encoder = model_data["labelEncoder"][feature["name"]]
+                main_bins.append(
+                    {
+                        label_encoder[str(label)]: j + 1
+                        for j, label in enumerate(feature["binLabel"])
+                    }
+                )
+                pair_bins.append(main_bins[-1])
+
+            terms.append(((i,), np.pad(additive, 1)))
+
+        for feature in features:
+            if feature["type"] != "interaction":
+                continue
+
+            ids = feature["id"]
+            for axis, feature_index in enumerate(ids):
+                labels = feature["binLabel{}".format(axis + 1)]
+                if feature_types[feature_index] == "continuous":
+                    pair_bins[feature_index] = np.asarray(labels[1:-1], np.float64)
+                else:
+                    # Interaction bin labels are encoded with the labelEncoder
+                    # too (resorted or not), in the grid's level order
+                    label_encoder = model_data["labelEncoder"][
+                        feature_names[feature_index]
+                    ]
+                    pair_bins[feature_index] = {
+                        label_encoder[str(label)]: j + 1
+                        for j, label in enumerate(labels)
+                    }
+
+            additive = feature["additive"]
+            if isinstance(additive, dict):
+                # get_model_data(..., compact_grids=True)
+                additive = _decode_grid(additive)
+
+            additive = np.asarray(additive, dtype=np.float64)
+            terms.append((tuple(ids), np.pad(additive, 1)))
+
+        return cls(
+            feature_names=feature_names,
+            feature_types=feature_types,
+            main_bins=main_bins,
+            pair_bins=pair_bins,
+            terms=terms,
+            intercept=model_data["intercept"],
+            classes=np.array([0, 1]) if model_data["isClassifier"] else None,
+        )
+
+    def _get_columns(self, x):
+        """
+        Split a chunk of samples into one 1D array per feature.
+
+        Args:
+            x: 2D np.ndarray with columns in the feature order, or a
+                pd.DataFrame (columns are matched by feature names if it has
+                all of them, otherwise by position).
+
+        Returns:
+            A list of 1D np.ndarray
+        """
+        if hasattr(x, "columns"):
+            if all(name in x.columns for name in self.feature_names):
+                return [np.asarray(x[name]) for name in self.feature_names]
+            return [np.asarray(x.iloc[:, j]) for j in range(len(self.feature_names))]
+
+        x = np.asarray(x)
+        return [x[:, j] for j in range(len(self.feature_names))]
+
+    def bin_feature(self, feature_index, column, pair=False):
+        """
+        Get the bin indexes of one feature's values.
+
+        Args:
+            feature_index: Index of the feature.
+            column: 1D array of the feature's values.
+            pair: Whether to use the bins of interaction terms.
+
+        Returns:
+            1D int np.ndarray of bin indexes: 0 for missing values, and the
+            last index for unknown levels.
+        """
+        bins = (self.pair_bins if pair else self.main_bins)[feature_index]
+
+        if self.feature_types[feature_index] == "continuous":
+            values = np.asarray(column).astype(np.float64, copy=False)
+            indexes = np.searchsorted(bins, values, side="right") + 1
+            indexes[np.isnan(values)] = 0
+            return indexes
+
+        # Look up each unique level once
+        levels, inverse = np.unique(np.asarray(column).astype(str), return_inverse=True)
+        unknown = max(bins.values()) + 1
+
+        lookup = np.fromiter(
+            (
+                bins.get(s, 0 if s in _MISSING_LEVELS else unknown)
+                for s in levels.tolist()
+            ),
+            dtype=np.intp,
+            count=len(levels),
+        )
+
+        return lookup[inverse.reshape(-1)]
+
+    def bin_features(self, x):
+        """
+        Get the bin indexes of all features in a chunk of samples.
+
+        Args:
+            x: 2D np.ndarray or pd.DataFrame of samples.
+
+        Returns:
+            A dictionary that maps (feature index, pair) to bin indexes. Only
+            the bins used by the terms are computed.
+        """
+        columns = self._get_columns(x)
+        bin_indexes = {}
+
+        for features, _ in self.terms:
+            pair = len(features) > 1
+            for j in features:
+                if (j, pair) in bin_indexes:
+                    continue
+
+                # Reuse the main effect bins if interactions use the same bins
+                if pair and self.pair_bins[j] is self.main_bins[j]:
+                    if (j, False) in bin_indexes:
+                        bin_indexes[(j, True)] = bin_indexes[(j, False)]
+                        continue
+
+                bin_indexes[(j, pair)] = self.bin_feature(j, columns[j], pair)
+
+        return bin_indexes
+
+    def score_term(self, term_index, bin_indexes):
+        """
+        Get the scores of one term on binned samples.
+
+        Args:
+            term_index: Index of the term.
+            bin_indexes: The output of bin_features().
+
+        Returns:
+            1D np.ndarray of scores
+        """
+        features, scores = self.terms[term_index]
+        pair = len(features) > 1
+        return scores[tuple(bin_indexes[(j, pair)] for j in features)]
+
+    def _score_chunk(self, x):
+        bin_indexes = self.bin_features(x)
+        n = len(next(iter(bin_indexes.values()))) if bin_indexes else len(x)
+
+        scores = np.full(n, self.intercept)
+        for t in range(len(self.terms)):
+            scores += self.score_term(t, bin_indexes)
+
+        return scores
+
+    def score(self, x, chunk_size=CHUNK_SIZE):
+        """
+        Get the additive scores (logits for classifiers, predictions for
+        regressors) of samples.
+
+        Args:
+            x: 2D np.ndarray or pd.DataFrame of samples.
+            chunk_size: Number of rows to score at once.
+
+        Returns:
+            1D np.ndarray of scores
+        """
+        return np.concatenate(
+            [
+                self._score_chunk(x_chunk)
+                for x_chunk, _ in _iter_chunks(x, None, chunk_size)
+            ]
+        )
+
+    def predict_proba(self, x, chunk_size=CHUNK_SIZE):
+        """
+        Get the class probabilities of samples (classifiers only).
+
+        Args:
+            x: 2D np.ndarray or pd.DataFrame of samples.
+            chunk_size: Number of rows to score at once.
+
+        Returns:
+            2D np.ndarray with one row per sample and one column per class
+        """
+        if not self.is_classifier:
+            raise ValueError("predict_proba() requires a classifier.")
+
+        scores = self.score(x, chunk_size)
+        probabilities = np.empty((len(scores), 2))
+
+        with np.errstate(over="ignore"):
+            probabilities[:, 1] = 1 / (1 + np.exp(-scores))
+        probabilities[:, 0] = 1 - probabilities[:, 1]
+
+        return probabilities
+
+    def predict(self, x, chunk_size=CHUNK_SIZE):
+        """
+        Predict the classes (classifiers) or values (regressors) of samples.
+
+        Args:
+            x: 2D np.ndarray or pd.DataFrame of samples.
+            chunk_size: Number of rows to score at once.
+
+        Returns:
+            1D np.ndarray of predictions
+        """
+        scores = self.score(x, chunk_size)
+
+        if self.is_classifier:
+            # Probability >= 0.5 is the same as logit >= 0
+            return self.classes[(scores >= 0).astype(np.intp)]
+        return scores
+
+    def evaluate(self, x, y, chunk_size=CHUNK_SIZE):
+        """
+        Compute the metrics that GAM Changer shows on samples.
+
+        Samples are scored chunk by chunk. Besides one chunk, we only keep one
+        score and one label per row (to compute ROC AUC for classifiers).
+
+        Args:
+            x: 2D np.ndarray or pd.DataFrame of samples. It can also be an
+                iterable of chunks (e.g., from pd.read_csv(..., chunksize=...)).
+            y: 1D np.ndarray or pd.Series of labels. If x is an iterable of
+                chunks, y is an iterable of the matching label chunks.
+            chunk_size: Number of rows to score at once.
+
+        Returns:
+            A dictionary of metrics. For classifiers: accuracy, rocAuc,
+            balancedAccuracy, and confusionMatrix ([tn, fn, fp, tp]). For
+            regressors: rmse, mae, and mape.
+        """
+        metrics = (
+            _ClassificationMetrics() if self.is_classifier else _RegressionMetrics()
+        )
+
+        for x_chunk, y_chunk in _iter_chunks(x, y, chunk_size):
+            y_chunk = np.asarray(y_chunk)
+            if self.is_classifier:
+                y_chunk = y_chunk == self.classes[1]
+            metrics.update(self._score_chunk(x_chunk), y_chunk)
+
+        return metrics.result()
+
+
+def _iter_chunks(x, y, chunk_size):
+    """
+    Iterate through (x, y) in chunks of rows. If x is not a np.ndarray or a
+    pd.DataFrame, it is treated as an iterable of chunks and zipped with y.
+    """
+    if isinstance(x, np.ndarray) or hasattr(x, "iloc"):
+        for start in range(0, len(x), chunk_size):
+            end = start + chunk_size
+            x_chunk = x.iloc[start:end] if hasattr(x, "iloc") else x[start:end]
+            yield x_chunk, None if y is None else y[start:end]
+    elif y is None:
+        for x_chunk in x:
+            yield x_chunk, None
+    else:
+        yield from zip(x, y)
+
+
+def roc_auc(scores, labels):
+    """
+    Compute the ROC AUC with the Mann-Whitney U statistic. Tied scores get
+    their average rank.
+
+    Args:
+        scores: 1D np.ndarray of predicted scores.
+        labels: 1D bool np.ndarray, True for positive samples.
+
+    Returns:
+        ROC AUC, or None if there is only one class
+    """
+    n_pos = int(np.count_nonzero(labels))
+    n_neg = len(labels) - n_pos
+
+    if n_pos == 0 or n_neg == 0:
+        return None
+
+    uniques, inverse, counts = np.unique(
+        scores, return_inverse=True, return_counts=True
+    )
+
+    # Average 1-based rank of each unique score
+    ends = np.cumsum(counts)
+    ranks = ends - (counts - 1) / 2
+
+    rank_sum = ranks[inverse.reshape(-1)][labels].sum()
+    return float((rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+class _ClassificationMetrics:
+    """Accumulate the binary classification metrics chunk by chunk."""
+
+    def __init__(self):
+        self.scores = []
+        self.labels = []
+        self.confusion_matrix = np.zeros(4, dtype=np.int64)
+
+    def update(self, scores, labels):
+        # Probability >= 0.5 is the same as logit >= 0
+        predictions = scores >= 0
+        self.confusion_matrix += [
+            np.count_nonzero(~predictions & ~labels),
+            np.count_nonzero(~predictions & labels),
+            np.count_nonzero(predictions & ~labels),
+            np.count_nonzero(predictions & labels),
+        ]
+        self.scores.append(scores)
+        self.labels.append(labels)
+
+    def result(self):
+        tn, fn, fp, tp = self.confusion_matrix.tolist()
+        n = tn + fn + fp + tp
+        scores = np.concatenate(self.scores) if self.scores else np.zeros(0)
+        labels = np.concatenate(self.labels) if self.labels else np.zeros(0, bool)
+
+        recalls = [
+            r for r in [_divide(tp, tp + fn), _divide(tn, tn + fp)] if r is not None
+        ]
+
+        return {
+            "accuracy": _divide(tp + tn, n),
+            "rocAuc": roc_auc(scores, labels),
+            "balancedAccuracy": sum(recalls) / len(recalls) if recalls else None,
+            "confusionMatrix": [tn, fn, fp, tp],
+        }
+
+
+class _RegressionMetrics:
+    """Accumulate the regression metrics chunk by chunk."""
+
+    def __init__(self):
+        self.n = 0
+        self.squared_error = 0.0
+        self.absolute_error = 0.0
+        self.percentage_error = 0.0
+
+    def update(self, predictions, labels):
+        labels = labels.astype(np.float64, copy=False)
+        errors = np.abs(labels - predictions)
+
+        self.n += len(labels)
+        self.squared_error += float(np.dot(errors, errors))
+        self.absolute_error += float(errors.sum())
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.percentage_error += float((errors / np.abs(labels)).sum())
+
+    def result(self):
+        return {
+            "rmse": (
+                None if self.n == 0 else float(np.sqrt(self.squared_error / self.n))
+            ),
+            "mae": _divide(self.absolute_error, self.n),
+            "mape": _divide(self.percentage_error, self.n),
+        }
+
+
+def _divide(a, b):
+    return None if b == 0 else a / b
@@ -14,19 +14,24 @@ test_requirements = []
 setup(
     author="Jay Wang",
     author_email="jayw@zijie.wang",
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
     ],
+    entry_points={
+        "console_scripts": [
+            "gamchanger-apply=gamchanger.cli:main",
+        ],
+    },
     description="A Python package to run GAM Changer in your computation notebooks.",
     install_requires=requirements,
+    extras_require={"parquet": ["pyarrow"]},
     license="MIT license",
     long_description=readme,
     long_description_content_type="text/markdown",
@@ -0,0 +1,230 @@
+"""Synthetic, duck-typed EBM objects and samples for tests and benchmarks."""
+
+import numpy as np
+import pandas as pd
+
+
+class SyntheticEBM:
+    """
+    A light-weight object exposing the fitted attributes of an interpret EBM
+    that GAM Changer reads. It lets us test and benchmark gamchanger without
+    installing interpret.
+
+    Args:
+        n_continuous: Number of continuous features.
+        n_categorical: Number of categorical (nominal) features.
+        n_bins: Number of main effect bins for each continuous feature.
+        n_pair_bins: Number of interaction bins for each continuous feature.
+        n_levels: Number of levels for each categorical feature.
+        n_interactions: Number of pairwise interaction terms.
+        n_hist_bins: Number of histogram bins for each continuous feature.
+        numeric_levels: Use unsorted numeric strings as categorical levels.
+        classifier: Mimic ExplainableBoostingClassifier if True, otherwise
+            ExplainableBoostingRegressor.
+        seed: Random seed.
+    """
+
+    def __init__(
+        self,
+        n_continuous=4,
+        n_categorical=2,
+        n_bins=16,
+        n_pair_bins=6,
+        n_levels=5,
+        n_interactions=2,
+        n_hist_bins=10,
+        numeric_levels=False,
+        classifier=True,
+        seed=0,
+    ):
+        rng = np.random.default_rng(seed)
+        n_features = n_continuous + n_categorical
+
+        self.feature_names_in_ = []
+        self.feature_types_in_ = []
+        self.feature_bounds_ = np.full((n_features, 2), np.nan)
+        self.bins_ = []
+        self.histogram_edges_ = []
+        self.histogram_weights_ = []
+        self.bin_weights_ = []
+        self.term_features_ = []
+        self.term_scores_ = []
+        self.standard_deviations_ = []
+
+        for i in range(n_features):
+            if i < n_continuous:
+                self.feature_names_in_.append(f"cont_{i}")
+                self.feature_types_in_.append("continuous")
+
+                low, high = 0.0, 100.0
+                self.feature_bounds_[i] = [low, high]
+
+                grid = np.arange(1, 4 * n_bins) * (high - low) / (4 * n_bins) + low
+                cuts = np.sort(rng.choice(grid, n_bins - 1, replace=False))
+                pair_cuts = np.linspace(low, high, n_pair_bins + 1)[1:-1]
+                self.bins_.append([cuts, pair_cuts])
+
+                self.histogram_edges_.append(np.linspace(low, high, n_hist_bins + 1))
+                hist_weights = rng.integers(0, 500, n_hist_bins + 2).astype(float)
+                hist_weights[[0, -1]] = 0
+                self.histogram_weights_.append(hist_weights)
+
+                n_scores = n_bins + 2
+            else:
+                self.feature_names_in_.append(f"cat_{i}")
+                self.feature_types_in_.append("nominal")
+
+                if numeric_levels:
+                    levels = [str(v) for v in rng.permutation(n_levels) * 3 + 1]
+                else:
+                    levels = [f"level_{j}" for j in range(n_levels)]
+                self.bins_.append([{s: j + 1 for j, s in enumerate(levels)}])
+
+                self.histogram_edges_.append(None)
+                n_scores = n_levels + 2
+
+            bin_weights = rng.integers(1, 500, n_scores).astype(float)
+            bin_weights[[0, -1]] = 0
+            self.bin_weights_.append(bin_weights)
+
+            if self.feature_types_in_[i] == "nominal":
+                self.histogram_weights_.append(bin_weights.copy())
+
+            scores = rng.normal(0, 1, n_scores)
+            scores[[0, -1]] = 0
+            self.term_features_.append((i,))
+            self.term_scores_.append(scores)
+            self.standard_deviations_.append(np.abs(rng.normal(0, 0.1, n_scores)))
+
+        pairs = [(a, b) for a in range(n_features) for b in range(a + 1, n_features)]
+        for p in rng.permutation(len(pairs))[:n_interactions]:
+            a, b = pairs[p]
+            shape = (self._get_pair_size(a), self._get_pair_size(b))
+            scores = rng.normal(0, 0.2, shape)
+            self.term_features_.append((a, b))
+            self.term_scores_.append(scores)
+            self.standard_deviations_.append(np.abs(rng.normal(0, 0.05, shape)))
+
+        if classifier:
+            self.classes_ = np.array([0, 1])
+            self.intercept_ = np.array([-1.25])
+        else:
+            self.intercept_ = 3.5
+
+    def _get_pair_size(self, feature_index):
+        if self.feature_types_in_[feature_index] == "nominal":
+            return len(self.bins_[feature_index][0]) + 2
+        return len(self.bins_[feature_index][-1]) + 3
+
+    def term_importances(self):
+        return np.array([np.mean(np.abs(s)) for s in self.term_scores_])
+
+
+def make_samples(ebm, n_samples=200, seed=0):
+    """
+    Generate random samples for a SyntheticEBM.
+
+    Returns:
+        A tuple of (x, y): x is a pd.DataFrame and y is a np.ndarray
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+
+    for i, name in enumerate(ebm.feature_names_in_):
+        if ebm.feature_types_in_[i] == "continuous":
+            low, high = ebm.feature_bounds_[i]
+            columns[name] = rng.uniform(low, high, n_samples).round(2)
+        else:
+            levels = np.array(list(ebm.bins_[i][0].keys()), dtype=object)
+            columns[name] = levels[rng.integers(0, len(levels), n_samples)]
+
+    x = pd.DataFrame(columns)
+
+    if hasattr(ebm, "classes_"):
+        y = rng.integers(0, 2, n_samples)
+    else:
+        y = rng.normal(3.5, 1, n_samples)
+
+    return x, y
+
+
+def make_history(ebm, edits, merge_bins=False, seed=0):
+    """
+    Generate a GAM Changer history list with one edit per item of edits.
+
+    Args:
+        ebm: SyntheticEBM
+        edits: List of main effect feature indexes to edit. A feature can be
+            edited more than once.
+        merge_bins: Whether edits on continuous features also merge two bins,
+            which changes the bin definition.
+        seed: Random seed.
+
+    Returns:
+        A list of history entries. The first entry is the original graph.
+    """
+    rng = np.random.default_rng(seed)
+    states = {}
+
+    def make_entry(name, edit_type, point_data, time):
+        return {
+            "state": {"pointData": point_data, "additiveData": []},
+            "metrics": {},
+            "featureName": name,
+            "type": edit_type,
+            "description": f"{edit_type} {name}",
+            "time": time,
+            "hash": f"{time:032x}",
+            "reviewed": True,
+        }
+
+    history = [make_entry(ebm.feature_names_in_[0], "original", {}, 0)]
+
+    for t, i in enumerate(edits, 1):
+        name = ebm.feature_names_in_[i]
+
+        if i not in states:
+            scores = np.round(ebm.term_scores_[i], 4)[1:-1].tolist()
+            if ebm.feature_types_in_[i] == "continuous":
+                edges = [float(ebm.feature_bounds_[i][0])]
+                edges += np.round(ebm.bins_[i][0], 4).tolist()
+            else:
+                edges = list(ebm.bins_[i][0].keys())
+            states[i] = (edges, scores)
+
+        edges, scores = states[i]
+        start = rng.integers(0, len(scores))
+        end = rng.integers(start + 1, len(scores) + 1)
+        delta = float(rng.choice([-0.5, 0.25, 1.0]))
+        scores = [
+            round(s + delta, 4) if start <= j < end else s for j, s in enumerate(scores)
+        ]
+
+        if ebm.feature_types_in_[i] == "continuous":
+            if merge_bins and len(edges) > 2:
+                j = int(rng.integers(1, len(edges)))
+                edges = edges[:j] + edges[j + 1 :]
+                scores = scores[:j] + scores[j + 1 :]
+
+            # Continuous points form a linked list from point 0
+            point_data = {
+                str(j): {
+                    "x": x,
+                    "y": y,
+                    "id": j,
+                    "leftPointID": j - 1 if j > 0 else None,
+                    "rightPointID": j + 1 if j < len(edges) - 1 else None,
+                }
+                for j, (x, y) in enumerate(zip(edges, scores))
+            }
+        else:
+            levels = ebm.bins_[i][0]
+            point_data = {
+                str(levels[x]): {"x": x, "y": y, "id": levels[x]}
+                for x, y in zip(edges, scores)
+            }
+
+        states[i] = (edges, scores)
+        history.append(make_entry(name, "transform", point_data, t))
+
+    return history
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.arrow`."""
+
+import os
+import tempfile
+import unittest
+import warnings
+
+from unittest import mock
+
+import numpy as np
+
+from gamchanger import gamchanger
+from tests.synthetic import SyntheticEBM, make_samples
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+@unittest.skipIf(pa is None, "requires pyarrow")
+class TestArrowSamples(unittest.TestCase):
+    """Tests for Arrow and Parquet sample data."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM()
+        self.x, self.y = make_samples(self.ebm, n_samples=50)
+
+        # Add NAs, and an extra column that should not be read
+        self.x.loc[3, "cont_1"] = np.nan
+        self.x.loc[7, "cat_4"] = None
+        self.x["unused"] = np.arange(50)
+
+        self.table = pa.Table.from_pandas(self.x.assign(label=self.y))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.expected = gamchanger.get_sample_data(
+                self.ebm, self.x.drop(columns="unused"), self.y, columnar=True
+            )
+
+    def get_sample_data(self, x, y, **kwargs):
+        with self.assertWarns(UserWarning):
+            return gamchanger.get_sample_data(self.ebm, x, y, columnar=True, **kwargs)
+
+    def test_table(self):
+        self.assertEqual(self.get_sample_data(self.table, "label"), self.expected)
+
+        # Labels can also be an array of all rows
+        table = self.table.drop(["label"])
+        self.assertEqual(self.get_sample_data(table, self.y), self.expected)
+
+    def test_parquet_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "samples.parquet")
+            pq.write_table(self.table, path, row_group_size=16)
+
+            self.assertEqual(self.get_sample_data(path, "label"), self.expected)
+
+            # Rows are read in batches
+            with mock.patch("gamchanger.arrow.BATCH_SIZE", 16):
+                self.assertEqual(self.get_sample_data(path, "label"), self.expected)
+
+    def test_record_batches(self):
+        # Dictionary-encoded categorical columns
+        table = self.table.drop(["unused"])
+        table = table.set_column(
+            table.schema.get_field_index("cat_4"),
+            "cat_4",
+            table.column("cat_4").dictionary_encode(),
+        )
+        batches = table.to_batches(max_chunksize=20)
+        self.assertEqual(len(batches), 3)
+
+        reader = pa.RecordBatchReader.from_batches(table.schema, batches)
+        self.assertEqual(self.get_sample_data(reader, "label"), self.expected)
+
+        # Subsampling also works on batches
+        sample_data = self.get_sample_data(
+            iter(batches), "label", max_samples=10, random_state=0
+        )
+        self.assertEqual(sample_data["sampleCount"], 10)
+        self.assertEqual(sample_data["totalSampleCount"], 48)
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            gamchanger.get_sample_data(self.ebm, self.table.drop(["cont_0"]), "label")
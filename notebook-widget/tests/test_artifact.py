@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.artifact`."""
+
+import os
+import tempfile
+import unittest
+import zipfile
+
+import numpy as np
+
+from gamchanger import gamchanger
+from gamchanger.artifact import ALIGNMENT, compile_scorer, load_scorer
+from gamchanger.scoring import ScoringEngine
+from tests.synthetic import SyntheticEBM, make_history, make_samples
+
+
+class TestScoringArtifact(unittest.TestCase):
+    """Tests for `compile_scorer` and `load_scorer`."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(n_interactions=4)
+        self.x, self.y = make_samples(self.ebm, n_samples=100)
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "scorer.npz")
+
+    def test_compile_and_load(self):
+        expected = ScoringEngine.from_ebm(self.ebm)
+        compile_scorer(self.ebm, self.path)
+
+        for mmap in [True, False]:
+            engine = load_scorer(self.path, mmap=mmap)
+            self.assertEqual(engine.feature_names, expected.feature_names)
+            np.testing.assert_array_equal(engine.score(self.x), expected.score(self.x))
+            np.testing.assert_array_equal(engine.classes, self.ebm.classes_)
+
+        # Memory-mapped score tables are aligned, read-only views of the file
+        engine = load_scorer(self.path)
+        for _, scores in engine.terms:
+            self.assertFalse(scores.flags.writeable)
+        for name, offset in _get_data_offsets(self.path).items():
+            self.assertEqual(offset % ALIGNMENT, 0, name)
+
+        # It is still a valid .npz file
+        with np.load(self.path) as npz:
+            self.assertEqual(sorted(npz.files), ["edges", "meta", "scores"])
+
+    def test_compile_export(self):
+        export = {"historyList": make_history(self.ebm, [0, 1, 4, 0], merge_bins=True)}
+        compile_scorer(self.ebm, self.path, gamchanger_export=export)
+
+        edited = gamchanger.get_edited_model(self.ebm, export)
+        np.testing.assert_array_equal(
+            load_scorer(self.path).score(self.x),
+            ScoringEngine.from_ebm(edited).score(self.x),
+        )
+
+        # Model data can be compiled, but not edited
+        compile_scorer(gamchanger.get_model_data(self.ebm), self.path)
+        with self.assertRaises(ValueError):
+            compile_scorer(gamchanger.get_model_data(self.ebm), self.path, export)
+
+    def test_predict(self):
+        engine = load_scorer(compile_scorer(self.ebm, self.path))
+        scores = engine.score(self.x)
+
+        probabilities = engine.predict_proba(self.x, chunk_size=30)
+        self.assertEqual(probabilities.shape, (100, 2))
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1)
+        np.testing.assert_allclose(probabilities[:, 1], 1 / (1 + np.exp(-scores)))
+        np.testing.assert_array_equal(
+            engine.predict(self.x), self.ebm.classes_[(scores >= 0).astype(int)]
+        )
+
+        # Regressors predict the scores
+        regressor = SyntheticEBM(classifier=False)
+        engine = load_scorer(compile_scorer(regressor, self.path))
+        np.testing.assert_array_equal(
+            engine.predict(self.x), ScoringEngine.from_ebm(regressor).score(self.x)
+        )
+        with self.assertRaises(ValueError):
+            engine.predict_proba(self.x)
+
+
+def _get_data_offsets(path):
+    """Get the file offset of each array's data."""
+    offsets = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as fp:
+        for info in zf.infolist():
+            fp.seek(info.header_offset + 26)
+            name_size, extra_size = np.frombuffer(fp.read(4), dtype="<u2")
+            fp.seek(info.header_offset + 30 + name_size + extra_size)
+            np.lib.format.read_magic(fp)
+            np.lib.format.read_array_header_1_0(fp)
+            offsets[info.filename] = fp.tell()
+
+    return offsets
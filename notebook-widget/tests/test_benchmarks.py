@@ -0,0 +1,64 @@
+"""Tests for the benchmark suite."""
+
+import unittest
+
+from benchmarks import imports, run
+from gamchanger import gamchanger
+
+TINY = {
+    "n_continuous": 2,
+    "n_categorical": 1,
+    "n_bins": 8,
+    "n_pair_bins": 4,
+    "n_levels": 3,
+    "n_interactions": 1,
+    "n_samples": 20,
+    "n_edits": 3,
+}
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, gamchanger, "_JS_BASE64", None)
+
+    def test_run_benchmarks(self):
+        current = run.run_benchmarks(TINY, repeat=1)
+
+        self.assertEqual(current["params"], TINY)
+        self.assertIn("_make_iframe", current["results"])
+        self.assertIn("get_edited_model[compact_file]", current["results"])
+
+        for result in current["results"].values():
+            self.assertGreater(result["time"], 0)
+            self.assertGreaterEqual(result["medianTime"], result["time"])
+            self.assertGreater(result["peakMemory"], 0)
+
+    def test_compare_results(self):
+        baseline = run.run_benchmarks(TINY, repeat=1, cases=["get_model_data"])
+        self.assertEqual(list(baseline["results"]), ["get_model_data"])
+
+        current = {
+            "params": TINY,
+            "results": {
+                "get_model_data": {
+                    "time": baseline["results"]["get_model_data"]["time"] + 1,
+                    "peakMemory": 0,
+                }
+            },
+        }
+        regressions = run.compare_results(baseline, current)
+        self.assertEqual([r[:2] for r in regressions], [("get_model_data", "time")])
+
+        with self.assertRaises(ValueError):
+            run.compare_results(baseline, dict(current, params=run.SCENARIOS["small"]))
+
+    def test_import_benchmarks(self):
+        cases = ["get_edited_model", "get_model_data", "visualize"]
+        results = imports.run_import_benchmarks(repeat=1, cases=cases)
+        self.assertEqual(list(results), cases)
+
+        # The headless core does not load pandas, tqdm, or IPython
+        self.assertEqual(results["get_edited_model"]["modules"], [])
+        self.assertEqual(results["get_model_data"]["modules"], [])
+        self.assertIn("IPython", results["visualize"]["modules"])
+        self.assertGreater(results["visualize"]["time"], 0)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.bulk_edit`."""
+
+import json
+import unittest
+
+import numpy as np
+
+from gamchanger import BulkEditor, get_edited_model, replay_history
+from gamchanger.bulk_edit import _isotonic_regression, _smooth
+from gamchanger.edit import _read_continuous_points
+from tests.synthetic import SyntheticEBM, make_samples
+
+
+def _pav(y, w):
+    """Sequential weighted PAV, as a reference."""
+    blocks = []
+    for cur_y, cur_w in zip(y, w):
+        blocks.append([cur_y * cur_w, cur_w, 1])
+        while len(blocks) > 1 and (
+            blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]
+        ):
+            wy, w_sum, size = blocks.pop()
+            blocks[-1][0] += wy
+            blocks[-1][1] += w_sum
+            blocks[-1][2] += size
+    return np.concatenate([[wy / w_sum] * size for wy, w_sum, size in blocks])
+
+
+class TestBulkEditor(unittest.TestCase):
+    """Tests for BulkEditor."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(n_continuous=5)
+
+    def test_isotonic_regression(self):
+        rng = np.random.default_rng(0)
+        segments = [rng.normal(size=n) for n in [1, 7, 40, 2, 100]]
+        weights = [rng.integers(1, 50, len(s)).astype(float) for s in segments]
+        offsets = np.cumsum([0] + [len(s) for s in segments])
+        y, w = np.concatenate(segments), np.concatenate(weights)
+
+        expected = np.concatenate(
+            [_pav(s, cur_w) for s, cur_w in zip(segments, weights)]
+        )
+        np.testing.assert_allclose(_isotonic_regression(y, w, offsets), expected)
+
+        expected = -np.concatenate(
+            [_pav(-s, cur_w) for s, cur_w in zip(segments, weights)]
+        )
+        np.testing.assert_allclose(
+            _isotonic_regression(y, w, offsets, increasing=False), expected
+        )
+
+    def test_smooth(self):
+        y = np.array([0.0, 3.0, 0.0, 1.0, 1.0])
+        w = np.array([1.0, 1.0, 2.0, 1.0, 1.0])
+
+        # Windows do not cross the segments [0, 3) and [3, 5)
+        np.testing.assert_allclose(
+            _smooth(y, w, np.array([0, 3, 5]), 3), [1.5, 0.75, 1.0, 1.0, 1.0]
+        )
+
+    def test_get_edited_model(self):
+        editor = BulkEditor(self.ebm)
+        self.assertEqual(
+            editor.smooth(window=3), ["cont_{}".format(i) for i in range(5)]
+        )
+        self.assertEqual(
+            editor.monotone(["cont_0", 1], increasing=False), ["cont_0", "cont_1"]
+        )
+        self.assertEqual(editor.interpolate(x_range={"cont_2": (20, 60)}), ["cont_2"])
+
+        history = editor.to_export()["historyList"]
+        self.assertEqual(
+            [(h["featureName"], h["type"]) for h in history[:3]],
+            [("cont_0", "original"), ("cont_0", "smooth"), ("cont_1", "original")],
+        )
+        self.assertFalse(history[1]["reviewed"])
+
+        # The history list is JSON, and edits keep the bins
+        export = json.loads(json.dumps(editor.to_export()))
+        ebm_edited = get_edited_model(self.ebm, export)
+
+        for i in range(5):
+            np.testing.assert_array_equal(ebm_edited.bins_[i][0], self.ebm.bins_[i][0])
+            np.testing.assert_array_equal(
+                ebm_edited.term_scores_[i][1:-1], editor._curves[i].scores
+            )
+
+        for i in [0, 1]:
+            self.assertTrue(np.all(np.diff(ebm_edited.term_scores_[i][1:-1]) <= 0))
+
+        # Only the bins in the range are interpolated
+        edges, scores = _read_continuous_points(history[-1]["state"]["pointData"])
+        edges, scores = np.array(edges), np.array(scores)
+        inside = np.flatnonzero((edges >= 20) & (edges < 60))
+        x0, x1 = edges[inside[[0, -1]]]
+        y0, y1 = scores[inside[[0, -1]]]
+        np.testing.assert_allclose(
+            scores[inside], y0 + (y1 - y0) * (edges[inside] - x0) / (x1 - x0), atol=1e-4
+        )
+
+        # The original model is not modified
+        self.assertFalse(
+            np.array_equal(self.ebm.term_scores_[0], ebm_edited.term_scores_[0])
+        )
+
+    def test_widget_state(self):
+        editor = BulkEditor(self.ebm)
+        editor.monotone([0])
+        state = editor.history[-1]["state"]
+        point_data, additive_data = state["pointData"], state["additiveData"]
+
+        # Each point links to its lines (see linkPointToAdditive())
+        n = len(point_data)
+        self.assertEqual(len(additive_data), 2 * n - 1)
+        for point in point_data.values():
+            line = additive_data[point["rightLineIndex"]]
+            self.assertEqual(
+                line["id"],
+                "path-{}-{}-r".format(
+                    point["id"], point["rightPointID"] or point["id"]
+                ),
+            )
+            self.assertEqual(line["y1"], point["y"])
+        self.assertEqual(point_data[str(n - 1)]["maxX"], self.ebm.feature_bounds_[0][1])
+
+    def test_unchanged_features(self):
+        editor = BulkEditor(self.ebm)
+        editor.monotone()
+
+        # Monotone features are not edited again
+        self.assertEqual(editor.monotone(), [])
+        with self.assertRaises(ValueError):
+            editor.monotone(["cat_5"])
+        with self.assertRaises(ValueError):
+            editor.smooth(window=2)
+
+    def test_replay_history(self):
+        x, y = make_samples(self.ebm, n_samples=100)
+        editor = BulkEditor(self.ebm)
+        editor.monotone()
+
+        table = replay_history(self.ebm, editor.to_export(), x, y)
+        self.assertEqual(len(table), len(editor.history))
+
+        export = editor.to_export(x, y, columnar=True)
+        self.assertEqual(export["modelData"]["features"][0]["name"], "cont_0")
+        self.assertEqual(export["sampleData"]["sampleCount"], 100)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.cache`."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gamchanger import cache, gamchanger
+from tests.synthetic import SyntheticEBM, make_samples
+
+
+class TestPayloadCache(unittest.TestCase):
+    """Tests for the payload cache."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(numeric_levels=True)
+        self.x, self.y = make_samples(self.ebm, n_samples=50)
+        self.cache = cache.enable_payload_cache(max_entries=4)
+        self.addCleanup(cache.disable_payload_cache)
+
+    def test_model_data(self):
+        data = gamchanger.get_model_data(self.ebm)
+        self.assertEqual(gamchanger.get_model_data(self.ebm), data)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Options and edited scores change the key
+        gamchanger.get_model_data(self.ebm, resort_categorical=True)
+        self.ebm.term_scores_[0][3] += 1
+        edited = gamchanger.get_model_data(self.ebm)
+        self.assertNotEqual(edited, data)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+        cache.disable_payload_cache()
+        self.assertEqual(gamchanger.get_model_data(self.ebm), edited)
+
+    def test_sample_data(self):
+        data = gamchanger.get_sample_data(self.ebm, self.x, self.y, columnar=True)
+        self.assertEqual(
+            gamchanger.get_sample_data(self.ebm, self.x.copy(), self.y, columnar=True),
+            data,
+        )
+        self.assertEqual(self.cache.hits, 1)
+
+        # Models with the same features share the samples
+        other = SyntheticEBM(numeric_levels=True, seed=0)
+        other.term_scores_ = [s + 1 for s in other.term_scores_]
+        gamchanger.get_sample_data(other, self.x, self.y, columnar=True)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+        x = self.x.copy()
+        x.iloc[0, 4] = x.iloc[1, 4] if x.iloc[0, 4] != x.iloc[1, 4] else "unseen"
+        self.assertNotEqual(
+            gamchanger.get_sample_data(self.ebm, x, self.y, columnar=True), data
+        )
+
+    def test_not_cached(self):
+        chunks = [self.x.iloc[:25], self.x.iloc[25:]]
+        label_chunks = [self.y[:25], self.y[25:]]
+        gamchanger.get_sample_data(self.ebm, iter(chunks), iter(label_chunks))
+
+        # Random subsamples are only cached with a seed
+        gamchanger.get_sample_data(self.ebm, self.x, self.y, max_samples=10)
+        self.assertEqual(self.cache.misses, 0)
+
+        data = gamchanger.get_sample_data(
+            self.ebm, self.x, self.y, max_samples=10, random_state=1
+        )
+        self.assertEqual(
+            gamchanger.get_sample_data(
+                self.ebm, self.x, self.y, max_samples=10, random_state=1
+            ),
+            data,
+        )
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_copies(self):
+        # Callers can modify their payloads without changing the cached ones
+        data = gamchanger.get_model_data(self.ebm)
+        expected = gamchanger.get_model_data(self.ebm)
+        data["features"][0]["additive"][0] += 1
+        data["features"].pop()
+
+        hit = gamchanger.get_model_data(self.ebm)
+        self.assertIsNot(hit, expected)
+        self.assertEqual(hit, expected)
+
+    def test_lru(self):
+        keys = ["key-{}".format(i) for i in range(6)]
+        for key in keys:
+            self.cache.put(key, {"key": key})
+
+        self.assertIsNone(self.cache.get(keys[0]))
+        self.assertEqual(self.cache.get(keys[-1]), {"key": keys[-1]})
+        self.assertEqual(len(self.cache._entries), 4)
+
+    def test_disk_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = cache.enable_payload_cache(cache_dir=tmp_dir)
+            model_data = gamchanger.get_model_data(self.ebm)
+            sample_data = gamchanger.get_sample_data(
+                self.ebm, self.x, self.y, columnar=True
+            )
+
+            # No temporary files are left behind
+            self.assertEqual(len(os.listdir(tmp_dir)), 2)
+            self.assertTrue(all(f.endswith(".json") for f in os.listdir(tmp_dir)))
+
+            # A new cache (e.g., after a restart) reads the files
+            store = cache.enable_payload_cache(cache_dir=tmp_dir)
+            self.assertEqual(gamchanger.get_model_data(self.ebm), model_data)
+            self.assertEqual(
+                gamchanger.get_sample_data(self.ebm, self.x, self.y, columnar=True),
+                sample_data,
+            )
+            self.assertEqual((store.hits, store.misses), (2, 0))
+
+            # The least recently used files are removed above the size cap
+            sizes = [e.stat().st_size for e in os.scandir(tmp_dir)]
+            store.max_disk_bytes = max(sizes) + 1
+            store.put("large", {"values": np.arange(10).tolist()})
+            self.assertLessEqual(
+                sum(e.stat().st_size for e in os.scandir(tmp_dir)), max(sizes) + 1
+            )
+
+            store.clear()
+            self.assertEqual(os.listdir(tmp_dir), [])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.cli`."""
+
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from gamchanger import cli
+from gamchanger.edit import get_edited_model
+from tests.synthetic import SyntheticEBM, make_history
+
+
+class TestCli(unittest.TestCase):
+    """Tests for the batch CLI."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+
+        self.ebm = SyntheticEBM()
+        with open(os.path.join(self.dir, "ebm.pkl"), "wb") as fp:
+            pickle.dump(self.ebm, fp)
+
+        self.exports = {
+            "a": {"historyList": make_history(self.ebm, [0, 4, 0])},
+            "b": {"historyList": make_history(self.ebm, [1], merge_bins=True)},
+        }
+        for name, export in self.exports.items():
+            with open(os.path.join(self.dir, name + ".gamchanger"), "w") as fp:
+                json.dump(export, fp)
+
+        self.manifest = os.path.join(self.dir, "manifest.csv")
+        with open(self.manifest, "w") as fp:
+            fp.write("model,export\nebm.pkl,a.gamchanger\nebm.pkl,b.gamchanger\n")
+
+    def test_apply_exports(self):
+        summary = os.path.join(self.dir, "summary.json")
+        args = [self.manifest, "-o", os.path.join(self.dir, "out"), "-j", "2"]
+        self.assertEqual(cli.main(args + ["-s", summary, "-q"]), 0)
+
+        for name, export in self.exports.items():
+            path = os.path.join(self.dir, "out", "ebm-{}.pkl".format(name))
+            with open(path, "rb") as fp:
+                edited = pickle.load(fp)
+
+            expected = get_edited_model(self.ebm, export)
+            for a, b in zip(edited.term_scores_, expected.term_scores_):
+                np.testing.assert_array_equal(a, b)
+
+        with open(summary) as fp:
+            jobs = json.load(fp)["jobs"]
+
+        features = {f["name"]: f for f in jobs[0]["features"]}
+        self.assertEqual(sorted(features), ["cat_4", "cont_0"])
+        self.assertEqual(features["cont_0"]["edits"], 2)
+        self.assertGreater(features["cont_0"]["changedBins"], 0)
+        self.assertTrue(jobs[1]["features"][0]["binDefinitionChanged"])
+        self.assertEqual(jobs[1]["features"][0]["binsAfter"], 15)
+
+    def test_failed_job(self):
+        with open(self.manifest, "a") as fp:
+            fp.write("missing.pkl,a.gamchanger\n")
+
+        results = cli.apply_exports(cli.read_manifest(self.manifest), workers=1)
+        self.assertEqual([r["status"] for r in results], ["ok", "ok", "error"])
+        self.assertIn("FileNotFoundError", results[2]["error"])
+        self.assertEqual(cli.main([self.manifest, "-j", "1", "-q"]), 1)
+
+    def test_duplicate_outputs(self):
+        with open(self.manifest, "w") as fp:
+            fp.write("model,export,output\n")
+            fp.write("ebm.pkl,a.gamchanger,out/ebm.pkl\n")
+            fp.write("ebm.pkl,b.gamchanger,out/../out/ebm.pkl\n")
+
+        with self.assertRaises(ValueError):
+            cli.read_manifest(self.manifest)
+
+        # No temporary files are left next to the output
+        output = os.path.join(self.dir, "out", "ebm.pkl")
+        result = cli.apply_export(
+            os.path.join(self.dir, "ebm.pkl"),
+            os.path.join(self.dir, "a.gamchanger"),
+            output,
+        )
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(os.listdir(os.path.dirname(output)), ["ebm.pkl"])
+
+    def test_no_notebook_imports(self):
+        code = (
+            "import sys, gamchanger.cli; "
+            "assert not {'IPython', 'tqdm', 'pandas'} & set(sys.modules)"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
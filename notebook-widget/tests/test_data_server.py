@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.data_server`."""
+
+import gc
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from gamchanger import gamchanger
+from gamchanger.data_server import DataServer, make_lazy_model_data
+from gamchanger.profiling import VisualizeProfile
+from tests.synthetic import SyntheticEBM, make_samples
+
+
+class TestDataServer(unittest.TestCase):
+    """Tests for `DataServer`."""
+
+    def setUp(self):
+        ebm = SyntheticEBM()
+        x, y = make_samples(ebm, n_samples=20)
+        self.model_data = gamchanger.get_model_data(ebm)
+        self.sample_data = gamchanger.get_sample_data(ebm, x, y)
+
+        self.server = DataServer(cache_bytes=4096)
+        self.addCleanup(self.server.shutdown)
+        self.url = self.server.register(self.model_data, self.sample_data)
+
+    def fetch(self, url):
+        with urllib.request.urlopen(url) as response:
+            self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
+            return json.loads(response.read())
+
+    def test_serve_terms(self):
+        for i in [0, 4, len(self.model_data["features"]) - 1]:
+            term = self.fetch("{}/term/{}".format(self.url, i))
+            self.assertEqual(term, self.model_data["features"][i])
+
+        sample = self.fetch(self.url + "/sample")
+        self.assertEqual(sample, self.sample_data)
+
+    def test_not_found(self):
+        for path in ["/term/1000", "/model", "/term/a"]:
+            with self.assertRaises(urllib.error.HTTPError):
+                self.fetch(self.url + path)
+
+        with self.assertRaises(urllib.error.HTTPError):
+            self.fetch("http://127.0.0.1:{}/unknown/term/0".format(self.server.port))
+
+        self.server.unregister(self.url)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.fetch(self.url + "/term/0")
+
+    def test_lru_cache(self):
+        n_terms = len(self.model_data["features"])
+        for i in range(n_terms):
+            self.fetch("{}/term/{}".format(self.url, i))
+
+        self.assertLessEqual(self.server._cache_size, 4096)
+        self.assertLess(len(self.server._cache), n_terms)
+
+        # The most recently used term is still cached
+        token = self.url.split("/")[-1]
+        self.assertIn((token, n_terms - 1), self.server._cache)
+
+    def test_lazy_model_data(self):
+        lazy_data = make_lazy_model_data(self.model_data, self.url)
+
+        self.assertEqual(lazy_data["server"], self.url)
+        self.assertEqual(lazy_data["intercept"], self.model_data["intercept"])
+
+        for lazy, feature in zip(lazy_data["features"], self.model_data["features"]):
+            self.assertTrue(lazy["lazy"])
+            self.assertEqual(lazy["importance"], feature["importance"])
+            self.assertNotIn("additive", lazy)
+
+    def test_post_profile(self):
+        profile = VisualizeProfile()
+        url = self.server.register_profile(profile)
+        timings = {"scriptStart": 120.5, "dispatched": 180.0, "firstRender": 250.25}
+
+        request = urllib.request.Request(
+            url, data=json.dumps(timings).encode(), method="POST"
+        )
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(response.status, 204)
+        self.assertEqual(profile.widget, timings)
+
+        # A profile only takes one post
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(request)
+
+    def test_pending_samples(self):
+        url = self.server.register(self.model_data, pending_samples=True)
+
+        # The sample request waits until the samples are set
+        timer = threading.Timer(0.1, self.server.set_samples, (url, self.sample_data))
+        timer.start()
+        self.assertEqual(self.fetch(url + "/sample"), self.sample_data)
+        timer.join()
+
+        # Samples that fail to build are not found
+        url = self.server.register(self.model_data, pending_samples=True)
+        self.server.set_samples(url, None)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.fetch(url + "/sample")
+
+    def test_release(self):
+        server = DataServer(max_widgets=2)
+        self.addCleanup(server.shutdown)
+
+        urls = [server.register(self.model_data) for _ in range(2)]
+        self.fetch(urls[0] + "/term/0")
+
+        # The least recently used widget is unregistered
+        url = server.register(self.model_data)
+        self.assertEqual(len(server._widgets), 2)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.fetch(urls[1] + "/term/0")
+        self.fetch(urls[0] + "/term/0")
+
+        # Profiles are unregistered when they are collected
+        profile = VisualizeProfile()
+        server.register_profile(profile)
+        self.assertEqual(len(server._profiles), 1)
+        del profile
+        gc.collect()
+        self.assertEqual(len(server._profiles), 0)
+
+        server.unregister_all()
+        self.assertEqual(len(server._widgets), 0)
+        self.assertEqual(len(server._cache), 0)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.fetch(url + "/term/0")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.export`."""
+
+import copy
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gamchanger import gamchanger
+from gamchanger.edit import get_edited_model
+from gamchanger.export import iter_history, load_export, save_export
+from tests.synthetic import SyntheticEBM, make_history, make_samples
+
+
+class TestCompactExport(unittest.TestCase):
+    """Tests for the compact *.gamchanger format."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+
+        self.ebm = SyntheticEBM(n_bins=64)
+        x, y = make_samples(self.ebm, n_samples=50)
+        history = make_history(self.ebm, [0, 4, 0, 1, 0, 4, 1])
+
+        # Undo an edit: the state is the same as an earlier one
+        undo = copy.deepcopy(history[1])
+        undo.update({"time": 100, "hash": "undo", "description": "undo"})
+        history.append(undo)
+
+        self.export = {
+            "modelData": gamchanger.get_model_data(self.ebm),
+            "sampleData": gamchanger.get_sample_data(self.ebm, x, y),
+            "historyList": history,
+        }
+
+        self.json_path = os.path.join(self.dir, "edit.gamchanger")
+        with open(self.json_path, "w") as fp:
+            json.dump(self.export, fp)
+
+        self.path = os.path.join(self.dir, "edit-compact.gamchanger")
+        save_export(self.export, self.path)
+
+    def test_round_trip(self):
+        self.assertEqual(load_export(self.path), self.export)
+        self.assertEqual(load_export(self.json_path), self.export)
+        self.assertEqual(list(iter_history(self.path)), self.export["historyList"])
+        self.assertLess(os.path.getsize(self.path), os.path.getsize(self.json_path))
+
+        with gzip.open(self.path, "rt") as fp:
+            records = [json.loads(line) for line in fp][3:]
+
+        self.assertIn("state", records[0]["entry"])
+        self.assertIn("stateDiff", records[3]["entry"])
+        self.assertEqual(
+            records[-1]["entry"]["stateRef"], records[1]["entry"]["stateKey"]
+        )
+
+    def test_get_edited_model(self):
+        expected = get_edited_model(self.ebm, self.export)
+
+        for path in [self.path, self.json_path]:
+            edited = get_edited_model(self.ebm, path, copy_on_write=True)
+            for a, b in zip(edited.term_scores_, expected.term_scores_):
+                np.testing.assert_array_equal(a, b)
+
+    def test_newer_version(self):
+        with gzip.open(self.path, "wt") as fp:
+            fp.write(json.dumps({"format": "gamchanger-compact", "version": 99}))
+
+        with self.assertRaises(ValueError):
+            load_export(self.path)
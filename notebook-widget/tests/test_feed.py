@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.feed`."""
+
+import base64
+import html
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from unittest import mock
+
+from gamchanger import SampleFeed, get_sample_data
+from gamchanger import gamchanger
+from gamchanger.data_server import DataServer
+from tests.synthetic import SyntheticEBM, make_samples
+
+
+class TestSampleFeed(unittest.TestCase):
+    """Tests for SampleFeed."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM()
+        self.x, self.y = make_samples(self.ebm, n_samples=30)
+
+    def test_updates(self):
+        feed = SampleFeed(self.ebm)
+        self.assertEqual(feed.get_updates(0, timeout=0), [])
+
+        self.assertEqual(feed.append(self.x[:10], self.y[:10]), 1)
+        self.assertEqual(feed.append(self.x[10:], self.y[10:]), 2)
+
+        # Each update only has its own rows
+        updates = feed.get_updates(0)
+        self.assertEqual([u["seq"] for u in updates], [1, 2])
+        self.assertEqual(updates[0]["mode"], "append")
+        self.assertEqual(
+            updates[1]["sampleData"],
+            get_sample_data(self.ebm, self.x[10:], self.y[10:], columnar=True),
+        )
+        self.assertEqual(feed.get_updates(1)[0]["sampleData"]["sampleCount"], 20)
+
+        # A replace drops the updates before it
+        feed.replace(self.x[:5], self.y[:5])
+        feed.append(self.x[5:8], self.y[5:8])
+        updates = feed.get_updates(1)
+        self.assertEqual(
+            [(u["seq"], u["mode"]) for u in updates], [(3, "replace"), (4, "append")]
+        )
+        self.assertEqual(feed.get_updates(4, timeout=0), [])
+
+    def test_poll(self):
+        server = DataServer()
+        self.addCleanup(server.shutdown)
+
+        feed = SampleFeed(self.ebm)
+        url = server.register_feed(feed)
+
+        # The poll waits until samples are pushed
+        timer = threading.Timer(0.1, feed.append, (self.x, self.y))
+        timer.start()
+        with urllib.request.urlopen(url + "?after=0") as response:
+            updates = json.loads(response.read())
+        timer.join()
+
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]["sampleData"]["sampleCount"], len(self.y))
+
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "?after=a")
+
+    def test_visualize(self):
+        self.addCleanup(gamchanger.stop_data_server)
+        feed = SampleFeed(self.ebm)
+
+        with mock.patch.object(gamchanger, "_get_js_base64", return_value=""):
+            with mock.patch.object(gamchanger, "display_html") as display:
+                gamchanger.visualize(self.ebm, self.x, self.y, sample_feed=feed)
+
+                with self.assertRaises(ValueError):
+                    gamchanger.visualize(
+                        self.ebm,
+                        self.x,
+                        self.y,
+                        resort_categorical=True,
+                        sample_feed=feed,
+                    )
+
+        # The widget gets the URL of the feed
+        html_str = html.unescape(display.call_args[0][0])
+        messenger = html_str.split("base64,")[-1].split("'")[0]
+        messenger_js = base64.b64decode(messenger).decode("utf-8")
+        self.assertIn('"sampleFeedURL": "http://127.0.0.1:', messenger_js)
@@ -2,10 +2,19 @@
 
 """Tests for `gamchanger` package."""
 
-
+import base64
+import html
+import json
 import unittest
+import urllib.request
+
+from unittest import mock
+
+import numpy as np
+import pandas as pd
 
 from gamchanger import gamchanger
+from tests.synthetic import SyntheticEBM, make_history, make_samples
 
 
 class TestGamchanger(unittest.TestCase):
@@ -19,3 +28,509 @@ class TestGamchanger(unittest.TestCase):
 
     def test_000_something(self):
         """Test something."""
+
+    def test_star_import(self):
+        # The names that `from gamchanger.gamchanger import *` used to export
+        namespace = {}
+        exec("from gamchanger import *", namespace)
+        for name in [
+            "ROUND",
+            "visualize",
+            "get_model_data",
+            "get_sample_data",
+            "get_edited_model",
+        ]:
+            self.assertIs(namespace[name], getattr(gamchanger, name))
+
+
+class TestGetModelData(unittest.TestCase):
+    """Tests for `get_model_data`."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(n_interactions=4, numeric_levels=True)
+
+    def test_main_effects(self):
+        data = gamchanger.get_model_data(self.ebm)
+        self.assertTrue(data["isClassifier"])
+        self.assertEqual(data["intercept"], -1.25)
+
+        importances = self.ebm.term_importances()
+        for i, feature in enumerate(data["features"]):
+            self.assertEqual(feature["importance"], importances[i])
+
+        cont = data["features"][0]
+        self.assertEqual(cont["type"], "continuous")
+        self.assertEqual(
+            cont["additive"], np.round(self.ebm.term_scores_[0], 4)[1:-1].tolist()
+        )
+        self.assertEqual(len(cont["binEdge"]), len(cont["additive"]) + 1)
+        self.assertEqual(len(cont["count"]), len(cont["additive"]))
+
+        cat = data["features"][4]
+        self.assertEqual(cat["type"], "categorical")
+        self.assertEqual(cat["binLabel"], [1, 2, 3, 4, 5])
+        self.assertEqual(cat["histEdge"], cat["binLabel"])
+        self.assertEqual(
+            data["labelEncoder"][cat["name"]],
+            {str(v): k for k, v in self.ebm.bins_[4][0].items()},
+        )
+
+    def test_interactions(self):
+        data = gamchanger.get_model_data(self.ebm)
+        n_features = len(self.ebm.feature_names_in_)
+
+        for i, feature in enumerate(data["features"][n_features:], n_features):
+            a, b = self.ebm.term_features_[i]
+            self.assertEqual(feature["type"], "interaction")
+            self.assertEqual(feature["id"], [a, b])
+            self.assertEqual(
+                np.array(feature["additive"]).shape,
+                (
+                    len(feature["binLabel1"]) - (feature["type1"] == "continuous"),
+                    len(feature["binLabel2"]) - (feature["type2"] == "continuous"),
+                ),
+            )
+
+    def test_compact_grids(self):
+        data = gamchanger.get_model_data(self.ebm)
+        compact = gamchanger.get_model_data(self.ebm, compact_grids=True)
+        n_features = len(self.ebm.feature_names_in_)
+
+        for feature, expected in zip(compact["features"], data["features"]):
+            if feature["type"] != "interaction":
+                self.assertEqual(feature, expected)
+                continue
+
+            for key in ["additive", "error"]:
+                self.assertEqual(feature[key]["encoding"], "grid")
+                self.assertEqual(
+                    gamchanger._decode_grid(feature[key]).tolist(), expected[key]
+                )
+
+        self.assertEqual(compact["features"][n_features]["additive"]["dtype"], "int16")
+
+        # Large scores fall back to float32 and float64, and stay exact
+        for scale, dtype in [(100, "float32"), (1e5, "float64")]:
+            grid = np.round(np.random.default_rng(0).normal(0, scale, (8, 6)), 4)
+            encoded = gamchanger._encode_grid(grid)
+            self.assertEqual(encoded["dtype"], dtype)
+            self.assertEqual(encoded["shape"], [8, 6])
+            self.assertEqual(gamchanger._decode_grid(encoded).tolist(), grid.tolist())
+
+    def test_merge_plateaus(self):
+        # Make a flat segment with the same score and error
+        self.ebm.term_scores_[0][3:9] = 0.5
+        self.ebm.standard_deviations_[0][3:9] = 0.1
+
+        data = gamchanger.get_model_data(self.ebm)
+        merged = gamchanger.get_model_data(self.ebm, merge_plateaus=True)
+        self.assertIn("plateaus", merged["features"][0])
+
+        for feature, expected in zip(merged["features"], data["features"]):
+            if "plateaus" not in feature:
+                self.assertEqual(feature, expected)
+                continue
+
+            self.assertLess(len(feature["additive"]), len(expected["additive"]))
+            self.assertEqual(sum(feature["plateaus"]), len(expected["count"]))
+            self.assertEqual(feature["binEdge"], expected["binEdge"])
+            self.assertEqual(feature["count"], expected["count"])
+
+            additive, error = gamchanger._decode_plateaus(
+                feature["additive"], feature["error"], feature["plateaus"]
+            )
+            self.assertEqual(additive.tolist(), expected["additive"])
+            self.assertEqual(error.tolist(), expected["error"])
+
+        # Edits on the expanded plateaus keep the original bins
+        feature = merged["features"][0]
+        additive, _ = gamchanger._decode_plateaus(
+            feature["additive"], feature["error"], feature["plateaus"]
+        )
+        scores = additive.tolist()
+        scores[0] += 1
+        edges = np.round(feature["binEdge"][:-1], 4).tolist()
+        point_data = {
+            str(j): {
+                "x": x,
+                "y": y,
+                "id": j,
+                "rightPointID": j + 1 if j < len(edges) - 1 else None,
+            }
+            for j, (x, y) in enumerate(zip(edges, scores))
+        }
+        history = make_history(self.ebm, [])
+        history.append(dict(history[0], type="transform"))
+        history[1]["state"] = {"pointData": point_data, "additiveData": []}
+
+        edited = gamchanger.get_edited_model(self.ebm, {"historyList": history})
+        np.testing.assert_array_equal(edited.bins_[0][0], self.ebm.bins_[0][0])
+        np.testing.assert_array_equal(
+            edited.standard_deviations_[0][2:], self.ebm.standard_deviations_[0][2:]
+        )
+        self.assertEqual(edited.term_scores_[0][1], round(scores[0], 4))
+
+    def test_resort_categorical(self):
+        data = gamchanger.get_model_data(self.ebm, resort_categorical=True)
+        cat = data["features"][4]
+        levels = self.ebm.bins_[4][0]
+
+        # Levels are sorted by their numeric values and scores follow the levels
+        decoded = [
+            float(data["labelEncoder"][cat["name"]][str(b)]) for b in cat["binLabel"]
+        ]
+        self.assertEqual(decoded, sorted(decoded))
+
+        for label, additive in zip(cat["binLabel"], cat["additive"]):
+            level = data["labelEncoder"][cat["name"]][str(label)]
+            self.assertEqual(
+                additive, round(self.ebm.term_scores_[4][levels[level]], 4)
+            )
+
+
+class TestGetSampleData(unittest.TestCase):
+    """Tests for `get_sample_data`."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(numeric_levels=True)
+        self.x, self.y = make_samples(self.ebm, n_samples=50)
+
+    def test_encode_categorical(self):
+        self.x.iloc[0, 4] = "unseen"
+        data = gamchanger.get_sample_data(self.ebm, self.x, pd.Series(self.y))
+
+        self.assertEqual(data["featureNames"], self.ebm.feature_names_in_)
+        self.assertEqual(len(data["samples"]), 50)
+        self.assertEqual(data["labels"], self.y.tolist())
+
+        levels = self.ebm.bins_[4][0]
+        codes = [row[4] for row in data["samples"]]
+        self.assertEqual(codes[0], max(levels.values()) + 1)
+        self.assertEqual(codes[1:], [levels[v] for v in self.x.iloc[1:, 4]])
+        self.assertEqual(
+            [row[0] for row in data["samples"]], self.x.iloc[:, 0].tolist()
+        )
+
+    def test_resort_categorical(self):
+        data = gamchanger.get_sample_data(
+            self.ebm, self.x.to_numpy(), self.y, resort_categorical=True
+        )
+        levels = gamchanger._resort_categorical_level(self.ebm.bins_[5][0])
+        self.assertEqual(
+            [row[5] for row in data["samples"]], [levels[v] for v in self.x.iloc[:, 5]]
+        )
+
+    def test_drop_missing_values(self):
+        self.x.iloc[3, 1] = np.nan
+        self.x.iloc[7, 5] = None
+
+        with self.assertWarns(UserWarning):
+            data = gamchanger.get_sample_data(self.ebm, self.x, self.y)
+
+        self.assertEqual(len(data["samples"]), 48)
+        self.assertEqual(data["labels"], np.delete(self.y, [3, 7]).tolist())
+
+    def test_columnar(self):
+        rows = gamchanger.get_sample_data(self.ebm, self.x, self.y)
+        data = gamchanger.get_sample_data(self.ebm, self.x, self.y, columnar=True)
+
+        self.assertEqual(data["encoding"], "columnar")
+        self.assertEqual(data["sampleCount"], 50)
+        self.assertEqual(data["columns"][4]["dtype"], "uint8")
+        self.assertEqual(data["labels"]["dtype"], "uint8")
+
+        columns = [gamchanger._decode_typed_array(c) for c in data["columns"]]
+        self.assertEqual(np.column_stack(columns).tolist(), rows["samples"])
+        self.assertEqual(
+            gamchanger._decode_typed_array(data["labels"]).tolist(), rows["labels"]
+        )
+
+    def test_columnar_string_labels(self):
+        y = np.where(self.y == 1, "yes", "no").astype(object)
+
+        # Non-numeric labels are kept as a list, numeric strings are encoded
+        data = gamchanger.get_sample_data(self.ebm, self.x, y, columnar=True)
+        self.assertEqual(data["labels"], y.tolist())
+
+        data = gamchanger.get_sample_data(
+            self.ebm, self.x, self.y.astype(str), columnar=True
+        )
+        self.assertEqual(
+            gamchanger._decode_typed_array(data["labels"]).tolist(), self.y.tolist()
+        )
+
+    def test_encode_typed_array(self):
+        exact = np.array([0.5, 17.25, 225165.0])
+        self.assertEqual(gamchanger._encode_typed_array(exact)["dtype"], "float32")
+
+        inexact = np.array([0.1, 1 / 3])
+        encoded = gamchanger._encode_typed_array(inexact)
+        self.assertEqual(encoded["dtype"], "float64")
+        self.assertEqual(gamchanger._decode_typed_array(encoded).tolist(), [0.1, 1 / 3])
+
+        codes = np.array([1, 300, 70000])
+        self.assertEqual(gamchanger._encode_typed_array(codes)["dtype"], "int32")
+
+    def test_reservoir_sampling(self):
+        chunks = [self.x.iloc[i : i + 20] for i in range(0, 50, 20)]
+        label_chunks = [self.y[i : i + 20] for i in range(0, 50, 20)]
+
+        data = gamchanger.get_sample_data(
+            self.ebm, iter(chunks), iter(label_chunks), max_samples=10, random_state=0
+        )
+        self.assertEqual(len(data["samples"]), 10)
+        self.assertEqual(data["totalSampleCount"], 50)
+        self.assertNotIn("sampleWeights", data)
+
+        # Samples are real rows and keep their order
+        rows = gamchanger.get_sample_data(self.ebm, self.x, self.y)["samples"]
+        positions = [rows.index(row) for row in data["samples"]]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_stratified_sampling(self):
+        y = np.array([1] * 5 + [0] * 45)
+        data = gamchanger.get_sample_data(
+            self.ebm, self.x, y, max_samples=20, sampling="stratified", random_state=0
+        )
+        labels = np.array(data["labels"])
+
+        # The labels keep their proportions, so samples weigh the same
+        self.assertEqual(np.sum(labels == 1), 2)
+        self.assertEqual(np.sum(labels == 0), 18)
+        self.assertEqual(data["totalSampleCount"], 50)
+
+    def test_allocate_sample_budget(self):
+        quotas = gamchanger._allocate_sample_budget({0: 980, 1: 20}, 50)
+        self.assertEqual(quotas, {0: 49, 1: 1})
+
+        # Rare labels are not over-represented
+        quotas = gamchanger._allocate_sample_budget({0: 995, 1: 3, 2: 2}, 50)
+        self.assertEqual(quotas, {0: 50, 1: 0, 2: 0})
+        quotas = gamchanger._allocate_sample_budget({0: 990, 1: 3}, 5000)
+        self.assertEqual(quotas, {0: 990, 1: 3})
+
+
+class TestGetEditedModel(unittest.TestCase):
+    """Tests for `get_edited_model`."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM()
+        self.export = {"historyList": make_history(self.ebm, [0, 4, 2, 0])}
+
+    def assertModelEqual(self, ebm_1, ebm_2):
+        for name in ["term_scores_", "standard_deviations_"]:
+            for a, b in zip(getattr(ebm_1, name), getattr(ebm_2, name)):
+                np.testing.assert_array_equal(a, b)
+
+        for a, b in zip(ebm_1.bins_, ebm_2.bins_):
+            np.testing.assert_array_equal(a[0], b[0])
+
+        np.testing.assert_array_equal(ebm_1.feature_bounds_, ebm_2.feature_bounds_)
+
+    def test_edit_scores(self):
+        edited = gamchanger.get_edited_model(self.ebm, self.export)
+        history = self.export["historyList"]
+
+        # The latest edit of each feature wins
+        for i, entry in [(0, history[4]), (2, history[3]), (4, history[2])]:
+            points = entry["state"]["pointData"].values()
+            scores = np.round(edited.term_scores_[i], 4)[1:-1]
+            if self.ebm.feature_types_in_[i] == "continuous":
+                self.assertEqual(scores.tolist(), [p["y"] for p in points])
+            else:
+                levels = self.ebm.bins_[i][0]
+                for p in points:
+                    self.assertEqual(scores[levels[p["x"]] - 1], p["y"])
+
+        self.assertModelEqual(
+            gamchanger.get_edited_model(self.ebm, {"historyList": []}), self.ebm
+        )
+
+    def test_copy_on_write(self):
+        original = gamchanger.get_edited_model(self.ebm, {"historyList": []})
+        expected = gamchanger.get_edited_model(self.ebm, self.export)
+        edited = gamchanger.get_edited_model(self.ebm, self.export, copy_on_write=True)
+
+        self.assertModelEqual(edited, expected)
+        self.assertModelEqual(self.ebm, original)
+
+        # Only the arrays of edited features are copied
+        for i in range(len(self.ebm.term_scores_)):
+            shared = i not in [0, 2, 4]
+            self.assertEqual(edited.term_scores_[i] is self.ebm.term_scores_[i], shared)
+            if i < len(self.ebm.bins_):
+                self.assertEqual(edited.bins_[i] is self.ebm.bins_[i], shared)
+
+    def test_merge_bins(self):
+        export = {"historyList": make_history(self.ebm, [1], merge_bins=True)}
+        edited = gamchanger.get_edited_model(self.ebm, export, copy_on_write=True)
+
+        self.assertEqual(len(edited.bins_[1][0]), len(self.ebm.bins_[1][0]) - 1)
+        self.assertEqual(len(edited.term_scores_[1]), len(self.ebm.term_scores_[1]) - 1)
+        self.assertFalse(np.any(edited.standard_deviations_[1]))
+        self.assertEqual(
+            len(edited.standard_deviations_[1]), len(edited.term_scores_[1])
+        )
+        self.assertTrue(np.all(self.ebm.standard_deviations_[1]))
+
+    def test_standard_deviations(self):
+        export = {"historyList": make_history(self.ebm, [0, 2])}
+        edited = gamchanger.get_edited_model(self.ebm, export)
+
+        # Only the SDs of modified bins are zeroed out
+        for i in [0, 2]:
+            modified = np.round(self.ebm.term_scores_[i], 4) != np.round(
+                edited.term_scores_[i], 4
+            )
+            self.assertTrue(np.any(modified))
+            np.testing.assert_array_equal(edited.standard_deviations_[i] == 0, modified)
+
+    def test_unordered_points(self):
+        history = make_history(self.ebm, [1])
+        expected = gamchanger.get_edited_model(self.ebm, {"historyList": history})
+
+        # The linked list, not the key order, defines the order of points
+        points = history[-1]["state"]["pointData"]
+        history[-1]["state"]["pointData"] = dict(reversed(list(points.items())))
+        edited = gamchanger.get_edited_model(self.ebm, {"historyList": history})
+
+        self.assertModelEqual(edited, expected)
+
+    def test_edit_model_inplace(self):
+        expected = gamchanger.get_edited_model(self.ebm, self.export)
+        edited = gamchanger.edit_model_inplace(self.ebm, self.export)
+
+        self.assertIs(edited, self.ebm)
+        self.assertModelEqual(edited, expected)
+
+
+class TestMakeHtml(unittest.TestCase):
+    """Tests for the widget HTML."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM()
+        self.x, self.y = make_samples(self.ebm, n_samples=20)
+
+        patcher = mock.patch.object(
+            gamchanger.pkgutil, "get_data", return_value=b"/* gamchanger.js */"
+        )
+        self.get_data = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, gamchanger, "_JS_BASE64", None)
+        self.addCleanup(setattr, gamchanger, "_USE_SHARED_BUNDLE", False)
+        gamchanger._JS_BASE64 = None
+
+    def test_bundle_is_cached(self):
+        bundle = base64.b64encode(b"/* gamchanger.js */").decode("utf-8")
+
+        for _ in range(3):
+            html_str = gamchanger._make_html(self.ebm, self.x, self.y, False)
+            self.assertIn(bundle, html.unescape(html_str))
+
+        self.get_data.assert_called_once()
+
+    def test_shared_bundle(self):
+        bundle = base64.b64encode(b"/* gamchanger.js */").decode("utf-8")
+
+        with mock.patch.object(gamchanger, "display_html") as display:
+            gamchanger.init_notebook_mode()
+        self.assertIn(bundle, display.call_args[0][0])
+
+        html_str = html.unescape(gamchanger._make_html(self.ebm, self.x, self.y, False))
+        self.assertNotIn(bundle, html_str)
+        self.assertIn("gamchangerBundleURL", html_str)
+
+    def test_profile(self):
+        gamchanger.stop_data_server()
+        self.addCleanup(gamchanger.stop_data_server)
+
+        with mock.patch.object(gamchanger, "display_html") as display:
+            self.assertIsNone(gamchanger.visualize(self.ebm, self.x, self.y))
+            profile = gamchanger.visualize(self.ebm, self.x, self.y, profile=True)
+
+        stages = [s["stage"] for s in profile.stages]
+        self.assertEqual(
+            stages,
+            [
+                "get_model_data",
+                "get_sample_data",
+                "json.dumps",
+                "base64 data",
+                "base64 bundle",
+                "html.escape",
+                "iframe",
+                "display_html",
+            ],
+        )
+        self.assertEqual(list(profile.sections), ["model", "samples", "bundle", "html"])
+        self.assertEqual(
+            [f["name"] for f in profile.features],
+            [f["name"] for f in gamchanger.get_model_data(self.ebm)["features"]],
+        )
+        self.assertIsNone(profile.widget)
+        self.assertIn("total", profile.summary())
+
+        # Inline widgets only log their timings, so profiling does not start
+        # the local data server
+        def get_messenger_js():
+            html_str = html.unescape(display.call_args[0][0])
+            messenger = html_str.split("base64,")[-1].split("'")[0]
+            return base64.b64decode(messenger).decode("utf-8")
+
+        messenger_js = get_messenger_js()
+        self.assertIn("firstRender", messenger_js)
+        self.assertNotIn("/profile", messenger_js)
+        self.assertIsNone(gamchanger._DATA_SERVER)
+
+        # Widgets on the data server post their timings to it
+        with mock.patch.object(gamchanger, "display_html") as display:
+            gamchanger.visualize(
+                self.ebm, self.x, self.y, profile=True, data_server=True
+            )
+        self.assertIn("/profile", get_messenger_js())
+
+    def test_background(self):
+        self.addCleanup(gamchanger.stop_data_server)
+
+        with mock.patch.object(gamchanger, "display_html") as display:
+            future = gamchanger.visualize(
+                self.ebm, self.x, self.y, profile=True, background=True
+            )
+            profile = future.result(timeout=30)
+
+        # A placeholder is displayed first and then updated with the widget
+        self.assertIn("GAM Changer", display.call_args[0][0])
+        self.assertTrue(display.call_args[1]["display_id"])
+        handle = display.return_value
+        iframe = handle.update.call_args[0][0]["text/html"]
+
+        # The model is inlined, and the samples are streamed after it
+        html_str = html.unescape(iframe)
+        messenger = html_str.split("base64,")[-1].split("'")[0]
+        data = json.loads(
+            base64.b64decode(messenger)
+            .decode("utf-8")
+            .split("let data = ")[1]
+            .split(";\n")[0]
+        )
+        self.assertEqual(data["model"], gamchanger.get_model_data(self.ebm))
+        self.assertIsNone(data["sample"])
+
+        with urllib.request.urlopen(data["sampleURL"]) as response:
+            self.assertEqual(
+                json.loads(response.read()),
+                gamchanger.get_sample_data(self.ebm, self.x, self.y),
+            )
+
+        stages = [s["stage"] for s in profile.stages]
+        self.assertEqual(stages[0], "get_model_data")
+        self.assertEqual(stages[-2:], ["display_html", "get_sample_data"])
+
+    def test_background_error(self):
+        with mock.patch.object(gamchanger, "display_html") as display:
+            with self.assertLogs("gamchanger", "ERROR"):
+                future = gamchanger.visualize(object(), background=True)
+                self.assertIsNotNone(future.exception(timeout=30))
+
+        message = display.return_value.update.call_args[0][0]["text/html"]
+        self.assertIn("failed to build the data", message)
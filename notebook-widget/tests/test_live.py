@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.live`."""
+
+import base64
+import html
+import json
+import unittest
+import urllib.error
+import urllib.request
+
+from unittest import mock
+
+import numpy as np
+
+from gamchanger import LiveModel, get_edited_model
+from gamchanger import gamchanger
+from gamchanger.data_server import DataServer
+from gamchanger.edit import _read_categorical_points, _read_continuous_points
+from tests.synthetic import SyntheticEBM, make_history, make_samples
+
+
+def _make_delta(ebm, entry):
+    """Create the delta that the widget posts for a history entry."""
+    i = ebm.feature_names_in_.index(entry["featureName"])
+    if ebm.feature_types_in_[i] == "continuous":
+        edges, scores = _read_continuous_points(entry["state"]["pointData"])
+    else:
+        edges, scores = _read_categorical_points(entry["state"]["pointData"])
+
+    delta = {k: entry[k] for k in ["featureName", "type", "description", "hash"]}
+    delta.update({"time": entry["time"], "edges": edges, "scores": scores})
+    return delta
+
+
+class TestLiveModel(unittest.TestCase):
+    """Tests for LiveModel."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM()
+        self.history = make_history(self.ebm, [0, 4, 1, 0, 5], merge_bins=True)
+
+    def assertModelEqual(self, model, expected):
+        for name in ["term_scores_", "standard_deviations_"]:
+            for a, b in zip(getattr(model, name), getattr(expected, name)):
+                np.testing.assert_array_equal(a, b)
+        for a, b in zip(model.bins_, expected.bins_):
+            self.assertEqual(len(a), len(b))
+            if isinstance(a[0], dict):
+                self.assertEqual(a[0], b[0])
+            else:
+                np.testing.assert_array_equal(a[0], b[0])
+        np.testing.assert_array_equal(model.feature_bounds_, expected.feature_bounds_)
+
+    def test_apply(self):
+        live = LiveModel(self.ebm)
+
+        # Apply the history one entry at a time
+        for step, entry in enumerate(self.history[1:], 2):
+            live.apply([_make_delta(self.ebm, entry)])
+            expected = get_edited_model(self.ebm, {"historyList": self.history[:step]})
+            self.assertModelEqual(live.model, expected)
+
+        self.assertEqual(live.version, len(self.history) - 1)
+        self.assertEqual(list(live.edits), ["cat_4", "cont_1", "cont_0", "cat_5"])
+        self.assertModelEqual(get_edited_model(self.ebm, live.to_export()), live.model)
+
+        # Resetting a feature restores its original arrays
+        snapshot = live.snapshot()
+        live.apply([{"featureName": "cont_0", "type": "original"}])
+        self.assertIs(live.model.term_scores_[0], self.ebm.term_scores_[0])
+        self.assertNotIn("cont_0", live.edits)
+        self.assertIsNot(snapshot.term_scores_[0], self.ebm.term_scores_[0])
+
+        # The original model is not modified
+        self.assertModelEqual(self.ebm, SyntheticEBM())
+
+    def test_post_edits(self):
+        server = DataServer()
+        self.addCleanup(server.shutdown)
+
+        live = LiveModel(self.ebm)
+        changed = []
+        live.observe(lambda name, model: changed.append(name))
+
+        url = server.register_live(live)
+        deltas = [_make_delta(self.ebm, entry) for entry in self.history[1:3]]
+        request = urllib.request.Request(
+            url, data=json.dumps(deltas).encode(), method="POST"
+        )
+        with urllib.request.urlopen(request) as response:
+            self.assertEqual(response.status, 204)
+
+        self.assertTrue(live.wait(2, timeout=1))
+        self.assertEqual(changed, ["cont_0", "cat_4"])
+        self.assertModelEqual(
+            live.model, get_edited_model(self.ebm, {"historyList": self.history[:3]})
+        )
+
+    def test_post_bad_edits(self):
+        server = DataServer()
+        self.addCleanup(server.shutdown)
+
+        live = LiveModel(self.ebm)
+        url = server.register_live(live)
+        bad_deltas = [
+            [{"featureName": "unknown", "type": "original"}],
+            [{"featureName": "cont_0", "type": "transform", "edges": [1.0]}],
+            {"featureName": "cont_0"},
+            "not a list",
+        ]
+
+        for deltas in bad_deltas:
+            request = urllib.request.Request(
+                url, data=json.dumps(deltas).encode(), method="POST"
+            )
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)
+            self.assertEqual(context.exception.code, 404)
+
+        self.assertEqual(live.version, 0)
+
+    def test_visualize(self):
+        self.addCleanup(gamchanger.stop_data_server)
+        x, y = make_samples(self.ebm, n_samples=20)
+        live = LiveModel(self.ebm)
+
+        with mock.patch.object(gamchanger, "_get_js_base64", return_value=""):
+            with mock.patch.object(gamchanger, "display_html") as display:
+                gamchanger.visualize(self.ebm, x, y, live=live)
+
+        # The widget gets the URL of the live model
+        html_str = html.unescape(display.call_args[0][0])
+        messenger = html_str.split("base64,")[-1].split("'")[0]
+        messenger_js = base64.b64decode(messenger).decode("utf-8")
+        self.assertIn('"editURL": "http://127.0.0.1:', messenger_js)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.replay`."""
+
+import unittest
+
+import numpy as np
+
+from gamchanger.edit import get_edited_model
+from gamchanger.replay import _replace_sorted, replay_history
+from gamchanger.scoring import ScoringEngine
+from tests.synthetic import SyntheticEBM, make_history, make_samples
+
+
+class TestReplayHistory(unittest.TestCase):
+    """Tests for `replay_history`."""
+
+    def assertReplayEqual(self, ebm, history, x, y):
+        table = replay_history(ebm, {"historyList": history}, x, y)
+        self.assertEqual(len(table), len(history))
+
+        for k, row in enumerate(table):
+            edited = get_edited_model(ebm, {"historyList": history[: k + 1]})
+            expected = ScoringEngine.from_ebm(edited).evaluate(x, y)
+
+            for key, value in expected.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(row[key], value, places=9)
+                else:
+                    self.assertEqual(row[key], value)
+
+        return table
+
+    def test_classifier(self):
+        ebm = SyntheticEBM()
+        x, y = make_samples(ebm, n_samples=500)
+        history = make_history(ebm, [0, 4, 0, 5, 2, 0, 4])
+
+        table = self.assertReplayEqual(ebm, history, x, y)
+        self.assertEqual(table[0]["changedRows"], 0)
+
+        # Later edits of a feature only touch the rows of changed bins
+        self.assertEqual(table[1]["changedRows"], 500)
+        self.assertLess(table[3]["changedRows"], 500)
+
+    def test_merge_bins(self):
+        ebm = SyntheticEBM()
+        x, y = make_samples(ebm, n_samples=500)
+        x.iloc[:10, 1] = np.nan
+        history = make_history(ebm, [1, 3, 1, 1], merge_bins=True)
+
+        self.assertReplayEqual(ebm, history, x, y)
+
+    def test_shared_pair_bins(self):
+        # Interaction terms use the main bins if bins_[i] has a single entry
+        ebm = SyntheticEBM(n_pair_bins=16)
+        for i in range(4):
+            ebm.bins_[i] = ebm.bins_[i][:1]
+
+        x, y = make_samples(ebm, n_samples=500)
+        history = make_history(ebm, [1, 0, 1, 2], merge_bins=True)
+
+        self.assertReplayEqual(ebm, history, x, y)
+
+    def test_regressor(self):
+        ebm = SyntheticEBM(classifier=False)
+        x, y = make_samples(ebm, n_samples=300)
+        history = make_history(ebm, [0, 5, 0, 1])
+
+        self.assertReplayEqual(ebm, history, x.to_numpy(), y)
+
+    def test_replace_sorted(self):
+        values = np.array([0.5, 1.0, 1.0, 1.0, 2.0])
+        replaced = _replace_sorted(values, np.array([1.0, 1.0]), np.array([3.0, 0.0]))
+        self.assertEqual(replaced.tolist(), [0.0, 0.5, 1.0, 2.0, 3.0])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""Tests for `gamchanger.scoring`."""
+
+import unittest
+
+import numpy as np
+
+from gamchanger import gamchanger
+from gamchanger.scoring import ScoringEngine, roc_auc
+from tests.synthetic import SyntheticEBM, make_samples
+
+
+def reference_score(ebm, x):
+    """Score samples one by one with plain Python."""
+    scores = []
+
+    for _, row in x.iterrows():
+        score = ebm.intercept_[0] if hasattr(ebm, "classes_") else ebm.intercept_
+
+        for features, term_scores in zip(ebm.term_features_, ebm.term_scores_):
+            index = []
+            for j in features:
+                bins = ebm.bins_[j][0 if len(features) == 1 else -1]
+                if ebm.feature_types_in_[j] == "continuous":
+                    index.append(int(np.sum(row.iloc[j] >= bins)) + 1)
+                else:
+                    index.append(bins.get(row.iloc[j], len(bins) + 1))
+            score += term_scores[tuple(index)]
+
+        scores.append(score)
+
+    return np.array(scores)
+
+
+class TestScoringEngine(unittest.TestCase):
+    """Tests for `ScoringEngine`."""
+
+    def setUp(self):
+        self.ebm = SyntheticEBM(n_interactions=4)
+        self.x, self.y = make_samples(self.ebm, n_samples=300)
+
+    def test_score(self):
+        self.x.iloc[0, 4] = "unseen"
+        self.x.iloc[1, 0] = np.nan
+
+        engine = ScoringEngine.from_ebm(self.ebm)
+        expected = reference_score(self.ebm, self.x)
+
+        # The unknown level uses the last bin
+        scores = engine.score(self.x, chunk_size=64)
+        np.testing.assert_allclose(np.delete(scores, 1), np.delete(expected, 1))
+        np.testing.assert_allclose(engine.score(self.x.to_numpy()), scores)
+
+        # Missing values use the first bin
+        bins = engine.bin_feature(0, np.array([np.nan, -1.0, 1000.0]))
+        self.assertEqual(bins.tolist(), [0, 1, len(self.ebm.bins_[0][0]) + 1])
+
+    def test_from_model_data(self):
+        model_data = gamchanger.get_model_data(self.ebm)
+        engine = ScoringEngine.from_model_data(model_data)
+
+        expected = ScoringEngine.from_ebm(self.ebm).score(self.x)
+        np.testing.assert_allclose(engine.score(self.x), expected, atol=1e-3)
+
+    def test_from_plateau_model_data(self):
+        # Flat runs of bins are sent as plateaus
+        self.ebm.term_scores_[0][3:8] = 0.5
+        self.ebm.standard_deviations_[0][3:8] = 0.1
+        model_data = gamchanger.get_model_data(self.ebm, merge_plateaus=True)
+        self.assertIn("plateaus", model_data["features"][0])
+        engine = ScoringEngine.from_model_data(model_data)
+
+        expected = ScoringEngine.from_ebm(self.ebm).score(self.x)
+        np.testing.assert_allclose(engine.score(self.x), expected, atol=1e-3)
+
+    def test_from_compact_model_data(self):
+        model_data = gamchanger.get_model_data(self.ebm, compact_grids=True)
+        engine = ScoringEngine.from_model_data(model_data)
+
+        expected = ScoringEngine.from_ebm(self.ebm).score(self.x)
+        np.testing.assert_allclose(engine.score(self.x), expected, atol=1e-3)
+
+    def test_from_resorted_model_data(self):
+        # Numeric levels are resorted, also in the interaction terms
+        ebm = SyntheticEBM(numeric_levels=True, n_interactions=15)
+        x, _ = make_samples(ebm)
+        model_data = gamchanger.get_model_data(ebm, resort_categorical=True)
+        engine = ScoringEngine.from_model_data(model_data)
+
+        expected = ScoringEngine.from_ebm(ebm).score(x)
+        np.testing.assert_allclose(engine.score(x), expected, atol=1e-3)
+
+    def test_classification_metrics(self):
+        engine = ScoringEngine.from_ebm(self.ebm)
+        metrics = engine.evaluate(self.x, self.y, chunk_size=64)
+
+        scores = engine.score(self.x)
+        predictions = scores >= 0
+        labels = self.y == 1
+
+        tn, fn, fp, tp = metrics["confusionMatrix"]
+        self.assertEqual(tp, np.sum(predictions & labels))
+        self.assertEqual(fn, np.sum(~predictions & labels))
+        self.assertEqual(tn + fn + fp + tp, 300)
+        self.assertAlmostEqual(metrics["accuracy"], np.mean(predictions == labels))
+        self.assertAlmostEqual(
+            metrics["balancedAccuracy"], (tp / (tp + fn) + tn / (tn + fp)) / 2
+        )
+
+        # Compare with the fraction of correctly ordered (pos, neg) pairs
+        diff = scores[labels][:, None] - scores[~labels][None, :]
+        self.assertAlmostEqual(
+            metrics["rocAuc"], np.mean((diff > 0) + 0.5 * (diff == 0))
+        )
+
+        # Chunked inputs give the same metrics
+        chunks = [self.x.iloc[i : i + 100] for i in range(0, 300, 100)]
+        labels = [self.y[i : i + 100] for i in range(0, 300, 100)]
+        self.assertEqual(engine.evaluate(iter(chunks), iter(labels)), metrics)
+
+    def test_regression_metrics(self):
+        ebm = SyntheticEBM(classifier=False)
+        x, y = make_samples(ebm, n_samples=100)
+        metrics = ScoringEngine.from_ebm(ebm).evaluate(x, y)
+
+        errors = y - reference_score(ebm, x)
+        self.assertAlmostEqual(metrics["rmse"], np.sqrt(np.mean(errors**2)))
+        self.assertAlmostEqual(metrics["mae"], np.mean(np.abs(errors)))
+        self.assertAlmostEqual(metrics["mape"], np.mean(np.abs(errors / y)))
+
+    def test_roc_auc_ties(self):
+        scores = np.array([0.1, 0.4, 0.4, 0.8])
+        labels = np.array([False, True, False, True])
+        self.assertAlmostEqual(roc_auc(scores, labels), 0.875)
+        self.assertIsNone(roc_auc(scores, np.ones(4, dtype=bool)))
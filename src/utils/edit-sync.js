@@ -0,0 +1,97 @@
+/**
+ * Stream the edits of a notebook widget to the `LiveModel` in the kernel
+ * (see `gamchanger.live` in the Python package)
+ */
+
+/**
+ * Create the compact delta of a history entry: its feature's bin edges (or
+ * level names) and scores, without the drawing state.
+ * @param {object} entry History entry
+ * @returns {object} Delta
+ */
+export const createEditDelta = (entry) => {
+  const points = entry.state.pointData;
+  let edges = [];
+  let scores = [];
+
+  if (points[0] !== undefined) {
+    // Continuous points form a linked list from point 0
+    let curPoint = points[0];
+    while (curPoint !== undefined) {
+      edges.push(curPoint.x);
+      scores.push(curPoint.y);
+      curPoint = curPoint.rightPointID === null ? undefined : points[curPoint.rightPointID];
+    }
+  } else {
+    Object.values(points).forEach(d => {
+      edges.push(d.x);
+      scores.push(d.y);
+    });
+  }
+
+  return {
+    featureName: entry.featureName,
+    type: entry.type,
+    description: entry.description,
+    time: entry.time,
+    hash: entry.hash,
+    edges: edges,
+    scores: scores
+  };
+};
+
+/**
+ * Post the changes of each feature's latest edit to the kernel. The kernel
+ * applies the latest edit of each feature the same way as
+ * `get_edited_model()`, so we skip the entries of type 'original'.
+ */
+export class EditSync {
+  /**
+   * @param {string} url URL that the deltas are posted to
+   */
+  constructor(url) {
+    this.url = url;
+    this.syncedHashes = new Map();
+
+    // Post the deltas one request at a time to keep their order
+    this.queue = Promise.resolve();
+  }
+
+  /**
+   * Post the deltas of the features whose latest edit has changed.
+   * @param {[object]} historyList Current history list
+   */
+  update(historyList) {
+    const latestEdits = new Map();
+    historyList.forEach(d => {
+      if (d.type !== 'original') {
+        latestEdits.delete(d.featureName);
+        latestEdits.set(d.featureName, d);
+      }
+    });
+
+    const deltas = [];
+
+    // Features whose edits are all undone or deleted are reset
+    this.syncedHashes.forEach((hash, name) => {
+      if (!latestEdits.has(name)) {
+        deltas.push({ featureName: name, type: 'original' });
+      }
+    });
+
+    latestEdits.forEach((d, name) => {
+      if (this.syncedHashes.get(name) !== d.hash) {
+        deltas.push(createEditDelta(d));
+      }
+    });
+
+    this.syncedHashes = new Map([...latestEdits].map(([name, d]) => [name, d.hash]));
+
+    if (deltas.length === 0) return;
+
+    const body = JSON.stringify(deltas);
+    this.queue = this.queue
+      .then(() => fetch(this.url, { method: 'POST', body: body }))
+      .catch(error => console.error('Failed to sync edits to the kernel', error));
+  }
+}
@@ -0,0 +1,89 @@
+/**
+ * Readers for the compact GAM Changer export format written by
+ * `gamchanger.export.save_export()` in the Python package
+ */
+
+const FORMAT = 'gamchanger-compact';
+const FORMAT_VERSION = 1;
+
+/**
+ * Apply the changes of a `stateDiff` to a copy of the old state.
+ * @param {object} oldState Previous state of the same feature
+ * @param {object} diff {set, del, ...changed state fields}
+ * @returns {object} New state
+ */
+const applyDiff = (oldState, diff) => {
+  const state = { ...oldState };
+  const points = { ...oldState.pointData };
+
+  diff.del.forEach(k => delete points[k]);
+  Object.assign(points, diff.set);
+  state.pointData = points;
+
+  Object.keys(diff).forEach(key => {
+    if (key !== 'set' && key !== 'del') state[key] = diff[key];
+  });
+
+  return state;
+};
+
+/**
+ * Parse the JSON lines of a compact export into the regular export object.
+ * @param {string} text Decompressed JSON lines
+ * @returns {object} {modelData, sampleData, historyList}
+ */
+export const parseCompactExport = (text) => {
+  const lines = text.split('\n').filter(d => d.trim() !== '');
+  const header = JSON.parse(lines[0]);
+
+  if (header.format !== FORMAT || header.version > FORMAT_VERSION) {
+    throw new Error('Unsupported .gamchanger format');
+  }
+
+  const data = { historyList: [] };
+  const latestStates = new Map();
+  const keptStates = new Map();
+
+  for (let i = 1; i < lines.length; i++) {
+    const record = JSON.parse(lines[i]);
+
+    if (record.field !== undefined) {
+      data[record.field] = record.value;
+      continue;
+    }
+
+    const entry = record.entry;
+    if (entry.stateRef !== undefined) {
+      entry.state = keptStates.get(entry.stateRef);
+      delete entry.stateRef;
+    } else if (entry.stateDiff !== undefined) {
+      entry.state = applyDiff(latestStates.get(entry.featureName), entry.stateDiff);
+      delete entry.stateDiff;
+    }
+
+    if (entry.stateKey !== undefined) {
+      keptStates.set(entry.stateKey, entry.state);
+      delete entry.stateKey;
+    }
+
+    latestStates.set(entry.featureName, entry.state);
+    data.historyList.push(entry);
+  }
+
+  return data;
+};
+
+/**
+ * Read a .gamchanger file in the JSON or the compact (gzip) format.
+ * @param {File} file .gamchanger file
+ * @returns {object} {modelData, sampleData, historyList}
+ */
+export const readGamchangerFile = async (file) => {
+  const bytes = new Uint8Array(await file.slice(0, 2).arrayBuffer());
+  const isCompact = bytes[0] === 0x1f && bytes[1] === 0x8b;
+
+  if (!isCompact) return JSON.parse(await file.text());
+
+  const stream = file.stream().pipeThrough(new DecompressionStream('gzip'));
+  return parseCompactExport(await new Response(stream).text());
+};
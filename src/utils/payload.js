@@ -0,0 +1,164 @@
+/**
+ * Decoders for the compact payloads generated by the gamchanger Python package
+ */
+
+const TYPED_ARRAYS = {
+  uint8: Uint8Array,
+  uint16: Uint16Array,
+  int16: Int16Array,
+  int32: Int32Array,
+  float32: Float32Array,
+  float64: Float64Array
+};
+
+/**
+ * Wrap a base64 encoded little-endian buffer as a TypedArray.
+ * @param {object} encoded {dtype, length, data} created by `_encode_typed_array()`
+ * @returns {TypedArray} Decoded array
+ */
+export const decodeTypedArray = (encoded) => {
+  const binary = atob(encoded.data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return new TYPED_ARRAYS[encoded.dtype](bytes.buffer, 0, encoded.length);
+};
+
+/**
+ * Decode the columnar sample data into the row format used by the EBM. Row
+ * format sample data is returned as is.
+ * @param {object} sampleData Sample data created by `get_sample_data()`
+ * @returns {object} Sample data with `samples` rows and `labels`
+ */
+export const decodeSampleData = (sampleData) => {
+  if (sampleData === null || sampleData.encoding !== 'columnar') return sampleData;
+
+  const columns = sampleData.columns.map(decodeTypedArray);
+  const featureNum = columns.length;
+  const sampleNum = sampleData.sampleCount;
+
+  // Store all samples in one row-major matrix, and each row is a view of it
+  const matrix = new Float64Array(sampleNum * featureNum);
+  columns.forEach((column, j) => {
+    for (let i = 0; i < sampleNum; i++) {
+      matrix[i * featureNum + j] = column[i];
+    }
+  });
+
+  const samples = new Array(sampleNum);
+  for (let i = 0; i < sampleNum; i++) {
+    samples[i] = matrix.subarray(i * featureNum, (i + 1) * featureNum);
+  }
+
+  const decoded = {
+    featureNames: sampleData.featureNames,
+    featureTypes: sampleData.featureTypes,
+    samples: samples,
+    labels: Float64Array.from(Array.isArray(sampleData.labels) ?
+      sampleData.labels : decodeTypedArray(sampleData.labels))
+  };
+
+  // Keep the compact format when the sample data is saved (e.g., .gamchanger)
+  Object.defineProperty(decoded, 'toJSON', { value: () => sampleData });
+
+  return decoded;
+};
+
+/**
+ * Decode a 2D grid created by `_encode_grid()` into nested arrays.
+ * @param {object} encoded {shape, dtype, scale, decimals, length, data}
+ * @returns {[[number]]} Rows of values
+ */
+export const decodeGrid = (encoded) => {
+  const values = decodeTypedArray(encoded);
+  const [rowNum, colNum] = encoded.shape;
+  const factor = 10 ** encoded.decimals;
+
+  const grid = new Array(rowNum);
+  for (let i = 0; i < rowNum; i++) {
+    const row = new Array(colNum);
+    for (let j = 0; j < colNum; j++) {
+      // Round again to recover the exact values of float32 buffers
+      row[j] = Math.round(values[i * colNum + j] / encoded.scale * factor) / factor;
+    }
+    grid[i] = row;
+  }
+
+  return grid;
+};
+
+/**
+ * Expand the plateaus created by `_encode_plateaus()` to one value per bin.
+ * @param {[number]} values Value of each plateau
+ * @param {[number]} lengths Number of bins of each plateau
+ * @returns {[number]} Value of each bin
+ */
+export const decodePlateaus = (values, lengths) => {
+  const expanded = [];
+  lengths.forEach((length, i) => {
+    for (let j = 0; j < length; j++) expanded.push(values[i]);
+  });
+  return expanded;
+};
+
+/**
+ * Decode the binary grids of an interaction term and the plateaus of a
+ * continuous feature in place. It runs when a term is loaded, and the widget
+ * loads all terms to score the samples, so every term is decoded on init.
+ * @param {object} feature Feature data
+ * @returns {object} Feature data
+ */
+const decodeFeatureGrids = (feature) => {
+  ['additive', 'error'].forEach(key => {
+    if (feature[key] !== undefined && feature[key] !== null &&
+      feature[key].encoding === 'grid') {
+      feature[key] = decodeGrid(feature[key]);
+    }
+  });
+
+  // The editor and the history work on the original bins
+  if (feature.plateaus !== undefined) {
+    feature.additive = decodePlateaus(feature.additive, feature.plateaus);
+    feature.error = decodePlateaus(feature.error, feature.plateaus);
+    delete feature.plateaus;
+  }
+
+  return feature;
+};
+
+/**
+ * Load the complete data of a lazy feature from the gamchanger data server.
+ * The feature object is updated in place. Features that are already loaded
+ * are returned as is, except that their binary grids are decoded.
+ * @param {object} data Model data
+ * @param {number} featureID Index of the feature in `data.features`
+ * @returns {object} Feature data
+ */
+export const loadLazyFeature = async (data, featureID) => {
+  const feature = data.features[featureID];
+  if (feature.lazy !== true) return decodeFeatureGrids(feature);
+
+  // Share one request if the feature is requested multiple times
+  if (feature.request === undefined) {
+    Object.defineProperty(feature, 'request', {
+      value: fetch(`${data.server}/term/${featureID}`).then(r => r.json()),
+      configurable: true
+    });
+  }
+
+  const term = await feature.request;
+  Object.assign(feature, term);
+  delete feature.lazy;
+  delete feature.request;
+
+  return decodeFeatureGrids(feature);
+};
+
+/**
+ * Load the complete data of all lazy features from the gamchanger data server.
+ * @param {object} data Model data
+ */
+export const loadAllLazyFeatures = async (data) => {
+  await Promise.all(data.features.map((d, i) => loadLazyFeature(data, i)));
+};
@@ -0,0 +1,100 @@
+/**
+ * Receive the samples pushed to a `SampleFeed` in the kernel (see
+ * `gamchanger.feed` in the Python package)
+ */
+
+import { decodeSampleData } from './payload';
+
+/**
+ * Append decoded samples to decoded sample data.
+ * @param {object} sampleData Decoded sample data (see `decodeSampleData()`)
+ * @param {object} newSampleData Decoded sample data of the new rows
+ * @returns {object} Decoded sample data with all rows
+ */
+export const mergeSampleData = (sampleData, newSampleData) => {
+  const labels = new Float64Array(sampleData.labels.length + newSampleData.labels.length);
+  labels.set(sampleData.labels);
+  labels.set(newSampleData.labels, sampleData.labels.length);
+
+  const merged = {
+    featureNames: sampleData.featureNames,
+    featureTypes: sampleData.featureTypes,
+    samples: sampleData.samples.concat(newSampleData.samples),
+    labels: labels
+  };
+
+  // The merged rows are saved in the row format (e.g., .gamchanger)
+  Object.defineProperty(merged, 'toJSON', {
+    value: () => ({
+      featureNames: merged.featureNames,
+      featureTypes: merged.featureTypes,
+      samples: merged.samples.map(d => Array.from(d)),
+      labels: Array.from(merged.labels)
+    })
+  });
+
+  return merged;
+};
+
+/**
+ * Apply feed updates to decoded sample data.
+ * @param {object} sampleData Decoded sample data, or null
+ * @param {[object]} updates Updates {seq, mode, sampleData} from the feed
+ * @returns {object} Decoded sample data after the updates
+ */
+export const applySampleUpdates = (sampleData, updates) => {
+  updates.forEach(d => {
+    const newSampleData = decodeSampleData(d.sampleData);
+    if (d.mode === 'replace' || sampleData === null) {
+      sampleData = newSampleData;
+    } else {
+      sampleData = mergeSampleData(sampleData, newSampleData);
+    }
+  });
+  return sampleData;
+};
+
+/**
+ * Long-poll the kernel for the updates of a sample feed. The server answers
+ * when there are updates after the last one we have received, or with an
+ * empty list after a timeout.
+ */
+export class SampleFeed {
+  /**
+   * @param {string} url URL of the feed's updates
+   * @param {function} onUpdate Async function called with each non-empty list
+   *  of updates. We do not poll again until it resolves.
+   */
+  constructor(url, onUpdate) {
+    this.url = url;
+    this.onUpdate = onUpdate;
+    this.seq = 0;
+    this.stopped = false;
+  }
+
+  /**
+   * Poll until stop() is called or the kernel's data server goes away.
+   */
+  async start() {
+    while (!this.stopped) {
+      let updates;
+      try {
+        const response = await fetch(`${this.url}?after=${this.seq}`);
+        if (!response.ok) break;
+        updates = await response.json();
+      } catch (error) {
+        console.error('Stopped receiving samples from the kernel', error);
+        break;
+      }
+
+      if (updates.length > 0) {
+        this.seq = updates[updates.length - 1].seq;
+        await this.onUpdate(updates);
+      }
+    }
+  }
+
+  stop() {
+    this.stopped = true;
+  }
+}